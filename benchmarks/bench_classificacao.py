@@ -0,0 +1,86 @@
+# Mede o tempo da classificação vetorizada e da versão antiga (apply por linha)
+# para 100 mil e 1 milhão de linhas. A equivalência entre as duas, em várias
+# datas de referência, é conferida em tests/test_classificacao.py.
+#
+#   python benchmarks/bench_classificacao.py
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inadimplencia.classificacao import classifica_exercicio, classifica_faixa, classifica_prazo
+
+HOJE = datetime(2025, 7, 15)
+
+
+def legado_exercicio(data):
+    if pd.isnull(data):
+        return "Sem data"
+    ano = data.year
+    if ano <= 2021: return "2021(Acumulado)"
+    elif ano == 2022: return "2022"
+    elif ano == 2023: return "2023"
+    elif ano == 2024: return "2024"
+    elif ano == 2025: return "2025"
+    else: return "Futuro"
+
+
+def legado_faixa(exercicio, dias):
+    ano_atual_str = str(HOJE.year)
+    if exercicio == ano_atual_str:
+        if dias <= 30: return "Até 30 dias"
+        elif dias <= 60: return "entre 31 e 60 dias"
+        else: return "mais de 61 dias"
+    return ""
+
+
+def legado_prazo(dias):
+    if dias <= 60: return "Curto Prazo"
+    else: return "Longo Prazo"
+
+
+def gerar(n, seed=0):
+    rng = np.random.default_rng(seed)
+    documento = pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 365 * 9, n), unit="D")
+    vencimento = documento + pd.to_timedelta(rng.integers(-10, 180, n), unit="D")
+    df = pd.DataFrame({"Data do documento": documento, "Vencimento líquido": vencimento})
+    df.loc[rng.random(n) < 0.01, "Data do documento"] = pd.NaT
+    df.loc[rng.random(n) < 0.01, "Vencimento líquido"] = pd.NaT
+    df["Dias de atraso"] = (HOJE - df["Vencimento líquido"]).dt.days
+    return df
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    for n in (100_000, 1_000_000):
+        df = gerar(n)
+
+        def legado():
+            exercicio = df["Data do documento"].apply(legado_exercicio)
+            faixa = pd.DataFrame({"e": exercicio, "d": df["Dias de atraso"]}).apply(lambda r: legado_faixa(r["e"], r["d"]), axis=1)
+            prazo = df["Dias de atraso"].apply(legado_prazo)
+            return exercicio, faixa, prazo
+
+        def vetorizado():
+            exercicio = classifica_exercicio(df["Data do documento"], HOJE)
+            faixa = classifica_faixa(exercicio, df["Dias de atraso"], HOJE)
+            prazo = classifica_prazo(df["Dias de atraso"])
+            return exercicio, faixa, prazo
+
+        _, t_legado = cronometrar(legado)
+        _, t_vetor = cronometrar(vetorizado)
+        print(f"{n:>9} linhas | apply: {t_legado:8.3f}s | vetorizado: {t_vetor:7.3f}s | {t_legado / t_vetor:6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
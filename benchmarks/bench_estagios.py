@@ -0,0 +1,126 @@
+# Mede o tempo de cada estágio do dashboard sobre dados sintéticos e grava o
+# resultado em JSON, para comparar execuções ao longo do tempo.
+#
+#   python benchmarks/bench_estagios.py --linhas 10000 100000 1000000 --saida bench.json
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dados_sinteticos import carrega_regiao, gera_historico, gera_titulos, para_xlsx
+from inadimplencia.base import BaseEnriquecida, classifica_titulos, junta_regiao, mapeia_cobranca
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.calculo import Filtros, filtra_base, quadro_detalhado, resumo_cliente, tipos_cobranca_clientes
+from inadimplencia.carga import parse_planilha_titulos
+from inadimplencia.chaves import compara_historico
+from inadimplencia.cubo import monta_cubo
+from inadimplencia.esquema import aplica_esquema
+
+HOJE = datetime(2025, 7, 15)
+COL_DIV = "Divisão"
+
+
+def cronometra(funcao, repeticoes):
+    # Melhor tempo entre as repetições; devolve também o resultado da última.
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, melhor
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executa(n, repeticoes, df_regiao, com_parse):
+    medidas = []
+
+    def mede(estagio, funcao, linhas=n):
+        resultado, segundos = cronometra(funcao, repeticoes)
+        medidas.append({"estagio": estagio, "linhas": linhas, "segundos": round(segundos, 6)})
+        print(f"{n:>9} | {estagio:<22} {segundos:9.4f}s", file=sys.stderr)
+        return resultado
+
+    df_original = gera_titulos(n, seed=n, df_regiao=df_regiao, hoje=HOJE)
+    if com_parse:
+        conteudo = para_xlsx(df_original)
+        df_original = mede("parse", lambda: parse_planilha_titulos(conteudo))
+    df_original = aplica_esquema(normalizar_para_arrow(df_original))
+
+    df = mede("merge_regiao", lambda: junta_regiao(df_original, df_regiao, COL_DIV, COL_DIV))
+    df = mede("classificacao", lambda: classifica_titulos(df.copy(), HOJE))
+    df = mede("cobranca_status", lambda: mapeia_cobranca(df.copy()))
+    df = mede("esquema", lambda: aplica_esquema(df))
+    cubo = mede("cubo", lambda: monta_cubo(df, COL_DIV))
+
+    base = BaseEnriquecida(df=df, cubo=cubo, col_div=COL_DIV, soma_bruta=0.0, soma_apos_merge=0.0)
+    regiao = df["Região"].value_counts().index[0]
+    filtros = Filtros(regiao=regiao, exercicios=tuple(str(ano) for ano in range(HOJE.year - 2, HOJE.year + 1)))
+    df_inad, _, cubo_inad = mede("filtro", lambda: filtra_base(base, filtros))
+    mede("pivot", lambda: quadro_detalhado(cubo_inad), linhas=len(cubo_inad))
+
+    df_inad_total, _, _ = filtra_base(base, Filtros())
+    tot_inad = df_inad_total["Montante em moeda interna"].sum()
+    mede(
+        "resumo_cliente",
+        lambda: tipos_cobranca_clientes(resumo_cliente(df_inad_total, tot_inad), df_inad_total),
+        linhas=len(df_inad_total),
+    )
+
+    colunas_exportacao = list(df_original.columns)
+    df_hist = gera_historico(df_inad_total[colunas_exportacao].astype({COL_DIV: str}))
+    df_hist = aplica_esquema(normalizar_para_arrow(df_hist))
+    mede("diff_historico", lambda: compara_historico(df_inad_total, df_hist), linhas=len(df_inad_total) + len(df_hist))
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por estágio do dashboard.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-parse", action="store_true", help="não gera XLSX nem mede a leitura pelo openpyxl")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    df_regiao = carrega_regiao()
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "maquina": platform.platform(),
+        "medidas": [],
+    }
+    for n in args.linhas:
+        # Uma repetição basta para as bases grandes.
+        repeticoes = 1 if n >= 1_000_000 else args.repeticoes
+        resultado["medidas"].extend(executa(n, repeticoes, df_regiao, not args.sem_parse))
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        Path(args.saida).write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Confere a atualização incremental da base contra a reconstrução completa e mede
+# as duas, para uma nova versão que remove, insere e altera poucas linhas.
+#
+#   python benchmarks/bench_incremental.py
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dados_sinteticos import carrega_regiao, gera_titulos
+from inadimplencia.base import monta_base
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.esquema import aplica_esquema
+from inadimplencia.incremental import atualiza_base, verifica_bases
+
+HOJE = date(2025, 7, 15)
+COL_DIV = "Divisão"
+
+
+def nova_versao(df, seed, frac_removidas=0.01, frac_inseridas=0.01, frac_alteradas=0.005):
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    manter = rng.random(n) >= frac_removidas
+    novo = df[manter].copy()
+    alterar = rng.random(len(novo)) < frac_alteradas
+    novo.loc[alterar, "Montante em moeda interna"] = np.round(novo.loc[alterar, "Montante em moeda interna"] * 0.5, 2)
+    inseridas = gera_titulos(int(n * frac_inseridas), seed=seed + 1, hoje=HOJE)
+    return pd.concat([novo, inseridas], ignore_index=True)
+
+
+def prepara(df):
+    return aplica_esquema(normalizar_para_arrow(df))
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    df_regiao = carrega_regiao()
+    for n in (100_000, 1_000_000):
+        bruto = gera_titulos(n, seed=n, df_regiao=df_regiao, hoje=HOJE)
+        df_antigo = prepara(bruto)
+        df_novo = prepara(nova_versao(bruto, seed=n))
+        base = monta_base(df_antigo, df_regiao, COL_DIV, COL_DIV, HOJE)
+
+        completa, t_completa = cronometrar(lambda: monta_base(df_novo, df_regiao, COL_DIV, COL_DIV, HOJE))
+        incremental, t_incremental = cronometrar(lambda: atualiza_base(base, df_novo, df_regiao, COL_DIV, HOJE, verificar=False))
+        if incremental is None:
+            raise SystemExit(f"atualização incremental não aplicada ({n} linhas)")
+        verifica_bases(incremental, completa)
+        print(f"{n:>9} linhas | reconstrução: {t_completa:7.3f}s | incremental: {t_incremental:7.3f}s | {t_completa / t_incremental:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
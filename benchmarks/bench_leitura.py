@@ -0,0 +1,154 @@
+# Mede a leitura da exportação de títulos por motor (tempo e pico de memória) e
+# confere que todos devolvem as mesmas colunas e valores. Cada medida roda em um
+# processo novo, para que o pico de memória de um motor não contamine o outro.
+#
+#   python benchmarks/bench_leitura.py --linhas 10000 100000 --saida leitura.json
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_estagios import commit_atual
+from dados_sinteticos import com_colunas_extras, gera_titulos, para_xlsx
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.carga import COLUNAS_DATA, COLUNAS_TITULOS, parse_planilha_titulos
+from inadimplencia.leitura import MOTORES, le_xlsx
+
+HOJE = datetime(2025, 7, 15)
+# "pandas" é a leitura anterior: pd.read_excel de todas as colunas e to_datetime depois.
+LEITURAS = ("pandas",) + MOTORES
+
+
+def le_pandas(conteudo):
+    df = pd.read_excel(BytesIO(conteudo), engine="openpyxl")
+    for col in COLUNAS_DATA:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def le(leitura, conteudo):
+    if leitura == "pandas":
+        return le_pandas(conteudo)
+    return le_xlsx(conteudo, colunas=list(COLUNAS_TITULOS), tipos=COLUNAS_TITULOS, datas=COLUNAS_DATA, motor=leitura)
+
+
+def _status_memoria(campo):
+    with open("/proc/self/status") as status:
+        for linha in status:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1]) * 1024
+    raise OSError(campo)
+
+
+def zera_pico():
+    # Memória residente atual, com o pico do processo zerado nela (Linux). Fora do
+    # Linux, devolve o pico até aqui, e a medida vira "quanto o pico subiu".
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return _status_memoria("VmRSS")
+    except OSError:
+        return pico_memoria()
+
+
+def pico_memoria():
+    try:
+        return _status_memoria("VmHWM")
+    except OSError:
+        fator = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * fator
+
+
+def mede_processo(leitura, arquivo):
+    # Executado no processo filho: lê o arquivo uma vez e imprime a medida em JSON.
+    conteudo = Path(arquivo).read_bytes()
+    antes = zera_pico()
+    inicio = time.perf_counter()
+    df = le(leitura, conteudo)
+    segundos = time.perf_counter() - inicio
+    print(json.dumps({"segundos": segundos, "pico_memoria": pico_memoria() - antes, "colunas": len(df.columns)}))
+
+
+def confere(conteudo):
+    # Todos os motores devem devolver as colunas usadas com os mesmos valores da leitura anterior.
+    referencia = normalizar_para_arrow(le_pandas(conteudo))
+    referencia = referencia[[col for col in COLUNAS_TITULOS if col in referencia.columns]]
+    for motor in MOTORES:
+        pd.testing.assert_frame_equal(referencia, normalizar_para_arrow(le(motor, conteudo)), check_dtype=False)
+    pd.testing.assert_frame_equal(referencia, normalizar_para_arrow(parse_planilha_titulos(conteudo)), check_dtype=False)
+
+
+def executa(n, colunas_extras):
+    df = com_colunas_extras(gera_titulos(n, seed=n, hoje=HOJE), colunas_extras)
+    conteudo = para_xlsx(df)
+    confere(conteudo)
+
+    medidas = []
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as arquivo:
+        arquivo.write(conteudo)
+        arquivo.flush()
+        for leitura in LEITURAS:
+            saida = subprocess.run(
+                [sys.executable, __file__, "--medir", leitura, arquivo.name],
+                capture_output=True, text=True, check=True, env={**os.environ, "INADIMPLENCIA_DIAGNOSTICO": ""},
+            )
+            medida = json.loads(saida.stdout.strip().splitlines()[-1])
+            medidas.append({
+                "estagio": f"parse:{leitura}",
+                "linhas": n,
+                "colunas_planilha": len(df.columns),
+                "bytes": len(conteudo),
+                "segundos": round(medida["segundos"], 6),
+                "pico_memoria": medida["pico_memoria"],
+            })
+            print(
+                f"{n:>9} | {leitura:<9} {medida['segundos']:8.3f}s  pico {medida['pico_memoria'] / 1024 ** 2:8.1f} MB",
+                file=sys.stderr,
+            )
+    return medidas
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--medir":
+        mede_processo(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark da leitura do XLSX por motor.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--colunas-extras", type=int, default=20, help="colunas não usadas pelo painel na planilha")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "maquina": platform.platform(),
+        "medidas": [],
+    }
+    for n in args.linhas:
+        resultado["medidas"].extend(executa(n, args.colunas_extras))
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        Path(args.saida).write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Mede quanto os estágios pesados travam as outras threads do servidor: enquanto
+# a base é montada ou dois snapshots são comparados (no próprio processo ou no
+# pool), uma thread "batimento" dorme 5 ms em laço e registra o atraso de cada
+# acordada. Também confere que os resultados vindos do pool são iguais aos locais.
+#
+#   python benchmarks/bench_processos.py --linhas 100000 1000000
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dados_sinteticos import carrega_regiao, gera_historico, gera_titulos
+from inadimplencia.base import monta_base
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.chaves import compara_historico
+from inadimplencia.esquema import aplica_esquema
+from inadimplencia.incremental import verifica_bases
+from inadimplencia.processos import CAMPOS_TOTAIS, executa, monta_base_em_processo, totais_historico_em_processo
+from inadimplencia.snapshots import SnapshotStore
+
+HOJE = date(2025, 7, 15)
+COL_DIV = "Divisão"
+INTERVALO = 0.005
+
+
+def com_batimento(funcao):
+    # Executa funcao() e devolve (resultado, segundos, atrasos da thread de batimento em ms).
+    atrasos = []
+    parar = threading.Event()
+
+    def batimento():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            time.sleep(INTERVALO)
+            atrasos.append((time.perf_counter() - inicio - INTERVALO) * 1000)
+
+    thread = threading.Thread(target=batimento)
+    thread.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao()
+    finally:
+        segundos = time.perf_counter() - inicio
+        parar.set()
+        thread.join()
+    return resultado, segundos, np.array(atrasos)
+
+
+def resume(nome, segundos, atrasos):
+    print(
+        f"  {nome:<22} {segundos:7.3f}s | atraso do batimento p50 {np.percentile(atrasos, 50):7.1f} ms"
+        f"  p99 {np.percentile(atrasos, 99):7.1f} ms  máx {atrasos.max():7.1f} ms"
+    )
+
+
+def confere_totais(local, pool):
+    assert {campo: float(getattr(local, campo)) for campo in CAMPOS_TOTAIS} == pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Travamento do servidor com e sem o pool de processos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    # Sobe os processos antes de medir: o custo de iniciar o pool é pago uma vez por servidor.
+    executa(None, time.sleep, lambda: (0,))
+
+    df_regiao = carrega_regiao()
+    for n in args.linhas:
+        print(f"{n} linhas")
+        df = aplica_esquema(normalizar_para_arrow(gera_titulos(n, seed=n, df_regiao=df_regiao, hoje=HOJE)))
+        local, segundos, atrasos = com_batimento(lambda: monta_base(df, df_regiao, COL_DIV, COL_DIV, HOJE))
+        resume("base no processo", segundos, atrasos)
+        pool, segundos, atrasos = com_batimento(lambda: monta_base_em_processo(df, df_regiao, COL_DIV, COL_DIV, HOJE))
+        resume("base no pool", segundos, atrasos)
+        verifica_bases(pool, local)
+        pd.testing.assert_frame_equal(pool.df, local.df)
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            store = SnapshotStore(diretorio)
+            anterior = store.registra(normalizar_para_arrow(gera_historico(df.astype({COL_DIV: str}), seed=n)))
+            atual = store.registra(df.astype({COL_DIV: str}))
+            arquivos = (store.diretorio / atual.arquivo, store.diretorio / anterior.arquivo)
+            diff_local, segundos, atrasos = com_batimento(
+                lambda: compara_historico(store.carrega(atual), store.carrega(anterior))
+            )
+            resume("snapshots no processo", segundos, atrasos)
+            totais_pool, segundos, atrasos = com_batimento(lambda: totais_historico_em_processo(*arquivos))
+            resume("snapshots no pool", segundos, atrasos)
+            confere_totais(diff_local, totais_pool)
+
+
+if __name__ == "__main__":
+    main()
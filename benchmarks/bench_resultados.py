@@ -0,0 +1,148 @@
+# Simula várias sessões pedindo combinações de filtros (algumas muito mais comuns
+# que as outras) e compara o tempo por pedido com e sem o cache de resultados
+# compartilhado: núcleo do dashboard, seções de linhas e specs das figuras. Confere
+# que o resultado vindo do cache é igual ao calculado e mostra a taxa de acertos
+# com menos memória. Descarte e invalidação são testados em tests/test_resultados.py.
+#
+#   python benchmarks/bench_resultados.py --linhas 100000 1000000 --pedidos 200
+import argparse
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dados_sinteticos import carrega_regiao, gera_titulos
+from inadimplencia.base import LISTA_STATUS, monta_base
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.calculo import Filtros, calcula_antecipada, calcula_clientes, compute_dashboard
+from inadimplencia.esquema import aplica_esquema, formata_bytes
+from inadimplencia.graficos import fig_exercicio, fig_regiao, fig_tipo_cobranca, fig_top_clientes
+from inadimplencia.resultados import CacheResultados, normaliza_filtros
+
+HOJE = date(2025, 7, 15)
+COL_DIV = "Divisão"
+
+
+def combinacoes(base, n, seed=0):
+    # Combinações de filtros como a página as monta, com as divisões em ordem
+    # aleatória para exercitar a normalização da chave.
+    rng = np.random.default_rng(seed)
+    todas = Filtros(divisoes=tuple(base.lista_divisoes), exercicios=tuple(base.lista_exercicios), status=tuple(LISTA_STATUS))
+    saida = [todas]
+    while len(saida) < n:
+        divisoes = rng.choice(base.lista_divisoes, size=int(rng.integers(1, len(base.lista_divisoes) + 1)), replace=False)
+        saida.append(Filtros(
+            regiao=None if rng.random() < 0.5 else str(rng.choice(base.lista_regioes)),
+            divisoes=tuple(str(d) for d in divisoes),
+            exercicios=todas.exercicios if rng.random() < 0.7 else tuple(base.lista_exercicios[-2:]),
+            status=todas.status,
+            ultimos_10_dias=bool(rng.random() < 0.2),
+        ))
+    return saida
+
+
+def pagina(base, filtros, cache, origem):
+    # O que a página calcula por execução, com as seções de linhas abertas.
+    hoje = datetime.combine(HOJE, datetime.min.time())
+    chave = (origem, normaliza_filtros(filtros, base))
+
+    def em_cache(item, calcular):
+        if cache is None:
+            return calcular()
+        return cache.obtem(chave + (item,), calcular)
+
+    def grafico(nome, montar):
+        return pio.from_json(em_cache(f"grafico:{nome}", lambda: montar().to_json()))
+
+    resultado = em_cache("nucleo", lambda: compute_dashboard(base, filtros, hoje, secoes=()))
+    antecipada = em_cache("antecipada", lambda: calcula_antecipada(base, filtros))
+    clientes = em_cache("clientes", lambda: calcula_clientes(base, filtros))
+    figuras = [
+        grafico("tipo_cobranca", lambda: fig_tipo_cobranca(resultado.tipo_cobranca)),
+        grafico("regiao", lambda: fig_regiao(resultado.regiao)),
+    ]
+    if not resultado.exercicio.empty:
+        figuras.append(grafico("exercicio", lambda: fig_exercicio(resultado.exercicio, resultado.cores_exercicio, resultado.ano_atual)))
+    if clientes[1] is not None:
+        figuras.append(grafico("top_clientes", lambda: fig_top_clientes(clientes[1])))
+    return resultado, antecipada, clientes, figuras
+
+
+def confere(a, b):
+    for campo in ("tot_inad", "soma_frmpgto_HR", "n_titulos_inad"):
+        assert getattr(a[0], campo) == getattr(b[0], campo), campo
+    for campo in ("exercicio", "tipo_cobranca", "regiao", "resumo_divisao"):
+        pd.testing.assert_frame_equal(getattr(a[0], campo), getattr(b[0], campo))
+    for tabela_a, tabela_b in zip(a[1] + a[2], b[1] + b[2]):
+        if tabela_a is None or tabela_b is None:
+            assert tabela_a is tabela_b
+        else:
+            pd.testing.assert_frame_equal(tabela_a, tabela_b)
+    assert [f.to_json() for f in a[3]] == [f.to_json() for f in b[3]]
+
+
+def mede(pedidos, funcao):
+    tempos = []
+    for filtros in pedidos:
+        inicio = time.perf_counter()
+        funcao(filtros)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return np.array(tempos)
+
+
+def resume(nome, tempos):
+    print(
+        f"  {nome:<12} total {tempos.sum() / 1000:7.2f}s | p50 {np.percentile(tempos, 50):7.1f} ms"
+        f"  p95 {np.percentile(tempos, 95):7.1f} ms  p99 {np.percentile(tempos, 99):7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo por pedido com e sem o cache de resultados.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--pedidos", type=int, default=200)
+    parser.add_argument("--combinacoes", type=int, default=30)
+    args = parser.parse_args()
+
+    df_regiao = carrega_regiao()
+    for n in args.linhas:
+        print(f"{n} linhas")
+        df = aplica_esquema(normalizar_para_arrow(gera_titulos(n, seed=n, df_regiao=df_regiao, hoje=HOJE)))
+        base = monta_base(df, df_regiao, COL_DIV, COL_DIV, HOJE)
+        opcoes = combinacoes(base, args.combinacoes, seed=n)
+        # Poucas combinações concentram a maior parte dos pedidos, como nas sessões reais.
+        pesos = 1 / np.arange(1, len(opcoes) + 1)
+        indices = np.random.default_rng(n).choice(len(opcoes), size=args.pedidos, p=pesos / pesos.sum())
+        pedidos = [opcoes[i] for i in indices]
+
+        cache = CacheResultados()
+        origem = ("atual", "v1", HOJE)
+        cache.define_origem_atual(origem)
+        resume("sem cache", mede(pedidos, lambda f: pagina(base, f, None, origem)))
+        resume("com cache", mede(pedidos, lambda f: pagina(base, f, cache, origem)))
+        metricas = cache.metricas()
+        print(
+            f"  acertos {metricas['acertos']} falhas {metricas['falhas']} ({metricas['taxa_acerto']:.0%})"
+            f" | {metricas['itens']} itens, {formata_bytes(metricas['bytes'])}"
+        )
+
+        for filtros in opcoes:
+            confere(pagina(base, filtros, cache, origem), pagina(base, filtros, None, origem))
+
+        # Limite pequeno: as entradas menos usadas saem primeiro.
+        pequeno = CacheResultados(max_bytes=metricas["bytes"] // 4)
+        pequeno.define_origem_atual(origem)
+        for filtros in pedidos:
+            pagina(base, filtros, pequeno, origem)
+        print(f"  com 1/4 da memória: {pequeno.metricas()['taxa_acerto']:.0%} de acertos, {pequeno.metricas()['descartes']} descartes")
+
+
+if __name__ == "__main__":
+    main()
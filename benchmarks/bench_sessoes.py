@@ -0,0 +1,282 @@
+# Teste de carga da página: várias sessões simuladas (AppTest do Streamlit, uma
+# thread por sessão, todas no mesmo processo e portanto com os mesmos caches,
+# como num servidor) repetem sequências de uso — trocar região, divisões e
+# Status, "últimos 10 dias", abrir os expanders, paginar, recarregar — e cada
+# execução da página é cronometrada. As planilhas vêm de um servidor HTTP local
+# com dados sintéticos, não do Google Drive. Para cada número de sessões
+# simultâneas são impressos p50/p95/p99 da latência, execuções por segundo e a
+# memória do processo.
+#
+# O AppTest não foi feito para rodar em várias threads: cada execução troca o
+# Runtime global por um falso e o desfaz ao final, troca config.get_option e
+# compila o script de novo. `prepara_apptest_concorrente` deixa esse estado fixo
+# durante o teste (um Runtime falso só, appTest ligado, compilação serializada);
+# o script da página em si roda em paralelo, como no servidor.
+#
+#   python benchmarks/bench_sessoes.py --linhas 20000 --sessoes 1 2 4 8 --rodadas 2 --saida sessoes.json
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_estagios import commit_atual
+from dados_sinteticos import ARQUIVO_REGIAO, carrega_regiao, gera_historico, gera_titulos, para_xlsx
+
+RAIZ = Path(__file__).resolve().parent.parent
+PAGINA = RAIZ / "dashboard_inadimplencia.py"
+EXPANDERS = ("secao_antecipada", "secao_divisao", "secao_clientes", "secao_indicadores")
+
+
+class _Silencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servidor_de_fontes(diretorio, n, seed=0):
+    # Grava as três planilhas sintéticas em `diretorio`, sobe um servidor HTTP
+    # local para elas e aponta a página para ele (variáveis INADIMPLENCIA_URL_*).
+    df_regiao = carrega_regiao()
+    df = gera_titulos(n, seed=seed, df_regiao=df_regiao)
+    (diretorio / "dados.xlsx").write_bytes(para_xlsx(df))
+    (diretorio / "hist.xlsx").write_bytes(para_xlsx(gera_historico(df, seed=seed + 1)))
+    (diretorio / "REGIAO.xlsx").write_bytes(ARQUIVO_REGIAO.read_bytes())
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Silencioso, directory=str(diretorio)))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    endereco = f"http://127.0.0.1:{servidor.server_port}"
+    os.environ["INADIMPLENCIA_URL_DADOS"] = f"{endereco}/dados.xlsx"
+    os.environ["INADIMPLENCIA_URL_HIST"] = f"{endereco}/hist.xlsx"
+    os.environ["INADIMPLENCIA_URL_REGIAO"] = f"{endereco}/REGIAO.xlsx"
+    return servidor
+
+
+def prepara_apptest_concorrente():
+    # Ver o comentário do topo. Só afeta este processo de teste.
+    from contextlib import nullcontext
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    # Com mais de uma execução ao mesmo tempo, o fim de uma não pode apagar o
+    # Runtime da outra: fora o que o AppTest acabou de instalar, vale o falso fixo.
+    Runtime.instance = classmethod(lambda cls: cls._instance or runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    obtem_opcao = config.get_option
+    config.get_option = lambda nome: True if nome == "global.appTest" else obtem_opcao(nome)
+    app_test.patch_config_options = lambda opcoes: nullcontext()
+
+    # ast.parse/compile em threads simultâneas falham no Python 3.11.
+    compilacao = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def get_bytecode_serializado(self, script_path):
+        with compilacao:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = get_bytecode_serializado
+
+
+def memoria_processo():
+    # RSS atual em bytes (Linux); nos demais sistemas, o pico registrado pelo SO.
+    try:
+        for linha in Path("/proc/self/status").read_text().splitlines():
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Sessao:
+    # Uma sessão simulada: um AppTest e a sequência de interações de um usuário.
+    def __init__(self, numero, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.rng = np.random.default_rng(numero + 1)
+        self.app = AppTest.from_file(str(PAGINA), default_timeout=timeout)
+        self.medidas = []  # (passo, ms)
+        self.erros = []
+
+    def executa(self, passo, preparar=None):
+        inicio = time.perf_counter()
+        if preparar is None:
+            self.app.run()
+        else:
+            preparar(self.app)
+        self.medidas.append((passo, (time.perf_counter() - inicio) * 1000))
+        self.erros += [f"{passo}: {excecao.value}" for excecao in self.app.exception]
+
+    def botao(self, rotulo):
+        return next(botao for botao in self.app.sidebar.button if rotulo in botao.label)
+
+    def abre(self, chave):
+        self.app.session_state[chave] = True
+        self.app.run()
+
+    def fecha(self, chave):
+        self.app.session_state[chave] = False
+        self.app.run()
+
+    def rodada(self, recarregar):
+        app, rng = self.app, self.rng
+        regioes = app.sidebar.selectbox(key="regiao_sel")
+        regiao = regioes.options[int(rng.integers(1, len(regioes.options)))]
+        self.executa("regiao", lambda _: regioes.set_value(regiao).run())
+        self.executa("status", lambda _: app.sidebar.checkbox(key="status_🔴").uncheck().run())
+        self.executa("ultimos_10_dias", lambda _: self.botao("últimos 10").click().run())
+        self.executa("limpa_data", lambda _: self.botao("Limpar Filtro de Data").click().run())
+        for chave in EXPANDERS:
+            self.executa(f"abre:{chave}", lambda _, chave=chave: self.abre(chave))
+        # Algumas divisões da região escolhida (o rótulo é "código · nome (região)").
+        divisoes = app.sidebar.multiselect(key="divisoes")
+        codigos = [rotulo.split(" ")[0] for rotulo in divisoes.options if rotulo.endswith(f"({regiao})")]
+        escolha = list(rng.choice(codigos, size=min(len(codigos), int(rng.integers(1, 6))), replace=False))
+        self.executa("divisoes", lambda _: divisoes.set_value(escolha).run())
+        paginas = [widget for widget in app.number_input if widget.key == "resumo_cliente_pagina"]
+        if paginas and paginas[0].max > 1:
+            self.executa("pagina_clientes", lambda _: paginas[0].set_value(2).run())
+        for chave in EXPANDERS:
+            self.executa(f"fecha:{chave}", lambda _, chave=chave: self.fecha(chave))
+        # Volta ao estado inicial para a próxima rodada.
+        self.executa("limpa_divisoes", lambda _: app.sidebar.button(key="todas_div").click().run())
+        self.executa("status_todos", lambda _: app.sidebar.checkbox(key="status_🔴").check().run())
+        self.executa("todas_regioes", lambda _: app.sidebar.selectbox(key="regiao_sel").set_value(regioes.options[0]).run())
+        if recarregar:
+            self.executa("recarregar", lambda _: self.botao("Recarregar dados").click().run())
+
+
+def executa_nivel(n_sessoes, rodadas, timeout):
+    # n_sessoes usuários ao mesmo tempo, cada um abrindo a página e repetindo as rodadas.
+    antes = memoria_processo()
+    sessoes = [Sessao(numero, timeout) for numero in range(n_sessoes)]
+    barreira = threading.Barrier(n_sessoes)
+
+    def usuario(sessao):
+        barreira.wait()
+        try:
+            sessao.executa("abre_pagina")
+            for rodada in range(rodadas):
+                # Só um usuário pede a recarga, na última rodada.
+                sessao.rodada(recarregar=sessao.numero == 0 and rodada == rodadas - 1)
+        except Exception as erro:
+            sessao.erros.append(f"sequência interrompida: {erro!r}")
+
+    threads = [threading.Thread(target=usuario, args=(sessao,)) for sessao in sessoes]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+    depois = memoria_processo()
+
+    tempos = np.array([ms for sessao in sessoes for _, ms in sessao.medidas])
+    por_passo = {}
+    for sessao in sessoes:
+        for passo, ms in sessao.medidas:
+            por_passo.setdefault(passo, []).append(ms)
+    return {
+        "sessoes": n_sessoes,
+        "execucoes": len(tempos),
+        "segundos": segundos,
+        "execucoes_por_segundo": len(tempos) / segundos,
+        "p50_ms": float(np.percentile(tempos, 50)),
+        "p95_ms": float(np.percentile(tempos, 95)),
+        "p99_ms": float(np.percentile(tempos, 99)),
+        "max_ms": float(tempos.max()),
+        "memoria_processo": depois,
+        "memoria_por_sessao": (depois - antes) / n_sessoes,
+        "p50_por_passo_ms": {passo: float(np.percentile(ms, 50)) for passo, ms in por_passo.items()},
+        "erros": [erro for sessao in sessoes for erro in sessao.erros],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da página com sessões simultâneas.")
+    parser.add_argument("--linhas", type=int, default=20_000, help="títulos na exportação sintética")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rodadas", type=int, default=2, help="sequências de interação por sessão")
+    parser.add_argument("--timeout", type=float, default=600, help="limite de cada execução da página, em segundos")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: só o resumo impresso)")
+    args = parser.parse_args()
+
+    import logging
+    import warnings
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        diretorio = Path(diretorio)
+        (diretorio / "fontes").mkdir()
+        # Caches e snapshots em diretórios temporários, para não misturar com os da página real.
+        os.environ["INADIMPLENCIA_CACHE_DIR"] = str(diretorio / "cache")
+        os.environ["INADIMPLENCIA_SNAPSHOT_DIR"] = str(diretorio / "snapshots")
+        servidor = servidor_de_fontes(diretorio / "fontes", args.linhas)
+        prepara_apptest_concorrente()
+        try:
+            # Primeira carga (download, leitura e base) fora das medidas: é paga uma vez por servidor.
+            inicio = time.perf_counter()
+            aquecimento = Sessao(-1, args.timeout)
+            aquecimento.executa("abre_pagina")
+            print(f"primeira carga: {time.perf_counter() - inicio:.1f}s ({args.linhas} linhas)")
+            if aquecimento.erros:
+                raise SystemExit(f"A página falhou: {aquecimento.erros}")
+
+            resultado = {
+                "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": commit_atual(),
+                "python": platform.python_version(),
+                "maquina": platform.platform(),
+                "cpus": os.cpu_count(),
+                "linhas": args.linhas,
+                "rodadas": args.rodadas,
+                "niveis": [],
+            }
+            print(f"{'sessões':>8} {'execuções':>10} {'exec/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'MB/sessão':>10}")
+            for n_sessoes in args.sessoes:
+                nivel = executa_nivel(n_sessoes, args.rodadas, args.timeout)
+                resultado["niveis"].append(nivel)
+                print(
+                    f"{n_sessoes:>8} {nivel['execucoes']:>10} {nivel['execucoes_por_segundo']:>8.2f} "
+                    f"{nivel['p50_ms']:>8.0f} {nivel['p95_ms']:>8.0f} {nivel['p99_ms']:>8.0f} "
+                    f"{nivel['memoria_processo'] / 1024 ** 2:>8.0f} {nivel['memoria_por_sessao'] / 1024 ** 2:>10.1f}"
+                )
+                for erro in nivel["erros"][:5]:
+                    print(f"  erro: {erro}")
+        finally:
+            servidor.shutdown()
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultado, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Confere o Status por cliente e o texto de tipos de cobrança vetorizados contra a
+# versão antiga (join por cliente + busca de substring) e mede as duas.
+#
+#   python benchmarks/bench_status.py
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dados_sinteticos import gera_titulos
+from inadimplencia.base import MAPA_GRAVIDADE_SIMBOLO, ORDEM_GRAVIDADE, gravidade, status_clientes
+from inadimplencia.calculo import resumo_cliente, tipos_cobranca_clientes
+
+HOJE = datetime(2025, 7, 15)
+TIPOS = np.array(ORDEM_GRAVIDADE, dtype=object)
+
+
+def legado_gravidade(tipos_string):
+    for tipo in ORDEM_GRAVIDADE:
+        if tipo in tipos_string:
+            return MAPA_GRAVIDADE_SIMBOLO[tipo]
+    return '⚪'
+
+
+def gerar(n):
+    df = gera_titulos(n, seed=n, hoje=HOJE)
+    rng = np.random.default_rng(n)
+    df["Tipo de Cobrança Desc"] = rng.choice(TIPOS, n, p=[0.03, 0.02, 0.05, 0.05, 0.45, 0.2, 0.05, 0.15])
+    df["Dias de atraso"] = (HOJE - df["Vencimento líquido"]).dt.days
+    df["Nome 1"] = df["Nome 1"].astype("category")
+    df["Tipo de Cobrança Desc"] = df["Tipo de Cobrança Desc"].astype("category")
+    return df
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    for n in (100_000, 1_000_000):
+        df = gerar(n)
+
+        def legado():
+            vencidos = df[df["Dias de atraso"] >= 1]
+            resumo = vencidos.groupby('Nome 1', observed=True).agg(
+                Tipos_de_Cobranca=('Tipo de Cobrança Desc', lambda x: ', '.join(x.unique()))
+            )
+            mapa = resumo['Tipos_de_Cobranca'].apply(legado_gravidade).to_dict()
+            status = df['Nome 1'].map(mapa).astype(object)
+            texto = df.groupby('Nome 1', observed=True)['Tipo de Cobrança Desc'].agg(lambda x: ', '.join(x.unique()))
+            return status, texto
+
+        def vetorizado():
+            vencido = (df["Dias de atraso"] >= 1).to_numpy()
+            status = pd.Series(status_clientes(df['Nome 1'], gravidade(df['Tipo de Cobrança Desc']), vencido), index=df.index)
+            df_inad = df.assign(Status=status)
+            resumo = tipos_cobranca_clientes(resumo_cliente(df_inad, 1.0), df_inad)
+            return status, resumo.set_index('Cliente')['Tipos_de_Cobranca']
+
+        (status_a, texto_a), t_legado = cronometrar(legado)
+        (status_b, texto_b), t_vetor = cronometrar(vetorizado)
+        if not status_a.fillna('-').equals(status_b.fillna('-')):
+            raise SystemExit(f"Status: resultado difere da versão antiga ({n} linhas)")
+        texto_b = texto_b.reindex(texto_a.index).astype(object)
+        if not texto_a.astype(object).equals(texto_b):
+            raise SystemExit(f"Tipos de Cobrança: resultado difere da versão antiga ({n} linhas)")
+        print(f"{n:>9} linhas | join + substring: {t_legado:8.3f}s | vetorizado: {t_vetor:7.3f}s | {t_legado / t_vetor:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Gerador de exportações sintéticas de títulos a receber, com as mesmas colunas
+# da planilha real e distribuições concentradas (poucos clientes e divisões
+# respondem pela maior parte dos títulos).
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+ARQUIVO_REGIAO = RAIZ / "REGIAO.xlsx"
+
+BANCOS = np.array(
+    ['237', '341C', '033', '001', 999, 96, 87, 7, 20, 22, 899, 991, 26, 990, 6, 60, 5, 888, None, 'X01'],
+    dtype=object,
+)
+PESOS_BANCOS = np.array([30, 20, 10, 8, 8, 2, 3, 2, 1, 1, 2, 2, 1, 1, 1, 3, 1, 2, 3, 1], dtype=float)
+FORMAS_PGTO = np.array(['B', 'H', 'R', 'D', None], dtype=object)
+PESOS_FORMAS_PGTO = np.array([60, 10, 8, 12, 10], dtype=float)
+TIPOS_DOCUMENTO = np.array(['RV', 'DR', 'DZ', 'AB'], dtype=object)
+
+
+def carrega_regiao():
+    return pd.read_excel(ARQUIVO_REGIAO, engine="openpyxl")
+
+
+def _pesos_zipf(n, expoente, rng):
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def gera_titulos(n, seed=0, df_regiao=None, hoje=None):
+    rng = np.random.default_rng(seed)
+    hoje = pd.Timestamp(hoje or datetime.now()).normalize()
+    df_regiao = carrega_regiao() if df_regiao is None else df_regiao
+
+    # Algumas divisões propositalmente fora do REGIAO.xlsx ("Não definida").
+    divisoes = np.array(list(df_regiao["Divisão"].astype(str).unique()) + ["Z901", "Z902"], dtype=object)
+    n_clientes = max(n // 20, 10)
+
+    documento = hoje - pd.to_timedelta(rng.integers(0, 365 * 8, n), unit="D")
+    vencimento = documento + pd.to_timedelta(rng.choice([0, 15, 28, 30, 45, 60, 90, 120], n), unit="D")
+
+    df = pd.DataFrame({
+        "Tipo de documento": rng.choice(TIPOS_DOCUMENTO, n, p=[0.7, 0.15, 0.1, 0.05]),
+        "Referência": rng.integers(1_000_000, 9_999_999, n),
+        "Conta": rng.integers(100_000, 999_999, n),
+        "Divisão": rng.choice(divisoes, n, p=_pesos_zipf(len(divisoes), 1.1, rng)),
+        "Nome 1": np.char.add("CLIENTE ", rng.choice(n_clientes, n, p=_pesos_zipf(n_clientes, 1.2, rng)).astype(str)).astype(object),
+        "Banco da empresa": rng.choice(BANCOS, n, p=PESOS_BANCOS / PESOS_BANCOS.sum()),
+        "FrmPgto": rng.choice(FORMAS_PGTO, n, p=PESOS_FORMAS_PGTO / PESOS_FORMAS_PGTO.sum()),
+        "Data do documento": documento,
+        "Vencimento líquido": vencimento,
+        "Montante em moeda interna": np.round(rng.lognormal(8, 1.5, n), 2),
+    })
+    df.loc[rng.random(n) < 0.002, "Data do documento"] = pd.NaT
+    return df
+
+
+def gera_historico(df, seed=1, frac_mantidos=0.85, frac_novos=0.1):
+    # Versão anterior da exportação: parte dos títulos atuais já existia e parte
+    # dos títulos antigos foi quitada desde então.
+    rng = np.random.default_rng(seed)
+    mantidos = df.sample(frac=frac_mantidos, random_state=seed)
+    quitados = gera_titulos(int(len(df) * frac_novos), seed=int(rng.integers(1 << 31)))
+    return pd.concat([mantidos, quitados], ignore_index=True)
+
+
+def com_colunas_extras(df, n_colunas=20, seed=2):
+    # A exportação real traz muitas colunas que o painel não usa; aqui elas são
+    # simuladas com textos repetidos, números e datas.
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for i in range(n_colunas):
+        if i % 3 == 0:
+            df[f"Extra texto {i}"] = rng.choice(np.array(["ABC", "DEF", "GHI", "JKL"], dtype=object), len(df))
+        elif i % 3 == 1:
+            df[f"Extra número {i}"] = np.round(rng.normal(1000, 300, len(df)), 2)
+        else:
+            df[f"Extra data {i}"] = df["Vencimento líquido"]
+    return df
+
+
+def para_xlsx(df):
+    saida = BytesIO()
+    df.to_excel(saida, index=False, engine="openpyxl")
+    return saida.getvalue()
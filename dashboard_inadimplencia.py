@@ -1,35 +1,45 @@
 import streamlit as st
 import pandas as pd
-import requests
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
-from io import BytesIO
+import os
 import time
+import plotly.io as pio
+
+from inadimplencia.atualizacao import Atualizador
+from inadimplencia.base import LISTA_STATUS, get_division_column_name, grupos_divisoes
+from inadimplencia.calculo import Filtros, calcula_antecipada, calcula_clientes, calcula_historico, compute_dashboard, pagina_tabela
+from inadimplencia.carga import carrega_fontes, load_hist_data
+from inadimplencia.chaves import ID_COLS
+from inadimplencia.diagnostico import inicia_coleta, span
+from inadimplencia.esquema import formata_bytes
+from inadimplencia.graficos import fig_exercicio, fig_regiao, fig_tendencia, fig_tipo_cobranca, fig_top_clientes, gauge_chart
+from inadimplencia.processos import monta_base_em_processo
+from inadimplencia.resultados import CacheResultados, normaliza_filtros
+from inadimplencia.snapshots import store_padrao
 
 st.set_page_config(layout="wide", page_title="Dashboard Inadimplência")
 
 # --- CONFIGURAÇÃO DAS FONTES DE DADOS ---
+# As três planilhas podem vir de outro endereço pelas variáveis INADIMPLENCIA_URL_DADOS,
+# INADIMPLENCIA_URL_REGIAO e INADIMPLENCIA_URL_HIST (ex.: fontes locais nos testes de carga).
 OWNER = "rodneirac"
 REPO = "BIINADIMSPX"
 ARQUIVO_REGIAO = "REGIAO.xlsx"
-URL_REGIAO = f"https://raw.githubusercontent.com/{OWNER}/{REPO}/main/{ARQUIVO_REGIAO}"
+URL_REGIAO = os.environ.get("INADIMPLENCIA_URL_REGIAO", f"https://raw.githubusercontent.com/{OWNER}/{REPO}/main/{ARQUIVO_REGIAO}")
 LOGO_URL = f"https://raw.githubusercontent.com/{OWNER}/{REPO}/main/logo.png"
 
 ID_PLANILHA_GOOGLE = "1APYc9xkFeFkYuRRuhfi2DhJWw2RA9ddx"
-URL_DADOS = f"https://docs.google.com/spreadsheets/d/{ID_PLANILHA_GOOGLE}/export?format=xlsx"
+URL_DADOS = os.environ.get("INADIMPLENCIA_URL_DADOS", f"https://docs.google.com/spreadsheets/d/{ID_PLANILHA_GOOGLE}/export?format=xlsx")
 
 ID_PLANILHA_HIST = "1xxLuMIudxIIvqe_9so3I3LYiEubvaRIM"
-URL_HIST = f"https://docs.google.com/spreadsheets/d/{ID_PLANILHA_HIST}/export?format=xlsx"
+URL_HIST = os.environ.get("INADIMPLENCIA_URL_HIST", f"https://docs.google.com/spreadsheets/d/{ID_PLANILHA_HIST}/export?format=xlsx")
 # --- FIM DA CONFIGURAÇÃO ---
 
-def label_mk(valor):
-    if valor >= 1_000_000:
-        return f"{valor/1_000_000:.1f}M"
-    elif valor >= 1_000:
-        return f"{valor/1_000:.1f}K"
-    else:
-        return f"{valor:,.0f}"
+# Opções de linhas por página das tabelas paginadas (a primeira é o padrão).
+TAMANHOS_PAGINA = [50, 100, 500]
+
+# Spans desta execução, exibidos no painel de diagnóstico quando ele está ligado.
+spans_execucao = inicia_coleta(st.session_state.get('diagnostico', False))
 
 if 'last_reload' not in st.session_state:
     st.session_state['last_reload'] = None
@@ -37,72 +47,63 @@ if 'last_reload' not in st.session_state:
 if 'show_last_10_days' not in st.session_state:
     st.session_state['show_last_10_days'] = False
 
-@st.cache_data(ttl=3600)
-def load_data(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content), engine="openpyxl")
-        df["Data do documento"] = pd.to_datetime(df["Data do documento"], errors="coerce")
-        df["Vencimento líquido"] = pd.to_datetime(df["Vencimento líquido"], errors="coerce")
-        return df
-    except:
-        return pd.DataFrame()
-
-@st.cache_data(ttl=3600)
-def load_region_data(url):
-    response = requests.get(url)
-    df = pd.read_excel(BytesIO(response.content), engine="openpyxl")
-    return df
-
-@st.cache_data(ttl=3600)
-def load_hist_data(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content), engine="openpyxl")
-        df["Data do documento"] = pd.to_datetime(df["Data do documento"], errors="coerce")
-        df["Vencimento líquido"] = pd.to_datetime(df["Vencimento líquido"], errors="coerce")
-        return df
-    except:
-        return pd.DataFrame()
-
-def get_division_column_name(df):
-    if 'Divisao' in df.columns:
-        return 'Divisao'
-    elif 'Divisão' in df.columns:
-        return 'Divisão'
-    else:
-        return None
-
-def classifica_exercicio(data):
-    if pd.isnull(data):
-        return "Sem data"
-    ano = data.year
-    if ano <= 2021: return "2021(Acumulado)"
-    elif ano == 2022: return "2022"
-    elif ano == 2023: return "2023"
-    elif ano == 2024: return "2024"
-    elif ano == 2025: return "2025"
-    else: return "Futuro"
-
-def classifica_faixa(exercicio, dias):
-    ano_atual_str = str(datetime.now().year)
-    if exercicio == ano_atual_str:
-        if dias <= 30: return "Até 30 dias"
-        elif dias <= 60: return "entre 31 e 60 dias"
-        else: return "mais de 61 dias"
-    return ""
-
-def classifica_prazo(dias):
-    if dias <= 60: return "Curto Prazo"
-    else: return "Longo Prazo"
-
-df_original = load_data(URL_DADOS)
-df_regiao = load_region_data(URL_REGIAO)
+@st.cache_resource
+def get_atualizador():
+    # Um atualizador por processo: busca novas versões a cada hora (ou sob demanda)
+    # em segundo plano, enquanto as sessões seguem com a versão vigente.
+    atualizador = Atualizador(lambda: carrega_fontes(URL_DADOS, URL_REGIAO, URL_HIST))
+    atualizador.inicia_agendamento()
+    return atualizador
+
+@st.cache_resource(max_entries=2)
+def load_base(versao, data_referencia, col_div_princ, col_div_regiao, _df_original, _df_regiao):
+    # Base de outro dia de referência que não o preparado pelo atualizador (ex.: virada do dia).
+    # Os DataFrames são compartilhados entre sessões e não devem ser alterados.
+    return monta_base_em_processo(
+        _df_original, _df_regiao, col_div_princ, col_div_regiao, data_referencia,
+        chave=("base", versao, data_referencia, col_div_princ, col_div_regiao),
+    )
+
+@st.cache_resource(max_entries=4)
+def load_snapshot(hash_snapshot):
+    store = store_padrao()
+    snapshot = next(s for s in store.lista() if s.hash == hash_snapshot)
+    return store.carrega(snapshot)
+
+@st.cache_resource(max_entries=2)
+def load_base_snapshot(hash_snapshot, data_referencia, col_div_princ, col_div_regiao, _df_regiao):
+    # Base de uma versão guardada no histórico local, com o atraso contado na data escolhida.
+    return monta_base_em_processo(
+        load_snapshot(hash_snapshot), _df_regiao, col_div_princ, col_div_regiao, data_referencia,
+        chave=("snapshot", hash_snapshot, data_referencia, col_div_princ, col_div_regiao),
+    )
+
+@st.cache_resource(max_entries=2)
+def load_hist(versao_hist, _conteudo_hist):
+    # Planilha de histórico, lida só quando os indicadores dinâmicos são abertos.
+    return load_hist_data(_conteudo_hist)
+
+@st.cache_resource(max_entries=4)
+def load_grupos_divisoes(origem, _base, _df_regiao, col_div_regiao):
+    # Opções do seletor de divisões (divisão, região e nome) de cada base em uso.
+    return grupos_divisoes(_base, _df_regiao, col_div_regiao)
+
+@st.cache_resource
+def get_cache_resultados():
+    # Tabelas e figuras já calculadas, compartilhadas entre as sessões e
+    # descartadas quando a versão dos dados muda (ver inadimplencia/resultados.py).
+    return CacheResultados()
+
+@st.cache_data
+def load_tendencia(hashes_snapshots):
+    # `hashes_snapshots` só identifica o conjunto de snapshots para o cache.
+    return store_padrao().tendencia()
+
+atualizador = get_atualizador()
+dados = atualizador.atual()
+versao_dados, df_original, df_regiao = dados.versao, dados.df_original, dados.df_regiao
 
 if not df_original.empty and not df_regiao.empty:
-    soma_bruta_planilha = df_original["Montante em moeda interna"].sum()
     col_div_princ = get_division_column_name(df_original)
     col_div_regiao = get_division_column_name(df_regiao)
 
@@ -110,47 +111,81 @@ if not df_original.empty and not df_regiao.empty:
         st.error("Erro Crítico: Coluna de divisão não encontrada.")
         st.stop()
 
-    df_original[col_div_princ] = df_original[col_div_princ].astype(str)
-    df_regiao[col_div_regiao] = df_regiao[col_div_regiao].astype(str)
-    df_regiao = df_regiao.drop_duplicates(subset=[col_div_regiao])
-    df_merged = pd.merge(df_original, df_regiao, on=col_div_princ, how="left")
-    
-    divisoes_sem_regiao = df_merged[df_merged['Região'].isnull()][col_div_princ].unique().tolist()
-    
-    soma_apos_merge = df_merged["Montante em moeda interna"].sum()
-    if abs(soma_bruta_planilha - soma_apos_merge) > 1:
-        st.warning(f"Soma após merge: R$ {soma_apos_merge:,.2f} difere do bruto: R$ {soma_bruta_planilha:,.2f}")
-
-    df_merged["Exercicio"] = df_merged["Data do documento"].apply(classifica_exercicio)
-    
-    lista_exercicios = sorted(df_merged['Exercicio'].unique())
-    lista_divisoes = sorted(df_merged[col_div_princ].unique())
+    snapshots = store_padrao().lista()
+    datas_snapshots = sorted({s.data for s in snapshots}, reverse=True)
+    data_posicao = st.session_state.get('data_posicao')
+    data_comparacao = st.session_state.get('data_comparacao')
+
+    if data_posicao is not None and store_padrao().em(data_posicao) is not None:
+        # Posição numa data passada: snapshot vigente naquele dia, atraso contado nele.
+        hoje = datetime.combine(data_posicao, datetime.min.time())
+        hash_posicao = store_padrao().em(data_posicao).hash
+        base = load_base_snapshot(hash_posicao, data_posicao, col_div_princ, col_div_regiao, df_regiao)
+        origem = ("snapshot", hash_posicao, data_posicao)
+    else:
+        hoje = datetime.now()
+        if dados.base is not None and dados.data_base == hoje.date():
+            base = dados.base
+        else:
+            base = load_base(versao_dados, hoje.date(), col_div_princ, col_div_regiao, df_original, df_regiao)
+        origem = ("atual", versao_dados, hoje.date())
+
+    cache_resultados = get_cache_resultados()
+    if origem[0] == "atual":
+        cache_resultados.define_origem_atual(origem)
+
+    soma_bruta_planilha = base.soma_bruta
+    divisoes_sem_regiao = base.divisoes_sem_regiao
+
+    if abs(soma_bruta_planilha - base.soma_apos_merge) > 1:
+        st.warning(f"Soma após merge: R$ {base.soma_apos_merge:,.2f} difere do bruto: R$ {soma_bruta_planilha:,.2f}")
+
+    lista_exercicios = base.lista_exercicios
+    lista_divisoes = base.lista_divisoes
+
+    if 'filtros_da_url' not in st.session_state:
+        # Primeira execução da sessão: região e divisões podem vir do link
+        # (?regiao=SC&div=A035,A146), para abrir uma visão filtrada direto.
+        st.session_state['filtros_da_url'] = True
+        if st.query_params.get('regiao') in base.lista_regioes:
+            st.session_state['regiao_sel'] = st.query_params['regiao']
+        st.session_state['divisoes'] = st.query_params.get('div', '').split(',')
+    # Divisões escolhidas que não existem na versão atual dos dados saem da seleção.
+    divisoes_validas = set(lista_divisoes)
+    divisoes_escolhidas = [div for div in st.session_state.get('divisoes', []) if div in divisoes_validas]
+    if divisoes_escolhidas != st.session_state.get('divisoes'):
+        st.session_state['divisoes'] = divisoes_escolhidas
 
     st.sidebar.title("Filtros")
-    regiao_sel = st.sidebar.selectbox("Selecione a Região:", ["TODAS AS REGIÕES"] + sorted(df_merged['Região'].fillna('Não definida').unique()))
+    regiao_sel = st.sidebar.selectbox("Selecione a Região:", ["TODAS AS REGIÕES"] + base.lista_regioes, key='regiao_sel')
     
     with st.sidebar.expander("Selecione a(s) Divisão(ões)", expanded=False):
-        divisao_keys = [f"divisao_{div}" for div in lista_divisoes]
-        for key in divisao_keys:
-            if key not in st.session_state:
-                st.session_state[key] = True
+        # Um seletor com busca (código, nome ou região) no lugar de um checkbox por
+        # divisão; a seleção vazia vale como todas as divisões.
+        grupos = load_grupos_divisoes(origem, base, df_regiao, col_div_regiao)
+        rotulos = {
+            div: f"{div} · {nome} ({regiao})" if nome else f"{div} ({regiao})"
+            for div, regiao, nome in grupos[['Divisão', 'Região', 'Nome']].itertuples(index=False)
+        }
 
-        def marcar_todas_divisoes():
-            for key in divisao_keys:
-                st.session_state[key] = True
+        def adicionar_regiao():
+            escolhidas = st.session_state['divisoes']
+            da_regiao = grupos.loc[grupos['Região'] == st.session_state['divisoes_regiao'], 'Divisão']
+            st.session_state['divisoes'] = escolhidas + [div for div in da_regiao if div not in escolhidas]
 
-        def desmarcar_todas_divisoes():
-            for key in divisao_keys:
-                st.session_state[key] = False
+        def limpar_divisoes():
+            st.session_state['divisoes'] = []
 
+        st.selectbox("Região:", base.lista_regioes, key='divisoes_regiao')
         col1_div, col2_div = st.columns(2)
-        col1_div.button("Marcar Todas", on_click=marcar_todas_divisoes, use_container_width=True, key='marcar_div')
-        col2_div.button("Desmarcar Todas", on_click=desmarcar_todas_divisoes, use_container_width=True, key='desmarcar_div')
-
-        for divisao in lista_divisoes:
-            st.checkbox(divisao, key=f"divisao_{divisao}")
+        col1_div.button("Adicionar a região", on_click=adicionar_regiao, use_container_width=True, key='adicionar_regiao_div')
+        col2_div.button("Todas", on_click=limpar_divisoes, use_container_width=True, key='todas_div')
+        st.multiselect(
+            "Divisões:", list(grupos['Divisão']), key='divisoes',
+            format_func=rotulos.get, placeholder="Todas as divisões",
+        )
 
-    divisao_sel = [divisao for divisao in lista_divisoes if st.session_state.get(f"divisao_{divisao}", True)]
+    divisao_sel = st.session_state['divisoes']
     
     with st.sidebar.expander("Selecione o(s) Exercício(s)", expanded=False):
         exercicio_keys = [f"exercicio_{ex}" for ex in lista_exercicios]
@@ -175,74 +210,11 @@ if not df_original.empty and not df_regiao.empty:
 
     exercicio_sel = [exercicio for exercicio in lista_exercicios if st.session_state.get(f"exercicio_{exercicio}", True)]
 
-    df_merged['Região'].fillna('Não definida', inplace=True)
-    df_filt = df_merged.copy()
-
-    if regiao_sel != "TODAS AS REGIÕES":
-        df_filt = df_filt[df_filt['Região'] == regiao_sel]
-    
-    if divisao_sel:
-        df_filt = df_filt[df_filt[col_div_princ].isin(divisao_sel)]
-    else:
-        df_filt = df_filt.iloc[0:0]
-    
-    if exercicio_sel:
-        df_filt = df_filt[df_filt['Exercicio'].isin(exercicio_sel)]
-    else: 
-        df_filt = df_filt.iloc[0:0]
-
-    hoje = datetime.now()
-    df_filt["Dias de atraso"] = (hoje - df_filt["Vencimento líquido"]).dt.days
-
-    if st.session_state.get('show_last_10_days', False):
+    ultimos_10_dias = st.session_state.get('show_last_10_days', False)
+    if ultimos_10_dias:
         st.success("Filtro aplicado: Exibindo apenas inadimplência com vencimento nos últimos 10 dias.")
-        df_filt = df_filt[df_filt["Dias de atraso"].between(1, 10)]
-
-    df_filt["Faixa"] = df_filt.apply(lambda row: classifica_faixa(row["Exercicio"], row["Dias de atraso"]), axis=1)
-    df_filt["Prazo"] = df_filt["Dias de atraso"].apply(classifica_prazo)
-
-    df_inad = df_filt[df_filt["Dias de atraso"] >= 1].copy()
-
-    regra_tipo_cobranca = {
-        'COBRANÇA JURÍDICA':  ['060', '60', '005', '5', '888'],
-        'COBRANÇA BANCÁRIA':   ['237', '341C', '033', '001'],
-        'CARTEIRA':           ['999'],
-        'PERMUTA':            ['096', '96'],
-        'COBRANÇA PROTESTADO': ['087', '87'],
-        'ANÁLISE PROCESSO':   ['007', '7', '020', '20', '022', '22'],
-        'COBR. TERCERIZADA':  ['899'],
-        'DIVERSOS':           ['991', '026', '26', '990', '006', '6', '']
-    }
-    
-    if not df_inad.empty:
-        mapa_banco_para_tipo = {banco: tipo for tipo, bancos in regra_tipo_cobranca.items() for banco in bancos}
-        df_inad['Tipo de Cobrança Desc'] = df_inad['Banco da empresa'].astype(str).map(mapa_banco_para_tipo)
-        df_inad['Tipo de Cobrança Desc'].fillna('DIVERSOS', inplace=True)
-
-        resumo_cli_status = df_inad.groupby('Nome 1').agg(
-            Tipos_de_Cobranca=('Tipo de Cobrança Desc', lambda x: ', '.join(x.unique()))
-        ).reset_index()
-
-        ordem_gravidade = [
-            'COBRANÇA JURÍDICA', 'COBRANÇA PROTESTADO', 'ANÁLISE PROCESSO', 'COBR. TERCERIZADA',
-            'COBRANÇA BANCÁRIA', 'CARTEIRA', 'PERMUTA', 'DIVERSOS'
-        ]
-        mapa_gravidade_simbolo = {
-            'COBRANÇA JURÍDICA': '🔴', 'COBRANÇA PROTESTADO': '🔴', 'ANÁLISE PROCESSO': '🟡', 
-            'COBR. TERCERIZADA': '🟡', 'COBRANÇA BANCÁRIA': '🔵', 'CARTEIRA': '🔵', 'PERMUTA': '⚪', 'DIVERSOS': '⚪'
-        }
-
-        def definir_gravidade(tipos_string):
-            for tipo in ordem_gravidade:
-                if tipo in tipos_string:
-                    return mapa_gravidade_simbolo[tipo]
-            return '⚪'
-
-        resumo_cli_status['Status'] = resumo_cli_status['Tipos_de_Cobranca'].apply(definir_gravidade)
-        mapa_cliente_status = pd.Series(resumo_cli_status.Status.values, index=resumo_cli_status['Nome 1']).to_dict()
-        df_inad['Status'] = df_inad['Nome 1'].map(mapa_cliente_status)
 
-    lista_status = ['🔴', '🟡', '🔵', '⚪']
+    lista_status = LISTA_STATUS
     with st.sidebar.expander("Selecione o(s) Status", expanded=False):
         status_keys = [f"status_{s}" for s in lista_status]
         for key in status_keys:
@@ -266,13 +238,28 @@ if not df_original.empty and not df_regiao.empty:
 
     status_sel = [status for status in lista_status if st.session_state.get(f"status_{status}", True)]
     
-    if not df_inad.empty and status_sel:
-        df_inad = df_inad[df_inad['Status'].isin(status_sel)]
+    # Filtros normalizados (ver resultados.normaliza_filtros): são a chave do cache
+    # e também o que é calculado, para que "todos" não seja tratado como filtro.
+    filtros = normaliza_filtros(Filtros(
+        regiao=None if regiao_sel == "TODAS AS REGIÕES" else regiao_sel,
+        divisoes=tuple(divisao_sel) if divisao_sel else None,
+        exercicios=tuple(exercicio_sel),
+        status=tuple(status_sel),
+        ultimos_10_dias=ultimos_10_dias,
+    ), base)
+
+    # O link da página reflete a região e as divisões escolhidas.
+    for parametro, valor in (('regiao', filtros.regiao), ('div', ','.join(divisao_sel) or None)):
+        if valor is None:
+            st.query_params.pop(parametro, None)
+        elif st.query_params.get(parametro) != valor:
+            st.query_params[parametro] = valor
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("#### Atualização de Dados")
     if st.sidebar.button("🔄 Recarregar dados"):
-        st.cache_data.clear()
+        # A busca roda em segundo plano; a página segue com a versão atual até a nova ficar pronta.
+        atualizador.solicita()
         st.session_state['last_reload'] = time.strftime("%d/%m/%Y %H:%M:%S")
         st.session_state['show_last_10_days'] = False
         st.rerun()
@@ -287,18 +274,54 @@ if not df_original.empty and not df_regiao.empty:
 
     st.sidebar.caption("Clique para buscar os dados mais recentes.")
     if st.session_state['last_reload']:
-        st.sidebar.success(f"Dados recarregados em {st.session_state['last_reload']}")
+        st.sidebar.success(f"Atualização solicitada em {st.session_state['last_reload']}")
+    if atualizador.atualizando:
+        st.sidebar.info("Buscando nova versão em segundo plano; ela aparece na próxima interação.")
+    if atualizador.ultimo_erro:
+        st.sidebar.warning(f"Última atualização falhou ({atualizador.ultimo_erro}). Exibindo a versão anterior.")
+    st.sidebar.caption(
+        f"Versão dos dados: {versao_dados} · buscada em {dados.buscado_em:%d/%m/%Y %H:%M:%S} "
+        f"· verificada em {dados.verificado_em:%d/%m/%Y %H:%M:%S}"
+    )
+
+    with st.sidebar.expander("🕓 Histórico de versões", expanded=False):
+        st.selectbox(
+            "Posição em:", [None] + datas_snapshots, key='data_posicao',
+            format_func=lambda d: "Dados atuais" if d is None else d.strftime("%d/%m/%Y"),
+        )
+        st.selectbox(
+            "Comparar com:", [None] + datas_snapshots, key='data_comparacao',
+            format_func=lambda d: "Planilha de histórico" if d is None else d.strftime("%d/%m/%Y"),
+        )
+        st.caption(f"{len(snapshots)} versão(ões) guardada(s) localmente.")
+    st.sidebar.caption(f"Memória da base: {formata_bytes(base.memoria_antes)} → {formata_bytes(base.memoria_depois)}")
+    st.sidebar.checkbox("🩺 Diagnóstico de desempenho", key='diagnostico')
     
-    tot_inad = df_inad["Montante em moeda interna"].sum()
-    if "FrmPgto" in df_filt.columns:
-        soma_frmpgto_HR = df_inad[df_inad["FrmPgto"].isin(["H", "R"])]["Montante em moeda interna"].sum()
-    else:
-        soma_frmpgto_HR = 0
+    # Só o que sai do cubo é calculado aqui. As seções que dependem das linhas
+    # (antecipada, clientes, histórico) são fragmentos: calculam ao abrir o
+    # expander e, ao abrir ou fechar, só o próprio fragmento roda de novo.
+    # Resultados e figuras vêm do cache compartilhado quando outra sessão (ou
+    # esta, antes) já pediu a mesma combinação de filtros sobre os mesmos dados.
+    chave_filtros = (origem, filtros)
+
+    def em_cache(item, calcular):
+        return cache_resultados.obtem(chave_filtros + (item,), calcular)
+
+    def grafico(nome, montar):
+        # A figura fica no cache como spec JSON e só é reconstruída aqui.
+        spec = em_cache(f"grafico:{nome}", lambda: montar().to_json())
+        with span(f"grafico:{nome}"):
+            st.plotly_chart(pio.from_json(spec), use_container_width=True)
+
+    resultado = em_cache("nucleo", lambda: compute_dashboard(base, filtros, hoje, secoes=()))
 
     st.image(LOGO_URL, width=200)
     st.title("Dashboard de Análise de Inadimplência")
     
-    texto_divisao = "Todas" if len(divisao_sel) == len(lista_divisoes) else ', '.join(divisao_sel) if divisao_sel else "Nenhuma"
+    if not divisao_sel or len(divisao_sel) == len(lista_divisoes):
+        texto_divisao = "Todas"
+    else:
+        texto_divisao = ', '.join(divisao_sel[:10]) + (f" e mais {len(divisao_sel) - 10}" if len(divisao_sel) > 10 else "")
     texto_exercicio = "Todos" if len(exercicio_sel) == len(lista_exercicios) else ', '.join(exercicio_sel) if exercicio_sel else "Nenhum"
     st.markdown(f"**Exibindo dados para:** Região: {regiao_sel} | Divisão(ões): {texto_divisao} | Exercício(s): {texto_exercicio}")
 
@@ -313,245 +336,218 @@ if not df_original.empty and not df_regiao.empty:
 
     st.markdown("### Indicadores Gerais")
     c1, c2, c3 = st.columns(3)
-    c1.metric("Vlr Total Inadimplente", f"R$ {soma_bruta_planilha:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    c2.metric("Vlr Inadimplente (Filtro Atual)", f"R$ {tot_inad:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    c3.metric("Venda Antecipada Inadimplente", f"R$ {soma_frmpgto_HR:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-
-    def fmt(v): return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-    with st.expander("🔍 Venda Antecipada Inadimplente – Detalhamento por Filial e Cliente"):
-        if "FrmPgto" in df_inad.columns:
-            df_antecipada = df_inad[df_inad["FrmPgto"].isin(["H", "R"])].copy()
-            resumo_filial = (
-                df_antecipada.groupby(col_div_princ)["Montante em moeda interna"]
-                .sum()
-                .reset_index()
-                .rename(columns={col_div_princ: 'Filial', 'Montante em moeda interna': 'Venda Antecipada Inadimplente'})
-                .sort_values(by='Venda Antecipada Inadimplente', ascending=False)
-            )
-            resumo_filial_fmt = resumo_filial.copy()
-            resumo_filial_fmt['Venda Antecipada Inadimplente'] = resumo_filial_fmt['Venda Antecipada Inadimplente'].apply(fmt)
-            st.markdown("**Por Filial:**")
-            st.dataframe(resumo_filial_fmt, use_container_width=True)
-            if 'Nome 1' in df_antecipada.columns:
-                resumo_cli = (
-                    df_antecipada.groupby('Nome 1')["Montante em moeda interna"]
-                    .sum()
-                    .reset_index()
-                    .rename(columns={'Nome 1': 'Cliente', 'Montante em moeda interna': 'Venda Antecipada Inadimplente'})
-                    .sort_values(by='Venda Antecipada Inadimplente', ascending=False)
-                )
-                resumo_cli_fmt = resumo_cli.copy()
-                resumo_cli_fmt['Venda Antecipada Inadimplente'] = resumo_cli_fmt['Venda Antecipada Inadimplente'].apply(fmt)
-                st.markdown("**Por Cliente:**")
-                st.dataframe(resumo_cli_fmt, use_container_width=True)
+    c1.metric("Vlr Total Inadimplente", f"R$ {resultado.soma_bruta:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    c2.metric("Vlr Inadimplente (Filtro Atual)", f"R$ {resultado.tot_inad:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    c3.metric("Venda Antecipada Inadimplente", f"R$ {resultado.soma_frmpgto_HR:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+
+    def colunas_formatadas(moeda=(), percentual=()):
+        # Os valores seguem numéricos; a formatação é feita no navegador, por coluna.
+        config = {col: st.column_config.NumberColumn(f"{col} (R$)", format="localized") for col in moeda}
+        config.update({col: st.column_config.NumberColumn(format="%.2f%%") for col in percentual})
+        return config
+
+    def tabela_paginada(df, nome, moeda=(), percentual=(), ordem=None):
+        # Ordenação e paginação no servidor: só a página pedida vai para o
+        # navegador, qualquer que seja o número de linhas.
+        colunas = list(df.columns)
+
+        def volta_ao_inicio():
+            st.session_state[f"{nome}_pagina"] = 1
+
+        c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+        coluna = c1.selectbox(
+            "Ordenar por", colunas, index=colunas.index(ordem) if ordem in colunas else 0,
+            key=f"{nome}_ordem", on_change=volta_ao_inicio,
+        )
+        crescente = c2.radio(
+            "Ordem", ["Decrescente", "Crescente"], horizontal=True, key=f"{nome}_sentido", on_change=volta_ao_inicio,
+        ) == "Crescente"
+        tamanho = c3.selectbox("Linhas por página", TAMANHOS_PAGINA, key=f"{nome}_tamanho", on_change=volta_ao_inicio)
+        paginas = max(1, -(-len(df) // tamanho))
+        if st.session_state.get(f"{nome}_pagina", 1) > paginas:
+            st.session_state[f"{nome}_pagina"] = paginas
+        pagina = c4.number_input("Página", min_value=1, max_value=paginas, step=1, key=f"{nome}_pagina")
+        inicio = (pagina - 1) * tamanho
+        with span(f"tabela:{nome}", linhas=len(df)):
+            fatia = pagina_tabela(df, coluna, crescente, inicio, tamanho).round({col: 2 for col in moeda})
+            st.dataframe(fatia, use_container_width=True, hide_index=True, column_config=colunas_formatadas(moeda, percentual))
+        st.caption(f"Linhas {inicio + 1 if len(df) else 0}–{inicio + len(fatia)} de {len(df)} · página {pagina} de {paginas}")
+
+    @st.fragment
+    def secao_antecipada(base, filtros):
+        secao = st.expander("🔍 Venda Antecipada Inadimplente – Detalhamento por Filial e Cliente", key='secao_antecipada', on_change="rerun")
+        if not secao.open:
+            return
+        with secao:
+            if "FrmPgto" in base.df.columns:
+                antecipada_filial, antecipada_cliente = em_cache("antecipada", lambda: calcula_antecipada(base, filtros))
+                moeda = ['Venda Antecipada Inadimplente']
+                st.markdown("**Por Filial:**")
+                tabela_paginada(antecipada_filial, "antecipada_filial", moeda, ordem=moeda[0])
+                if antecipada_cliente is not None:
+                    st.markdown("**Por Cliente:**")
+                    tabela_paginada(antecipada_cliente, "antecipada_cliente", moeda, ordem=moeda[0])
+                else:
+                    st.info("Coluna 'Nome 1' não encontrada na base de dados para o detalhamento por cliente.")
             else:
-                st.info("Coluna 'Nome 1' não encontrada na base de dados para o detalhamento por cliente.")
-        else:
-            st.info("Coluna FrmPgto não encontrada.")
+                st.info("Coluna FrmPgto não encontrada.")
+
+    secao_antecipada(base, filtros)
 
     st.markdown("### Quadro Detalhado de Inadimplência")
-    if not df_inad.empty:
-        pivot = pd.pivot_table(df_inad, index=["Exercicio", "Faixa"],
-                                values="Montante em moeda interna", columns="Prazo",
-                                aggfunc="sum", fill_value=0, margins=True, margins_name="Total Geral").reset_index()
-        st.dataframe(
-            pivot.style.format({col: fmt for col in pivot.columns if col not in ["Exercicio", "Faixa"]}),
-            use_container_width=True
-        )
+    if resultado.pivot is not None:
+        pivot = resultado.pivot
+        with span("tabela:quadro_detalhado", linhas=len(pivot)):
+            st.dataframe(
+                pivot,
+                use_container_width=True,
+                column_config=colunas_formatadas(moeda=[col for col in pivot.columns if col not in ["Exercicio", "Faixa"]]),
+            )
     else:
         st.warning("Nenhum dado de inadimplência encontrado para os filtros selecionados.")
 
 
     st.markdown("### Inadimplência por Exercício")
-    ano_atual_str = str(datetime.now().year)
-    
-    df_outros = df_inad[df_inad['Exercicio'] != ano_atual_str]
-    df_outros = df_outros.groupby('Exercicio')['Montante em moeda interna'].sum().reset_index()
-    df_outros.rename(columns={'Exercicio': 'Categoria', 'Montante em moeda interna': 'Valor'}, inplace=True)
-
-    df_2025 = df_inad[df_inad['Exercicio'] == ano_atual_str]
-    
-    if not df_2025.empty:
-        df_2025 = df_2025.groupby('Faixa')['Montante em moeda interna'].sum().reset_index()
-        df_2025 = df_2025[df_2025['Faixa'] != '']
-        df_2025['Categoria'] = f'{ano_atual_str} - ' + df_2025['Faixa'].astype(str)
-        df_2025.rename(columns={'Montante em moeda interna': 'Valor'}, inplace=True)
-        df_graf = pd.concat([df_outros, df_2025[['Categoria', 'Valor']]], ignore_index=True)
-    else:
-        df_graf = df_outros
-
-    if not df_graf.empty:
-        color_map = {cat: '#EA4335' for cat in df_outros['Categoria'].unique()}
-        
-        if not df_2025.empty:
-            cores_2025 = ['#FFC107', '#FF9800', '#F57C00']
-            categorias_2025 = sorted(df_2025['Categoria'].unique())
-            for i, cat in enumerate(categorias_2025):
-                color_map[cat] = cores_2025[i % len(cores_2025)]
-
-        fig_bar = px.bar(df_graf, x='Categoria', y='Valor',
-                            text=df_graf['Valor'].apply(lambda x: f'{x/1_000_000:,.1f} M' if x >= 1_000_000 else f'{x/1_000:,.1f} K'),
-                            color='Categoria', color_discrete_map=color_map)
-        fig_bar.update_layout(title=f'Detalhe por Exercício e Faixa ({ano_atual_str})', showlegend=False, height=400)
-        fig_bar.update_traces(textposition='outside')
-        st.plotly_chart(fig_bar, use_container_width=True)
+    if not resultado.exercicio.empty:
+        grafico("exercicio", lambda: fig_exercicio(resultado.exercicio, resultado.cores_exercicio, resultado.ano_atual))
     else:
         st.info("Sem dados para gerar o gráfico de barras neste filtro.")
 
-    df_filt['Banco da empresa'] = df_filt['Banco da empresa'].fillna('').astype(str).str.strip()
-    resultado = []
-    for tipo, bancos in regra_tipo_cobranca.items():
-        if tipo == 'DIVERSOS':
-            mask = df_filt['Banco da empresa'].isin(bancos) | (df_filt['Banco da empresa'] == '')
-        else:
-            mask = df_filt['Banco da empresa'].isin(bancos)
-        soma = df_filt.loc[mask, 'Montante em moeda interna'].sum()
-        resultado.append({'Tipo de Cobrança': tipo, 'Valor': soma})
-    df_tipo_cobranca = pd.DataFrame(resultado)
-    df_tipo_cobranca = df_tipo_cobranca.sort_values('Valor', ascending=False)
-    df_tipo_cobranca['label_mk'] = df_tipo_cobranca['Valor'].apply(label_mk)
-    fig_cobranca = px.bar(
-        df_tipo_cobranca,
-        x='Valor',
-        y='Tipo de Cobrança',
-        orientation='h',
-        text='label_mk',
-        color_discrete_sequence=['#800020']
-    )
-    fig_cobranca.update_layout(
-        showlegend=False,
-        height=400,
-        title='',
-        xaxis_title="Valor (R$)",
-        yaxis_title="Tipo de Cobrança"
-    )
-    fig_cobranca.update_traces(textposition='outside')
     st.markdown("## Inadimplência por Tipo de Cobrança")
-    st.plotly_chart(fig_cobranca, use_container_width=True)
+    grafico("tipo_cobranca", lambda: fig_tipo_cobranca(resultado.tipo_cobranca))
 
     st.markdown("### Inadimplência por Região (3D Simulado)")
-    df_pie = df_inad.groupby('Região')['Montante em moeda interna'].sum().reset_index()
-    if not df_pie.empty:
-      fig_pie = px.pie(df_pie, names='Região', values='Montante em moeda interna',
-                        title='Participação por Região', hole=0.2)
-      fig_pie.update_traces(textposition='inside', textinfo='percent+label', pull=[0.05]*len(df_pie))
-      fig_pie.update_layout(title_font_size=16, height=600, width=800)
-      st.plotly_chart(fig_pie, use_container_width=True)
+    if not resultado.regiao.empty:
+      grafico("regiao", lambda: fig_regiao(resultado.regiao))
     else:
       st.info("Sem dados para o gráfico de participação por Região.")
 
-    with st.expander("Clique para ver o Resumo por Divisão"):
-        resumo = df_inad.groupby(col_div_princ)['Montante em moeda interna'].sum().reset_index()
-        resumo.rename(columns={col_div_princ: 'Divisão', 'Montante em moeda interna': 'Valor Inadimplente'}, inplace=True)
-        resumo = resumo.sort_values(by='Valor Inadimplente', ascending=False)
-        resumo['Valor Inadimplente'] = resumo['Valor Inadimplente'].apply(fmt)
-        st.dataframe(resumo, use_container_width=True, hide_index=True)
-
-    with st.expander("Clique para ver o Resumo por Cliente"):
-        if 'Nome 1' in df_inad.columns and not df_inad.empty:
-            
-            resumo_cli = df_inad.groupby('Nome 1').agg(
-                Valor_Inadimplente=('Montante em moeda interna', 'sum'),
-                Tipos_de_Cobranca=('Tipo de Cobrança Desc', lambda x: ', '.join(x.unique())),
-                Status=('Status', 'first') # Pega o status que já calculamos
-            ).reset_index()
-
-            resumo_cli.rename(columns={'Nome 1': 'Cliente'}, inplace=True)
-            
-            if tot_inad > 0:
-                resumo_cli['% do Total'] = resumo_cli['Valor_Inadimplente'] / tot_inad * 100
+    @st.fragment
+    def secao_divisao(resumo_divisao):
+        secao = st.expander("Clique para ver o Resumo por Divisão", key='secao_divisao', on_change="rerun")
+        if not secao.open:
+            return
+        with secao:
+            tabela_paginada(resumo_divisao, "resumo_divisao", ['Valor Inadimplente'], ordem='Valor Inadimplente')
+
+    secao_divisao(resultado.resumo_divisao)
+
+    @st.fragment
+    def secao_clientes(base, filtros):
+        secao = st.expander("Clique para ver o Resumo por Cliente", key='secao_clientes', on_change="rerun")
+        if not secao.open:
+            return
+        with secao:
+            resumo_cliente, top_clientes = em_cache("clientes", lambda: calcula_clientes(base, filtros))
+            if resumo_cliente is not None:
+                resumo = resumo_cliente.rename(columns={'Valor_Inadimplente': 'Valor Inadimplente', 'Tipos_de_Cobranca': 'Tipos de Cobrança'})
+                tabela_paginada(
+                    resumo[['Status', 'Cliente', 'Valor Inadimplente', 'Tipos de Cobrança', '% do Total']], "resumo_cliente",
+                    ['Valor Inadimplente'], ['% do Total'], ordem='Valor Inadimplente',
+                )
+
+                grafico("top_clientes", lambda: fig_top_clientes(top_clientes))
+
+            elif 'Nome 1' not in base.df.columns:
+                st.warning("Coluna 'Nome 1' não encontrada na base de dados.")
             else:
-                resumo_cli['% do Total'] = 0
-                
-            resumo_cli = resumo_cli.sort_values(by='Valor_Inadimplente', ascending=False)
-            
-            resumo_cli_fmt = resumo_cli.copy()
-            resumo_cli_fmt['Valor Inadimplente'] = resumo_cli_fmt['Valor_Inadimplente'].apply(fmt)
-            resumo_cli_fmt['% do Total'] = resumo_cli_fmt['% do Total'].apply(lambda x: f"{x:.2f}%")
-            resumo_cli_fmt.rename(columns={'Tipos_de_Cobranca': 'Tipos de Cobrança'}, inplace=True)
-            
-            st.dataframe(
-                resumo_cli_fmt[['Status', 'Cliente', 'Valor Inadimplente', 'Tipos de Cobrança', '% do Total']], 
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            top_n = resumo_cli.head(10).sort_values('Valor_Inadimplente')
-            top_n['label_mk'] = top_n['Valor_Inadimplente'].apply(label_mk)
-            fig_cli = px.bar(
-                top_n,
-                x='Valor_Inadimplente',
-                y='Cliente',
-                orientation='h',
-                text='label_mk',
-                color_discrete_sequence=["#0074D9"]
-            )
-            fig_cli.update_layout(
-                height=500,
-                yaxis_title='',
-                xaxis_title='Valor Inadimplente',
-                showlegend=False,
-                title='Top 10 Clientes Inadimplentes'
-            )
-            fig_cli.update_traces(textposition='outside')
-            st.plotly_chart(fig_cli, use_container_width=True)
-            
-        elif 'Nome 1' not in df_inad.columns:
-            st.warning("Coluna 'Nome 1' não encontrada na base de dados.")
-        else:
-            st.info("Nenhum cliente inadimplente para exibir.")
+                st.info("Nenhum cliente inadimplente para exibir.")
+
+    secao_clientes(base, filtros)
 
 
     # ==== GRAFICOS DE GAUGE USANDO HISTÓRICO DO GOOGLE DRIVE ====
-    def gauge_chart(percent, title):
-        fig = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = percent,
-            number = {'suffix': "%"},
-            title = {'text': title},
-            gauge = {
-                'axis': {'range': [0, 100]},
-                'bar': {'color': "#24292F"},
-                'steps' : [
-                    {'range': [0, 50], 'color': "#B03A2E"},
-                    {'range': [50, 80], 'color': "#F7DC6F"},
-                    {'range': [80, 100], 'color': "#1ABC9C"},
-                ],
-            }
-        ))
-        fig.update_layout(margin=dict(l=20, r=20, t=60, b=20), height=300)
-        return fig
-
-    if not df_inad.empty:
-      df_hist = load_hist_data(URL_HIST)
-      valor_quitado = 0
-      valor_novos_inad = 0
-      perc_recuperado = 0
-      perc_novos_inad = 0
-
-      if not df_hist.empty:
-          id_cols = ["Tipo de documento", "Referência", "Conta", "Divisão", "Banco da empresa", "Vencimento líquido"]
-          df_inad["ID"] = df_inad[id_cols].astype(str).agg("_".join, axis=1)
-          if "ID" not in df_hist.columns:
-              df_hist["ID"] = df_hist[id_cols].astype(str).agg("_".join, axis=1)
-          
-          antigos = set(df_hist["ID"])
-          novos = set(df_inad["ID"])
-          quitados = antigos - novos
-          novos_inad = novos - antigos
-          valor_quitado = df_hist[df_hist["ID"].isin(quitados)]["Montante em moeda interna"].sum()
-          valor_novos_inad = df_inad[df_inad["ID"].isin(novos_inad)]["Montante em moeda interna"].sum()
-          total_antigo = df_hist["Montante em moeda interna"].sum()
-          total_novo = df_inad["Montante em moeda interna"].sum()
-          perc_recuperado = (valor_quitado / total_antigo * 100) if total_antigo else 0
-          perc_novos_inad = (valor_novos_inad / total_novo * 100) if total_novo else 0
-
-      st.markdown("### Indicadores Dinâmicos de Inadimplência (Comparativo com a última versão dos dados)")
-      c1, c2 = st.columns(2)
-      with c1:
-          st.plotly_chart(gauge_chart(perc_recuperado, "Recuperação de Inadimplentes"), use_container_width=True)
-          st.markdown(f"**Valor Recuperado:** R$ {valor_quitado:,.2f}")
-      with c2:
-          st.plotly_chart(gauge_chart(perc_novos_inad, "Novos Inadimplentes"), use_container_width=True)
-          st.markdown(f"**Valor Novos Inadimplentes:** R$ {valor_novos_inad:,.2f}")
+    def tabela_titulos(df_titulos, nome):
+        colunas = [col for col in ID_COLS + ["Nome 1", "Montante em moeda interna"] if col in df_titulos.columns]
+        tabela_paginada(df_titulos[colunas], nome, ["Montante em moeda interna"], ordem="Montante em moeda interna")
+
+    @st.fragment
+    def secao_indicadores(base, filtros, data_comparacao, versao_hist, conteudo_hist):
+        # O histórico (planilha ou versão guardada) só é lido com a seção aberta.
+        st.markdown("### Indicadores Dinâmicos de Inadimplência (Comparativo com a última versão dos dados)")
+        secao = st.expander("Recuperação e novos inadimplentes", key='secao_indicadores', on_change="rerun")
+        if not secao.open:
+            return
+        snapshot_comparacao = store_padrao().em(data_comparacao) if data_comparacao is not None else None
+        if snapshot_comparacao is not None:
+            origem_hist = ("snapshot", snapshot_comparacao.hash)
+            carrega_hist = lambda: load_snapshot(snapshot_comparacao.hash)
+        else:
+            origem_hist = ("planilha", versao_hist)
+            carrega_hist = lambda: load_hist(versao_hist, conteudo_hist)
+        diff_hist = em_cache(("historico", origem_hist), lambda: calcula_historico(base, filtros, carrega_hist()))
+        valor_quitado = diff_hist.valor_quitado if diff_hist else 0
+        valor_novos_inad = diff_hist.valor_novos_inad if diff_hist else 0
+        perc_recuperado = diff_hist.perc_recuperado if diff_hist else 0
+        perc_novos_inad = diff_hist.perc_novos_inad if diff_hist else 0
+
+        with secao:
+            if snapshot_comparacao is not None:
+                st.caption(f"Comparando com a versão vigente em {data_comparacao.strftime('%d/%m/%Y')}.")
+            c1, c2 = st.columns(2)
+            with c1:
+                with span("grafico:gauge_recuperacao"):
+                    st.plotly_chart(gauge_chart(perc_recuperado, "Recuperação de Inadimplentes"), use_container_width=True)
+                st.markdown(f"**Valor Recuperado:** R$ {valor_quitado:,.2f}")
+            with c2:
+                with span("grafico:gauge_novos"):
+                    st.plotly_chart(gauge_chart(perc_novos_inad, "Novos Inadimplentes"), use_container_width=True)
+                st.markdown(f"**Valor Novos Inadimplentes:** R$ {valor_novos_inad:,.2f}")
+
+        if diff_hist is not None:
+            # Expanders não podem ser aninhados: os detalhes ficam logo abaixo da seção.
+            c1, c2 = st.columns(2)
+            with c1:
+                recuperados = st.expander(f"Títulos recuperados ({len(diff_hist.df_quitados)})", key='secao_recuperados', on_change="rerun")
+                if recuperados.open:
+                    with recuperados:
+                        tabela_titulos(diff_hist.df_quitados, "titulos_recuperados")
+            with c2:
+                novos = st.expander(f"Novos títulos inadimplentes ({len(diff_hist.df_novos_inad)})", key='secao_novos_inad', on_change="rerun")
+                if novos.open:
+                    with novos:
+                        tabela_titulos(diff_hist.df_novos_inad, "novos_inadimplentes")
+            mantidos = st.expander(f"Títulos que seguem inadimplentes ({len(diff_hist.df_mantidos)})", key='secao_mantidos', on_change="rerun")
+            if mantidos.open:
+                with mantidos:
+                    tabela_titulos(diff_hist.df_mantidos, "titulos_mantidos")
+
+    if resultado.n_titulos_inad:
+        secao_indicadores(base, filtros, data_comparacao, dados.versao_hist, dados.conteudo_hist)
+
+    if len(snapshots) >= 2:
+        st.markdown("### Tendência de Recuperação e Novos Inadimplentes")
+        st.caption("Carteira completa, cada versão guardada comparada com a anterior (sem os filtros da barra lateral).")
+        df_tendencia = load_tendencia(tuple(s.hash for s in snapshots))
+        with span("grafico:tendencia", linhas=len(df_tendencia)):
+            st.plotly_chart(fig_tendencia(df_tendencia), use_container_width=True)
+
+def tabela_spans(spans):
+    df_spans = pd.DataFrame(spans)
+    df_spans["Δ memória (MB)"] = df_spans["memoria_delta"] / 1024 ** 2
+    colunas_spans = [col for col in ["span", "ms", "linhas", "bytes", "Δ memória (MB)"] if col in df_spans.columns]
+    st.dataframe(df_spans[colunas_spans].round(2), use_container_width=True, hide_index=True)
+    return df_spans
+
+if spans_execucao is not None:
+    with st.sidebar.expander("Diagnóstico da última execução", expanded=True):
+        if spans_execucao:
+            df_spans = tabela_spans(spans_execucao)
+            st.caption(f"Total medido: {df_spans['ms'].sum():,.1f} ms em {len(df_spans)} spans.")
+        else:
+            st.caption("Nenhum span registrado nesta execução.")
+        # Downloads, leituras e montagem da base rodam no atualizador, fora das execuções da página.
+        if atualizador.ultima_medicao is not None:
+            inicio_atualizacao, spans_atualizacao = atualizador.ultima_medicao
+            st.markdown(f"**Última atualização dos dados** ({inicio_atualizacao:%d/%m/%Y %H:%M:%S})")
+            if spans_atualizacao:
+                tabela_spans(spans_atualizacao)
+            else:
+                st.caption("Nenhum span registrado nessa atualização.")
+        metricas = get_cache_resultados().metricas()
+        st.caption(
+            f"Cache de resultados: {metricas['acertos']} acerto(s), {metricas['falhas']} falha(s) "
+            f"({metricas['taxa_acerto']:.0%}) · {metricas['itens']} item(ns), "
+            f"{formata_bytes(metricas['bytes'])} de {formata_bytes(metricas['max_bytes'])} · "
+            f"{metricas['descartes']} descartado(s) por espaço, {metricas['invalidacoes']} por nova versão"
+        )
@@ -0,0 +1 @@
+# Rotinas de carga e cálculo do Dashboard de Inadimplência.
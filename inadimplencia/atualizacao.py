@@ -0,0 +1,154 @@
+import contextvars
+import logging
+import threading
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Optional
+
+import pandas as pd
+
+from inadimplencia.base import BaseEnriquecida, get_division_column_name
+from inadimplencia.carga import versao_dos_dados
+from inadimplencia.diagnostico import inicia_coleta, span
+from inadimplencia.incremental import DivergenciaIncremental, atualiza_base
+from inadimplencia.processos import monta_base_em_processo
+
+# Atualização em segundo plano (stale-while-revalidate): as sessões sempre leem a
+# versão vigente, que só é trocada depois que a nova está baixada, lida e com a
+# base enriquecida pronta. A troca é a atribuição de uma única referência.
+INTERVALO_ATUALIZACAO = 3600
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VersaoDados:
+    versao: str
+    df_original: pd.DataFrame
+    df_regiao: pd.DataFrame
+    conteudo_hist: object  # bytes da planilha de histórico ou a exceção do download
+    versao_hist: str
+    buscado_em: datetime
+    verificado_em: datetime
+    base: Optional[BaseEnriquecida] = None
+    data_base: Optional[date] = None
+
+
+def prepara_base(df_original, df_regiao, data_referencia, anterior=None, versao=None):
+    # Base enriquecida do dia, ou None se as planilhas não têm a coluna de divisão.
+    # Com a versão anterior do mesmo dia e o mesmo REGIAO, aplica só as diferenças;
+    # senão a base é montada no pool de processos.
+    if df_original.empty or df_regiao.empty:
+        return None
+    col_div_princ = get_division_column_name(df_original)
+    col_div_regiao = get_division_column_name(df_regiao)
+    if not col_div_princ or not col_div_regiao:
+        return None
+    if (
+        anterior is not None and anterior.base is not None and anterior.data_base == data_referencia
+        and anterior.base.col_div == col_div_princ and df_regiao.equals(anterior.df_regiao)
+    ):
+        try:
+            base = atualiza_base(anterior.base, df_original, df_regiao, col_div_regiao, data_referencia)
+        except DivergenciaIncremental as erro:
+            logger.warning("Atualização incremental divergiu da reconstrução completa (%s); usando a reconstrução.", erro)
+            base = None
+        if base is not None:
+            return base
+    chave = None if versao is None else ("base", versao, data_referencia, col_div_princ, col_div_regiao)
+    return monta_base_em_processo(df_original, df_regiao, col_div_princ, col_div_regiao, data_referencia, chave=chave)
+
+
+class Atualizador:
+    def __init__(self, carregar, intervalo=INTERVALO_ATUALIZACAO):
+        # `carregar()` devolve (versao, df_original, df_regiao, conteudo_hist), como carrega_fontes.
+        self._carregar = carregar
+        self.intervalo = intervalo
+        self._atual = None
+        self._lock = threading.Lock()
+        self._primeira_carga = threading.Lock()
+        self._thread = None
+        self._agendamento = None
+        self.ultimo_erro = None
+        # (início, spans) da última atualização, para o painel de diagnóstico.
+        self.ultima_medicao = None
+
+    @property
+    def atualizando(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def atual(self):
+        # Versão vigente. Só a primeira chamada do processo espera pela carga.
+        if self._atual is None:
+            with self._primeira_carga:
+                if self._atual is None:
+                    self._executa()
+        return self._atual
+
+    def solicita(self):
+        # Dispara uma atualização em segundo plano; não faz nada se já houver uma em curso.
+        with self._lock:
+            if self.atualizando:
+                return False
+            self._thread = threading.Thread(target=self._executa, name="inadimplencia-atualizacao", daemon=True)
+            self._thread.start()
+            return True
+
+    def inicia_agendamento(self):
+        with self._lock:
+            if self._agendamento is not None:
+                return
+            self._agendamento = threading.Thread(target=self._agenda, name="inadimplencia-agendamento", daemon=True)
+            self._agendamento.start()
+
+    def _agenda(self):
+        parar = threading.Event()
+        while not parar.wait(self.intervalo):
+            self.solicita()
+
+    def _executa(self):
+        # A atualização roda em outra thread (ou antes do coletor da página ser
+        # lido), então os seus spans ficam num coletor próprio, guardado com o horário.
+        contexto = contextvars.copy_context()
+        spans = contexto.run(inicia_coleta)
+        inicio = datetime.now()
+        try:
+            contexto.run(self._atualiza, inicio)
+        finally:
+            self.ultima_medicao = (inicio, spans)
+
+    def _atualiza(self, agora):
+        try:
+            with span("atualizacao"):
+                versao, df_original, df_regiao, conteudo_hist = self._carregar()
+        except Exception as erro:
+            self.ultimo_erro = f"{agora:%d/%m/%Y %H:%M:%S}: {erro}"
+            if self._atual is None:
+                raise
+            return
+
+        anterior = self._atual
+        if anterior is not None and df_original.empty and not anterior.df_original.empty:
+            # A planilha principal não veio: continua servindo a versão anterior.
+            self.ultimo_erro = f"{agora:%d/%m/%Y %H:%M:%S}: falha ao baixar a planilha principal"
+            return
+        self.ultimo_erro = None
+        versao_hist = versao_dos_dados(conteudo_hist)
+
+        if anterior is not None and anterior.versao == versao and anterior.data_base == agora.date():
+            self._atual = replace(anterior, verificado_em=agora, conteudo_hist=conteudo_hist, versao_hist=versao_hist)
+            return
+
+        base = prepara_base(df_original, df_regiao, agora.date(), anterior, versao=versao)
+        self._atual = VersaoDados(
+            versao=versao,
+            df_original=df_original,
+            df_regiao=df_regiao,
+            conteudo_hist=conteudo_hist,
+            versao_hist=versao_hist,
+            buscado_em=anterior.buscado_em if anterior is not None and anterior.versao == versao else agora,
+            verificado_em=agora,
+            base=base,
+            data_base=agora.date() if base is not None else None,
+        )
@@ -0,0 +1,215 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from inadimplencia.chaves import hash_linhas
+from inadimplencia.classificacao import classifica_exercicio, classifica_faixa, classifica_prazo
+from inadimplencia.cubo import monta_cubo
+from inadimplencia.diagnostico import span
+from inadimplencia.esquema import aplica_esquema, memoria
+
+# Base enriquecida: tudo o que depende só da versão dos dados (e do dia de
+# referência) é calculado uma vez aqui; a cada rerun a página só monta máscaras.
+REGRA_TIPO_COBRANCA = {
+    'COBRANÇA JURÍDICA':  ['060', '60', '005', '5', '888'],
+    'COBRANÇA BANCÁRIA':   ['237', '341C', '033', '001'],
+    'CARTEIRA':           ['999'],
+    'PERMUTA':            ['096', '96'],
+    'COBRANÇA PROTESTADO': ['087', '87'],
+    'ANÁLISE PROCESSO':   ['007', '7', '020', '20', '022', '22'],
+    'COBR. TERCERIZADA':  ['899'],
+    'DIVERSOS':           ['991', '026', '26', '990', '006', '6', '']
+}
+
+ORDEM_GRAVIDADE = [
+    'COBRANÇA JURÍDICA', 'COBRANÇA PROTESTADO', 'ANÁLISE PROCESSO', 'COBR. TERCERIZADA',
+    'COBRANÇA BANCÁRIA', 'CARTEIRA', 'PERMUTA', 'DIVERSOS'
+]
+MAPA_GRAVIDADE_SIMBOLO = {
+    'COBRANÇA JURÍDICA': '🔴', 'COBRANÇA PROTESTADO': '🔴', 'ANÁLISE PROCESSO': '🟡',
+    'COBR. TERCERIZADA': '🟡', 'COBRANÇA BANCÁRIA': '🔵', 'CARTEIRA': '🔵', 'PERMUTA': '⚪', 'DIVERSOS': '⚪'
+}
+LISTA_STATUS = ['🔴', '🟡', '🔵', '⚪']
+# Símbolo de cada posição de ORDEM_GRAVIDADE; a última entrada (None) é a dos
+# clientes sem título vencido.
+SIMBOLO_POR_GRAVIDADE = np.array([MAPA_GRAVIDADE_SIMBOLO[tipo] for tipo in ORDEM_GRAVIDADE] + [None], dtype=object)
+
+REGIAO_NAO_DEFINIDA = 'Não definida'
+
+
+@dataclass(frozen=True)
+class BaseEnriquecida:
+    df: pd.DataFrame
+    cubo: pd.DataFrame
+    col_div: str
+    soma_bruta: float
+    soma_apos_merge: float
+    divisoes_sem_regiao: list = field(default_factory=list)
+    lista_regioes: list = field(default_factory=list)
+    lista_divisoes: list = field(default_factory=list)
+    lista_exercicios: list = field(default_factory=list)
+    memoria_antes: int = 0
+    memoria_depois: int = 0
+    # Dia de referência e hash de cada linha da planilha de origem (na ordem de
+    # `df`), usados para aplicar só as diferenças de uma nova versão.
+    data_referencia: Optional[date] = None
+    hashes: Optional[np.ndarray] = None
+
+
+def get_division_column_name(df):
+    if 'Divisao' in df.columns:
+        return 'Divisao'
+    elif 'Divisão' in df.columns:
+        return 'Divisão'
+    else:
+        return None
+
+
+def gravidade(tipos_desc):
+    # Posição de cada tipo de cobrança em ORDEM_GRAVIDADE (0 = mais grave).
+    codigos = pd.Categorical(tipos_desc, categories=ORDEM_GRAVIDADE).codes
+    return np.where(codigos < 0, len(ORDEM_GRAVIDADE) - 1, codigos).astype(np.int8)
+
+
+def status_clientes(clientes, gravidades, vencido):
+    # Status de cada linha = símbolo do tipo mais grave entre os títulos vencidos
+    # do cliente; None para clientes sem título vencido ou sem nome.
+    codigos, _ = pd.factorize(clientes)
+    selecao = vencido & (codigos >= 0)
+    pior = pd.Series(gravidades[selecao]).groupby(codigos[selecao]).min()
+    pior_por_cliente = np.full(codigos.max() + 2, len(ORDEM_GRAVIDADE), dtype=np.int8)
+    pior_por_cliente[pior.index.to_numpy()] = pior.to_numpy()
+    # O código -1 (sem nome) cai na última posição, que fica sem título vencido.
+    return SIMBOLO_POR_GRAVIDADE[pior_por_cliente[codigos]]
+
+
+def junta_regiao(df_original, df_regiao, col_div_princ, col_div_regiao):
+    df_original = df_original.copy()
+    df_original[col_div_princ] = df_original[col_div_princ].astype(str)
+    df_regiao = df_regiao.copy()
+    df_regiao[col_div_regiao] = df_regiao[col_div_regiao].astype(str)
+    df_regiao = df_regiao.drop_duplicates(subset=[col_div_regiao])
+    return pd.merge(df_original, df_regiao, on=col_div_princ, how="left")
+
+
+def classifica_titulos(df, hoje):
+    # Acrescenta Exercicio, dias de atraso, Faixa, Prazo e os indicadores de vencimento.
+    df["Exercicio"] = classifica_exercicio(df["Data do documento"], hoje)
+    df['Região'] = df['Região'].fillna(REGIAO_NAO_DEFINIDA)
+    df["Dias de atraso"] = (hoje - df["Vencimento líquido"]).dt.days
+    df["Faixa"] = classifica_faixa(df["Exercicio"], df["Dias de atraso"], hoje)
+    df["Prazo"] = classifica_prazo(df["Dias de atraso"])
+    df["Vencido"] = df["Dias de atraso"] >= 1
+    df["Ultimos 10 dias"] = df["Dias de atraso"].between(1, 10)
+    return df
+
+
+def mapeia_cobranca(df):
+    # Acrescenta o tipo de cobrança de cada título e o Status do cliente.
+    mapa_banco_para_tipo = {banco: tipo for tipo, bancos in REGRA_TIPO_COBRANCA.items() for banco in bancos}
+    df['Tipo de Cobrança Desc'] = df['Banco da empresa'].astype(str).map(mapa_banco_para_tipo).fillna('DIVERSOS')
+    # Classificação usada no gráfico por tipo de cobrança: bancos vazios contam como
+    # DIVERSOS e bancos fora da regra ficam sem tipo.
+    banco = df['Banco da empresa'].astype(object).fillna('').astype(str).str.strip()
+    df['Tipo de Cobrança'] = banco.map(mapa_banco_para_tipo)
+
+    df['Gravidade'] = gravidade(df['Tipo de Cobrança Desc'])
+
+    # Status do cliente: o tipo de cobrança mais grave entre os seus títulos vencidos.
+    # Vale para a visão sem filtros de linha; com eles, calculo.filtra_base o
+    # recalcula só sobre os títulos filtrados.
+    vencido = (df["Dias de atraso"] >= 1).to_numpy()
+    if 'Nome 1' in df.columns and vencido.any():
+        df['Status'] = status_clientes(df['Nome 1'], df['Gravidade'].to_numpy(), vencido)
+    else:
+        df['Status'] = None
+    return df
+
+
+def monta_base(df_original, df_regiao, col_div_princ, col_div_regiao, hoje):
+    # `hoje` é uma data; os dias de atraso são contados a partir da meia-noite dela.
+    data_referencia = hoje
+    hoje = datetime.combine(hoje, time())
+    soma_bruta = df_original["Montante em moeda interna"].sum()
+
+    with span("merge_regiao", linhas=len(df_original)):
+        df = junta_regiao(df_original, df_regiao, col_div_princ, col_div_regiao)
+    divisoes_sem_regiao = df[df['Região'].isnull()][col_div_princ].unique().tolist()
+    soma_apos_merge = df["Montante em moeda interna"].sum()
+
+    with span("classificacao", linhas=len(df)):
+        df = classifica_titulos(df, hoje)
+    with span("cobranca_status", linhas=len(df)):
+        df = mapeia_cobranca(df)
+
+    lista_regioes = sorted(df['Região'].unique())
+    lista_divisoes = sorted(df[col_div_princ].unique())
+    lista_exercicios = sorted(df['Exercicio'].unique())
+
+    memoria_antes = memoria(df)
+    with span("esquema", linhas=len(df)):
+        df = aplica_esquema(df)
+    with span("cubo", linhas=len(df)) as medida:
+        cubo = monta_cubo(df, col_div_princ)
+        medida.anota(celulas=len(cubo))
+
+    return BaseEnriquecida(
+        df=df,
+        cubo=cubo,
+        col_div=col_div_princ,
+        soma_bruta=soma_bruta,
+        soma_apos_merge=soma_apos_merge,
+        divisoes_sem_regiao=divisoes_sem_regiao,
+        lista_regioes=lista_regioes,
+        lista_divisoes=lista_divisoes,
+        lista_exercicios=lista_exercicios,
+        memoria_antes=memoria_antes,
+        memoria_depois=memoria(df),
+        data_referencia=data_referencia,
+        hashes=hash_linhas(df_original),
+    )
+
+
+def grupos_divisoes(base, df_regiao, col_div_regiao):
+    # Divisões da base com a região e o nome do cadastro (REGIAO.xlsx), ordenadas
+    # por região e divisão: as opções do seletor de divisões.
+    grupos = base.cubo[[base.col_div, 'Região']].drop_duplicates(subset=[base.col_div]).astype(str)
+    grupos.columns = ['Divisão', 'Região']
+    if 'Nome' in df_regiao.columns:
+        cadastro = df_regiao.assign(**{col_div_regiao: df_regiao[col_div_regiao].astype(str)})
+        nomes = cadastro.drop_duplicates(subset=[col_div_regiao]).set_index(col_div_regiao)['Nome']
+        grupos['Nome'] = grupos['Divisão'].map(nomes).fillna('').astype(str)
+    else:
+        grupos['Nome'] = ''
+    return grupos.sort_values(['Região', 'Divisão']).reset_index(drop=True)
+
+
+def pertence(serie, valores):
+    # Equivale a serie.isin(valores). Em colunas categóricas o teste é feito nos
+    # códigos: uma tabela com uma posição por categoria (e uma a mais, falsa, para
+    # o código -1 dos vazios), indexada pelo código de cada linha.
+    valores = list(valores)
+    if not isinstance(serie.dtype, pd.CategoricalDtype) or any(pd.isna(valor) for valor in valores):
+        return serie.isin(valores).to_numpy()
+    categorias = serie.cat.categories
+    tabela = np.zeros(len(categorias) + 1, dtype=bool)
+    indices = categorias.get_indexer(valores)
+    tabela[indices[indices >= 0]] = True
+    return tabela[serie.cat.codes.to_numpy()]
+
+
+def mascara_filtros(df, col_div, regiao=None, divisoes=None, exercicios=None, ultimos_10_dias=False):
+    # Serve tanto para as linhas da base quanto para as células do cubo.
+    mascara = np.ones(len(df), dtype=bool)
+    if regiao is not None:
+        mascara &= (df['Região'] == regiao).to_numpy()
+    if divisoes is not None:
+        mascara &= pertence(df[col_div], divisoes)
+    if exercicios is not None:
+        mascara &= pertence(df['Exercicio'], exercicios)
+    if ultimos_10_dias:
+        mascara &= df['Ultimos 10 dias'].to_numpy()
+    return mascara
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from inadimplencia.diagnostico import span
+from inadimplencia.processos import parse_em_processo
+
+# Cache em disco das planilhas já lidas e tipadas, no formato Arrow IPC (sem
+# compressão), para que o arquivo possa ser mapeado em memória na releitura.
+CACHE_DIR = Path(os.environ.get("INADIMPLENCIA_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MAX_IDADE = 7 * 24 * 3600
+
+# Incrementar quando a forma de ler/tipar as planilhas mudar, para invalidar o cache.
+VERSAO_FORMATO = "3"
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def normalizar_para_arrow(df):
+    # Colunas do Excel com tipos misturados (ex.: "Banco da empresa" com 237 e "341C")
+    # não são aceitas pelo Arrow; os valores viram texto e os vazios são mantidos.
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class CacheLocal:
+    def __init__(self, diretorio=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_idade=CACHE_MAX_IDADE):
+        self.diretorio = Path(diretorio)
+        self.max_bytes = max_bytes
+        self.max_idade = max_idade
+
+    def _caminho(self, tipo, chave):
+        return self.diretorio / f"{tipo}-{VERSAO_FORMATO}-{chave}.arrow"
+
+    def ler(self, tipo, chave):
+        caminho = self._caminho(tipo, chave)
+        try:
+            tabela = feather.read_table(caminho, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        # Atualiza o mtime para que a remoção por tamanho descarte primeiro os menos usados.
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        return tabela.to_pandas()
+
+    def gravar(self, tipo, chave, df):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self._caminho(tipo, chave)
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            feather.write_feather(df, temporario, compression="uncompressed")
+            os.replace(temporario, caminho)
+        except (OSError, pa.ArrowException):
+            temporario.unlink(missing_ok=True)
+            return
+        self.limpar()
+
+    def _entradas(self):
+        # Cada entrada é removida inteira: um .arrow, ou o corpo (.bin) e os
+        # validadores (.json) de uma URL baixada, em http/ (ver fontes.baixar).
+        http = self.diretorio / "http"
+        grupos = {}
+        for caminho in [*self.diretorio.glob("*.arrow"), *http.glob("*.bin"), *http.glob("*.json")]:
+            grupos.setdefault(caminho.with_suffix(""), []).append(caminho)
+        return grupos.values()
+
+    def limpar(self):
+        if not self.diretorio.exists():
+            return
+        agora = time.time()
+        entradas = []
+        for caminhos in self._entradas():
+            infos = []
+            for caminho in caminhos:
+                try:
+                    infos.append(caminho.stat())
+                except FileNotFoundError:
+                    continue
+            if not infos:
+                continue
+            mtime = max(info.st_mtime for info in infos)
+            if agora - mtime > self.max_idade:
+                for caminho in caminhos:
+                    caminho.unlink(missing_ok=True)
+            else:
+                entradas.append((mtime, sum(info.st_size for info in infos), caminhos))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminhos in sorted(entradas, key=lambda entrada: entrada[0]):
+            if total <= self.max_bytes:
+                break
+            for caminho in caminhos:
+                caminho.unlink(missing_ok=True)
+            total -= tamanho
+
+
+_cache_padrao = None
+
+
+def cache_padrao():
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheLocal()
+    return _cache_padrao
+
+
+def ler_planilha(conteudo, tipo, parse, cache=None):
+    # Devolve o DataFrame da planilha; se os bytes baixados forem os mesmos de uma
+    # leitura anterior, o resultado vem do cache em disco sem passar pelo openpyxl.
+    # A leitura do XLSX roda no pool de processos; sessões que pedem os mesmos
+    # bytes ao mesmo tempo compartilham o job.
+    cache = cache or cache_padrao()
+    with span(f"parse:{tipo}", bytes=len(conteudo)) as medida:
+        chave = hash_conteudo(conteudo)
+        df = cache.ler(tipo, chave)
+        if df is not None:
+            medida.anota(cache=True, linhas=len(df))
+            return df
+        df = parse_em_processo(parse, conteudo, chave=("parse", tipo, chave))
+        medida.anota(cache=False, linhas=len(df))
+    cache.gravar(tipo, chave, df)
+    return df
@@ -0,0 +1,330 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from inadimplencia.base import LISTA_STATUS, REGRA_TIPO_COBRANCA, mascara_filtros, status_clientes
+from inadimplencia.chaves import DiffHistorico, compara_historico
+from inadimplencia.cubo import COL_QUANTIDADE, monta_cubo
+from inadimplencia.diagnostico import span
+
+# Cálculo do dashboard sem Streamlit: recebe a base enriquecida, os filtros e a
+# data de referência e devolve todas as tabelas e KPIs que a página mostra.
+# As seções em SECOES dependem das linhas (não só do cubo) e podem ficar de fora
+# do cálculo principal; a página as calcula à parte, quando o expander é aberto.
+SECOES = ("antecipada", "clientes", "historico")
+FORMAS_PGTO_ANTECIPADA = ["H", "R"]
+COR_EXERCICIO_ANTERIOR = '#EA4335'
+CORES_EXERCICIO_ATUAL = ['#FFC107', '#FF9800', '#F57C00']
+
+
+@dataclass(frozen=True)
+class Filtros:
+    # None = sem filtro; uma tupla vazia não seleciona nada.
+    regiao: Optional[str] = None
+    divisoes: Optional[tuple] = None
+    exercicios: Optional[tuple] = None
+    status: Optional[tuple] = None
+    ultimos_10_dias: bool = False
+
+
+@dataclass(frozen=True)
+class DashboardResult:
+    filtros: Filtros
+    ano_atual: str
+    soma_bruta: float
+    tot_inad: float
+    soma_frmpgto_HR: float
+    n_titulos_inad: int
+    antecipada_filial: Optional[pd.DataFrame]
+    antecipada_cliente: Optional[pd.DataFrame]
+    pivot: Optional[pd.DataFrame]
+    exercicio: pd.DataFrame
+    cores_exercicio: dict
+    tipo_cobranca: pd.DataFrame
+    regiao: pd.DataFrame
+    resumo_divisao: pd.DataFrame
+    resumo_cliente: Optional[pd.DataFrame]
+    top_clientes: Optional[pd.DataFrame]
+    historico: Optional[DiffHistorico]
+
+
+def filtra_base(base, filtros, linhas=True):
+    # Devolve (linhas inadimplentes, células do cubo filtradas, células inadimplentes).
+    # Com linhas=False só o cubo é filtrado e a primeira posição é None.
+    #
+    # O Status de um cliente é o tipo de cobrança mais grave entre os títulos
+    # vencidos dele que passam pelos filtros de região, divisão, exercício e
+    # últimos 10 dias, os mesmos de onde saem os tipos de cobrança da tabela de
+    # clientes. Sem esses filtros ele é o Status da base, que está no cubo; com
+    # eles, é recalculado sobre as linhas filtradas. Marcar todos os Status só
+    # exclui os títulos sem cliente, o que o cubo também responde; um Status
+    # parcial com filtros de linha exige as linhas, e as células vêm delas.
+    df_base, cubo = base.df, base.cubo
+    criterios = dict(
+        regiao=filtros.regiao,
+        divisoes=filtros.divisoes,
+        exercicios=filtros.exercicios,
+        ultimos_10_dias=filtros.ultimos_10_dias,
+    )
+    mascara_cubo = mascara_filtros(cubo, base.col_div, **criterios)
+    mascara_cubo_inad = mascara_cubo & cubo["Vencido"].to_numpy()
+    # Toda linha inadimplente cai em alguma célula do cubo, então o teste vale para as duas.
+    filtra_status = bool(filtros.status) and mascara_cubo_inad.any()
+    recalcula_status = 'Nome 1' in df_base.columns and any(
+        valor not in (None, False) for valor in criterios.values()
+    )
+    status_parcial = filtra_status and recalcula_status and not set(LISTA_STATUS) <= set(filtros.status)
+    if filtra_status and not status_parcial:
+        mascara_cubo_inad &= cubo['Status'].isin(filtros.status).to_numpy()
+    if not linhas and not status_parcial:
+        return None, cubo[mascara_cubo], cubo[mascara_cubo_inad]
+
+    mascara_inad = mascara_filtros(df_base, base.col_div, **criterios) & df_base["Vencido"].to_numpy()
+    if not recalcula_status:
+        if filtra_status:
+            mascara_inad &= df_base['Status'].isin(filtros.status).to_numpy()
+        return df_base[mascara_inad], cubo[mascara_cubo], cubo[mascara_cubo_inad]
+
+    df_inad = df_base[mascara_inad]
+    if not df_inad.empty:
+        status = status_clientes(df_inad['Nome 1'], df_inad['Gravidade'].to_numpy(), np.ones(len(df_inad), dtype=bool))
+        df_inad = df_inad.assign(Status=pd.Categorical(status, categories=LISTA_STATUS))
+    if filtra_status:
+        df_inad = df_inad[df_inad['Status'].isin(filtros.status).to_numpy()]
+    if status_parcial:
+        return df_inad, cubo[mascara_cubo], monta_cubo(df_inad, base.col_div)
+    return df_inad, cubo[mascara_cubo], cubo[mascara_cubo_inad]
+
+
+def resumo_antecipada(df_inad, cubo_inad, col_div):
+    if "FrmPgto" not in cubo_inad.columns:
+        return None, None
+    resumo_filial = (
+        cubo_inad[cubo_inad["FrmPgto"].isin(FORMAS_PGTO_ANTECIPADA)].groupby(col_div, observed=True)["Montante em moeda interna"]
+        .sum()
+        .reset_index()
+        .rename(columns={col_div: 'Filial', 'Montante em moeda interna': 'Venda Antecipada Inadimplente'})
+        .sort_values(by='Venda Antecipada Inadimplente', ascending=False)
+    )
+    if 'Nome 1' not in df_inad.columns:
+        return resumo_filial, None
+    df_antecipada = df_inad[df_inad["FrmPgto"].isin(FORMAS_PGTO_ANTECIPADA)]
+    resumo_cli = (
+        df_antecipada.groupby('Nome 1', observed=True)["Montante em moeda interna"]
+        .sum()
+        .reset_index()
+        .rename(columns={'Nome 1': 'Cliente', 'Montante em moeda interna': 'Venda Antecipada Inadimplente'})
+        .sort_values(by='Venda Antecipada Inadimplente', ascending=False)
+    )
+    return resumo_filial, resumo_cli
+
+
+def quadro_detalhado(cubo_inad):
+    if cubo_inad.empty:
+        return None
+    return pd.pivot_table(cubo_inad, index=["Exercicio", "Faixa"],
+                          values="Montante em moeda interna", columns="Prazo",
+                          aggfunc="sum", fill_value=0, margins=True, margins_name="Total Geral", observed=True).reset_index()
+
+
+def resumo_exercicio(cubo_inad, ano_atual_str):
+    # Exercícios anteriores somados por ano; o exercício corrente aberto por faixa.
+    df_outros = cubo_inad[cubo_inad['Exercicio'] != ano_atual_str]
+    df_outros = df_outros.groupby('Exercicio', observed=True)['Montante em moeda interna'].sum().reset_index()
+    df_outros.rename(columns={'Exercicio': 'Categoria', 'Montante em moeda interna': 'Valor'}, inplace=True)
+
+    df_atual = cubo_inad[cubo_inad['Exercicio'] == ano_atual_str]
+
+    if not df_atual.empty:
+        df_atual = df_atual.groupby('Faixa', observed=True)['Montante em moeda interna'].sum().reset_index()
+        df_atual = df_atual[df_atual['Faixa'] != '']
+        df_atual['Categoria'] = f'{ano_atual_str} - ' + df_atual['Faixa'].astype(str)
+        df_atual.rename(columns={'Montante em moeda interna': 'Valor'}, inplace=True)
+        df_graf = pd.concat([df_outros, df_atual[['Categoria', 'Valor']]], ignore_index=True)
+    else:
+        df_graf = df_outros
+
+    color_map = {cat: COR_EXERCICIO_ANTERIOR for cat in df_outros['Categoria'].unique()}
+    if not df_atual.empty:
+        categorias_atual = sorted(df_atual['Categoria'].unique())
+        for i, cat in enumerate(categorias_atual):
+            color_map[cat] = CORES_EXERCICIO_ATUAL[i % len(CORES_EXERCICIO_ATUAL)]
+    return df_graf, color_map
+
+
+def resumo_tipo_cobranca(cubo_filt):
+    soma_por_tipo = cubo_filt.groupby('Tipo de Cobrança', observed=True)['Montante em moeda interna'].sum()
+    resultado = [{'Tipo de Cobrança': tipo, 'Valor': soma_por_tipo.get(tipo, 0.0)} for tipo in REGRA_TIPO_COBRANCA]
+    return pd.DataFrame(resultado).sort_values('Valor', ascending=False)
+
+
+def resumo_regiao(cubo_inad):
+    return cubo_inad.groupby('Região', observed=True)['Montante em moeda interna'].sum().reset_index()
+
+
+def resumo_divisao(cubo_inad, col_div):
+    resumo = cubo_inad.groupby(col_div, observed=True)['Montante em moeda interna'].sum().reset_index()
+    resumo.rename(columns={col_div: 'Divisão', 'Montante em moeda interna': 'Valor Inadimplente'}, inplace=True)
+    return resumo.sort_values(by='Valor Inadimplente', ascending=False)
+
+
+def resumo_cliente(df_inad, tot_inad):
+    if 'Nome 1' not in df_inad.columns or df_inad.empty:
+        return None
+    resumo_cli = df_inad.groupby('Nome 1', observed=True).agg(
+        Valor_Inadimplente=('Montante em moeda interna', 'sum'),
+        Status=('Status', 'first') # Status dos títulos filtrados (filtra_base)
+    ).reset_index()
+
+    resumo_cli.rename(columns={'Nome 1': 'Cliente'}, inplace=True)
+
+    if tot_inad > 0:
+        resumo_cli['% do Total'] = resumo_cli['Valor_Inadimplente'] / tot_inad * 100
+    else:
+        resumo_cli['% do Total'] = 0
+
+    return resumo_cli.sort_values(by='Valor_Inadimplente', ascending=False)
+
+
+def tipos_cobranca_clientes(resumo_cli, df_inad):
+    # Acrescenta a coluna de texto "Tipos_de_Cobranca" (tipos na ordem em que
+    # aparecem nos títulos) apenas para os clientes presentes em `resumo_cli`.
+    resumo_cli = resumo_cli.copy()
+    titulos = df_inad[df_inad['Nome 1'].isin(resumo_cli['Cliente'])]
+    pares = titulos[['Nome 1', 'Tipo de Cobrança Desc']].drop_duplicates()
+    clientes, nomes = pd.factorize(pares['Nome 1'])
+    tipos = pares['Tipo de Cobrança Desc'].astype(str).to_numpy(dtype=object)
+    posicao = pares.groupby('Nome 1', observed=True, sort=False).cumcount().to_numpy()
+
+    # Cada cliente tem no máximo um par por posição, então a concatenação é feita
+    # em uma passada por posição (no máximo uma por tipo de cobrança).
+    texto = np.full(len(nomes), '', dtype=object)
+    for k in range(posicao.max() + 1 if len(posicao) else 0):
+        selecao = posicao == k
+        texto[clientes[selecao]] += (', ' if k else '') + tipos[selecao]
+    mapa_texto = pd.Series(texto, index=pd.Index(nomes, dtype=object))
+    resumo_cli.insert(2, 'Tipos_de_Cobranca', resumo_cli['Cliente'].astype(object).map(mapa_texto))
+    return resumo_cli
+
+
+def clientes_inadimplentes(df_inad, tot_inad):
+    # (resumo por cliente com os tipos de cobrança, 10 maiores) ou (None, None).
+    resumo_cli = resumo_cliente(df_inad, tot_inad)
+    if resumo_cli is None:
+        return None, None
+    resumo_cli = tipos_cobranca_clientes(resumo_cli, df_inad)
+    return resumo_cli, resumo_cli.head(10).sort_values('Valor_Inadimplente')
+
+
+def pagina_tabela(df, coluna, crescente, inicio, tamanho):
+    # Linhas [inicio, inicio + tamanho) de `df` ordenado por `coluna` (ordenação
+    # estável, empates na ordem original). Em colunas numéricas sem vazios só as
+    # primeiras inicio + tamanho linhas são ordenadas (nlargest/nsmallest). As
+    # categorias sem uso na página são descartadas, para não irem junto ao navegador.
+    fim = inicio + tamanho
+    serie = df[coluna]
+    if fim < len(df) and pd.api.types.is_numeric_dtype(serie) and not serie.hasnans:
+        topo = df.nsmallest(fim, coluna, keep="first") if crescente else df.nlargest(fim, coluna, keep="first")
+    else:
+        topo = df.sort_values(coluna, ascending=crescente, kind="stable")
+    pagina = topo.iloc[inicio:fim]
+    categoricas = [col for col in pagina.columns if isinstance(pagina[col].dtype, pd.CategoricalDtype)]
+    if categoricas:
+        pagina = pagina.assign(**{col: pagina[col].cat.remove_unused_categories() for col in categoricas})
+    return pagina
+
+
+def _linhas_filtradas(base, filtros):
+    with span("filtro", linhas=len(base.df)) as medida:
+        df_inad, _, cubo_inad = filtra_base(base, filtros)
+        medida.anota(linhas_inad=len(df_inad), celulas_inad=len(cubo_inad))
+    return df_inad, cubo_inad
+
+
+def calcula_antecipada(base, filtros):
+    # Seção "antecipada" isolada: (resumo por filial, resumo por cliente).
+    df_inad, cubo_inad = _linhas_filtradas(base, filtros)
+    with span("resumo_antecipada"):
+        return resumo_antecipada(df_inad, cubo_inad, base.col_div)
+
+
+def calcula_clientes(base, filtros):
+    # Seção "clientes" isolada: (resumo por cliente, 10 maiores).
+    df_inad, cubo_inad = _linhas_filtradas(base, filtros)
+    with span("resumo_cliente", linhas=len(df_inad)):
+        return clientes_inadimplentes(df_inad, cubo_inad["Montante em moeda interna"].sum())
+
+
+def calcula_historico(base, filtros, df_hist):
+    # Seção "historico" isolada: DiffHistorico, ou None sem histórico ou sem inadimplência.
+    if df_hist is None or df_hist.empty:
+        return None
+    df_inad, _ = _linhas_filtradas(base, filtros)
+    if df_inad.empty:
+        return None
+    with span("diff_historico", linhas=len(df_inad) + len(df_hist)):
+        return compara_historico(df_inad, df_hist)
+
+
+def compute_dashboard(base, filtros, as_of, df_hist=None, secoes=SECOES):
+    # Seções fora de `secoes` ficam None no resultado; sem nenhuma delas, as
+    # linhas da base nem são filtradas e tudo sai do cubo.
+    ano_atual_str = str(as_of.year)
+    usa_linhas = any(secao in secoes for secao in SECOES)
+    with span("filtro", linhas=len(base.df)) as medida:
+        df_inad, cubo_filt, cubo_inad = filtra_base(base, filtros, linhas=usa_linhas)
+        medida.anota(linhas_inad=None if df_inad is None else len(df_inad), celulas_inad=len(cubo_inad))
+
+    with span("kpis"):
+        tot_inad = cubo_inad["Montante em moeda interna"].sum()
+        if "FrmPgto" in cubo_inad.columns:
+            soma_frmpgto_HR = cubo_inad[cubo_inad["FrmPgto"].isin(FORMAS_PGTO_ANTECIPADA)]["Montante em moeda interna"].sum()
+        else:
+            soma_frmpgto_HR = 0
+
+    antecipada_filial = antecipada_cliente = None
+    if "antecipada" in secoes:
+        with span("resumo_antecipada"):
+            antecipada_filial, antecipada_cliente = resumo_antecipada(df_inad, cubo_inad, base.col_div)
+    with span("quadro_detalhado", linhas=len(cubo_inad)):
+        pivot = quadro_detalhado(cubo_inad)
+    with span("resumo_exercicio"):
+        df_graf, cores_exercicio = resumo_exercicio(cubo_inad, ano_atual_str)
+    with span("resumo_tipo_cobranca", linhas=len(cubo_filt)):
+        tipo_cobranca = resumo_tipo_cobranca(cubo_filt)
+    with span("resumo_regiao"):
+        regiao = resumo_regiao(cubo_inad)
+    with span("resumo_divisao"):
+        resumo_div = resumo_divisao(cubo_inad, base.col_div)
+
+    resumo_cli = top_clientes = None
+    if "clientes" in secoes:
+        with span("resumo_cliente", linhas=len(df_inad)):
+            resumo_cli, top_clientes = clientes_inadimplentes(df_inad, tot_inad)
+
+    historico = None
+    if "historico" in secoes and df_hist is not None and not df_hist.empty and not df_inad.empty:
+        with span("diff_historico", linhas=len(df_inad) + len(df_hist)):
+            historico = compara_historico(df_inad, df_hist)
+
+    return DashboardResult(
+        filtros=filtros,
+        ano_atual=ano_atual_str,
+        soma_bruta=base.soma_bruta,
+        tot_inad=tot_inad,
+        soma_frmpgto_HR=soma_frmpgto_HR,
+        n_titulos_inad=int(cubo_inad[COL_QUANTIDADE].sum()),
+        antecipada_filial=antecipada_filial,
+        antecipada_cliente=antecipada_cliente,
+        pivot=pivot,
+        exercicio=df_graf,
+        cores_exercicio=cores_exercicio,
+        tipo_cobranca=tipo_cobranca,
+        regiao=regiao,
+        resumo_divisao=resumo_div,
+        resumo_cliente=resumo_cli,
+        top_clientes=top_clientes,
+        historico=historico,
+    )
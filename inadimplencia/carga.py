@@ -0,0 +1,93 @@
+import pandas as pd
+import pyarrow as pa
+
+from inadimplencia.cache_local import hash_conteudo, ler_planilha
+from inadimplencia.esquema import aplica_esquema
+from inadimplencia.fontes import baixar_fontes
+from inadimplencia.leitura import le_xlsx
+from inadimplencia.snapshots import store_padrao
+
+# Download e leitura das planilhas de origem, sem dependência do Streamlit.
+
+
+# Colunas da exportação de títulos usadas pelo painel (as demais não são lidas)
+# e o tipo de cada uma; None deixa o tipo ser inferido. Textos como "Banco da
+# empresa", que misturam 237 e "341C", são lidos sempre como texto.
+COLUNAS_TITULOS = {
+    "Tipo de documento": str,
+    "Referência": None,
+    "Conta": None,
+    "Divisão": str,
+    "Divisao": str,
+    "Nome 1": str,
+    "Banco da empresa": str,
+    "FrmPgto": str,
+    "Data do documento": None,
+    "Vencimento líquido": None,
+    "Montante em moeda interna": "float64",
+}
+COLUNAS_DATA = ["Data do documento", "Vencimento líquido"]
+# O histórico pode trazer a chave pronta na coluna "ID" (formato antigo), no lugar
+# das colunas que a compõem; ver chaves.compara_historico.
+COLUNAS_HISTORICO = {**COLUNAS_TITULOS, "ID": str}
+
+
+def parse_planilha_titulos(conteudo):
+    return le_xlsx(conteudo, colunas=list(COLUNAS_TITULOS), tipos=COLUNAS_TITULOS, datas=COLUNAS_DATA)
+
+
+def parse_planilha_historico(conteudo):
+    return le_xlsx(conteudo, colunas=list(COLUNAS_HISTORICO), tipos=COLUNAS_HISTORICO, datas=COLUNAS_DATA)
+
+
+def parse_planilha_regiao(conteudo):
+    return le_xlsx(conteudo)
+
+
+def load_data(conteudo):
+    try:
+        if isinstance(conteudo, Exception):
+            raise conteudo
+        return aplica_esquema(ler_planilha(conteudo, "dados", parse_planilha_titulos))
+    except:
+        return pd.DataFrame()
+
+
+def load_region_data(conteudo):
+    if isinstance(conteudo, Exception):
+        raise conteudo
+    return ler_planilha(conteudo, "regiao", parse_planilha_regiao)
+
+
+def load_hist_data(conteudo):
+    try:
+        if isinstance(conteudo, Exception):
+            raise conteudo
+        return aplica_esquema(ler_planilha(conteudo, "hist", parse_planilha_historico))
+    except:
+        return pd.DataFrame()
+
+
+def versao_dos_dados(*conteudos):
+    return hash_conteudo(b"".join(c for c in conteudos if isinstance(c, bytes)))[:12]
+
+
+def registra_snapshot(df_original, store=None):
+    # Guarda a versão baixada no histórico local; falha de disco não impede a carga.
+    if df_original.empty:
+        return None
+    try:
+        return (store or store_padrao()).registra(df_original)
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def carrega_fontes(url_dados, url_regiao, url_hist):
+    # As três planilhas são baixadas em paralelo; o tempo total é o da mais lenta.
+    # O histórico volta sem ler (bytes ou a exceção do download): só é preciso
+    # quando os indicadores dinâmicos são abertos, via load_hist_data.
+    conteudos = baixar_fontes({"dados": url_dados, "regiao": url_regiao, "hist": url_hist})
+    versao = versao_dos_dados(conteudos["dados"], conteudos["regiao"])
+    df_original = load_data(conteudos["dados"])
+    registra_snapshot(df_original)
+    return versao, df_original, load_region_data(conteudos["regiao"]), conteudos["hist"]
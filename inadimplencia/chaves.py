@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Chave composta dos títulos em 64 bits, calculada coluna a coluna de forma
+# vetorizada, e comparação entre a base atual e o histórico.
+ID_COLS = ["Tipo de documento", "Referência", "Conta", "Divisão", "Banco da empresa", "Vencimento líquido"]
+
+_SEMENTE_1 = "inadimpl-chave-1"
+_SEMENTE_2 = "inadimpl-chave-2"
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+class ColisaoDeChave(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class DiffHistorico:
+    valor_quitado: float
+    valor_novos_inad: float
+    total_antigo: float
+    total_novo: float
+    perc_recuperado: float
+    perc_novos_inad: float
+    df_quitados: pd.DataFrame
+    df_novos_inad: pd.DataFrame
+    df_mantidos: pd.DataFrame  # títulos em aberto que já estavam no histórico
+
+
+def _hash_texto(valores, semente):
+    return pd.util.hash_array(np.asarray(valores, dtype=object), hash_key=semente, categorize=True)
+
+
+def _hash_coluna(serie, semente):
+    # Hash de uma coluna com a mesma igualdade do antigo astype(str), mas sem montar
+    # texto por linha para datas e inteiros, que são hasheados como int64. Textos que
+    # são a forma canônica de um inteiro ("123") caem no mesmo hash do número, como
+    # str(123) == "123"; floats seguem pelo texto ("123.0"), como antes. Vazios valem
+    # "nan", sejam NaN ou None (é como o Arrow devolve o texto vazio dos snapshots).
+    hash_vazio = _hash_texto(["nan"], semente)[0]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        hash_categorias = _hash_coluna(pd.Series(serie.cat.categories), semente)
+        codigos = serie.cat.codes.to_numpy()
+        return np.where(codigos >= 0, hash_categorias[codigos], hash_vazio)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return pd.util.hash_array(serie.to_numpy(dtype="datetime64[ns]").view("int64"), hash_key=semente)
+    if pd.api.types.is_bool_dtype(serie):
+        return _hash_texto(serie.astype(str), semente)
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.util.hash_array(serie.to_numpy(dtype="int64"), hash_key=semente)
+
+    textos = serie.astype(str).to_numpy(dtype=object)
+    textos[serie.isna().to_numpy()] = "nan"
+    numeros = pd.to_numeric(pd.Series(textos), errors="coerce").to_numpy(dtype="float64")
+    inteiros = ~np.isnan(numeros) & (numeros == np.round(numeros)) & (np.abs(numeros) < 2 ** 53)
+    if inteiros.any():
+        # Só é o mesmo inteiro se o texto for a forma canônica dele ("0123" e "123.0" não são 123).
+        canonicos = numeros[inteiros].astype("int64").astype(str).astype(object)
+        inteiros[inteiros] = canonicos == textos[inteiros]
+
+    resultado = _hash_texto(textos, semente)
+    if inteiros.any():
+        resultado[inteiros] = pd.util.hash_array(numeros[inteiros].astype("int64"), hash_key=semente)
+    return resultado
+
+
+def _chave(df, id_cols, semente):
+    chave = np.full(len(df), _FNV_OFFSET, dtype=np.uint64)
+    for col in id_cols:
+        chave ^= _hash_coluna(df[col], semente)
+        chave *= _FNV_PRIME
+    return chave
+
+
+def chave_titulos(df, id_cols=ID_COLS):
+    # Devolve duas chaves de 64 bits independentes; a segunda serve para checar colisões.
+    if df.empty:
+        vazio = np.empty(0, dtype=np.uint64)
+        return vazio, vazio
+    return _chave(df, id_cols, _SEMENTE_1), _chave(df, id_cols, _SEMENTE_2)
+
+
+def chave_texto(ids):
+    # Para históricos que já trazem a coluna "ID" pronta no formato antigo (texto).
+    df = pd.DataFrame({"ID": ids.astype(str)})
+    return _chave(df, ["ID"], _SEMENTE_1), _chave(df, ["ID"], _SEMENTE_2)
+
+
+def id_texto(df, id_cols=ID_COLS):
+    return df[id_cols].astype(str).agg("_".join, axis=1)
+
+
+def hash_linhas(df):
+    # Hash de 64 bits de cada linha inteira (todas as colunas), para comparar duas
+    # versões da mesma exportação linha a linha.
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def verifica_colisoes(codigos, chave_conferencia, n_chaves):
+    # `codigos` numera as chaves distintas. Linhas diferentes que caem na mesma
+    # chave quase certamente diferem na chave de conferência: isso é colisão.
+    conferencia = np.zeros(n_chaves, dtype=np.uint64)
+    conferencia[codigos] = chave_conferencia
+    colisoes = conferencia[codigos] != chave_conferencia
+    if colisoes.any():
+        raise ColisaoDeChave(f"{int(colisoes.sum())} colisões de chave de 64 bits")
+
+
+def compara_historico(df_atual, df_hist, id_cols=ID_COLS, col_valor="Montante em moeda interna"):
+    # Títulos do histórico que não estão mais em aberto foram quitados; títulos em
+    # aberto que não estavam no histórico são novos inadimplentes.
+    if "ID" in df_hist.columns and not set(id_cols) <= set(df_hist.columns):
+        chave_hist, conf_hist = chave_texto(df_hist["ID"])
+        chave_atual, conf_atual = chave_texto(id_texto(df_atual, id_cols))
+    else:
+        chave_hist, conf_hist = chave_titulos(df_hist, id_cols)
+        chave_atual, conf_atual = chave_titulos(df_atual, id_cols)
+
+    try:
+        # Uma única fatoração das chaves dos dois lados diz, para cada título, se ele
+        # existe do outro lado (equivalente a um semi-join por hash).
+        codigos, chaves = pd.factorize(np.concatenate([chave_hist, chave_atual]))
+        verifica_colisoes(codigos, np.concatenate([conf_hist, conf_atual]), len(chaves))
+        codigos_hist, codigos_atual = codigos[:len(chave_hist)], codigos[len(chave_hist):]
+        em_atual = np.zeros(len(chaves), dtype=bool)
+        em_atual[codigos_atual] = True
+        em_hist = np.zeros(len(chaves), dtype=bool)
+        em_hist[codigos_hist] = True
+        hist_em_aberto = em_atual[codigos_hist]
+        atual_no_hist = em_hist[codigos_atual]
+    except ColisaoDeChave:
+        # Caso (improvável) de colisão: compara pelos IDs em texto, como antes.
+        id_hist = df_hist["ID"] if "ID" in df_hist.columns else id_texto(df_hist, id_cols)
+        id_atual = id_texto(df_atual, id_cols)
+        hist_em_aberto = id_hist.isin(set(id_atual)).to_numpy()
+        atual_no_hist = id_atual.isin(set(id_hist)).to_numpy()
+
+    df_quitados = df_hist[~hist_em_aberto]
+    df_novos_inad = df_atual[~atual_no_hist]
+    valor_quitado = df_quitados[col_valor].sum()
+    valor_novos_inad = df_novos_inad[col_valor].sum()
+    total_antigo = df_hist[col_valor].sum()
+    total_novo = df_atual[col_valor].sum()
+    return DiffHistorico(
+        valor_quitado=valor_quitado,
+        valor_novos_inad=valor_novos_inad,
+        total_antigo=total_antigo,
+        total_novo=total_novo,
+        perc_recuperado=(valor_quitado / total_antigo * 100) if total_antigo else 0,
+        perc_novos_inad=(valor_novos_inad / total_novo * 100) if total_novo else 0,
+        df_quitados=df_quitados,
+        df_novos_inad=df_novos_inad,
+        df_mantidos=df_atual[atual_no_hist],
+    )
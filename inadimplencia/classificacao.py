@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Classificação vetorizada de Exercício, Faixa e Prazo. Os limites ficam
+# configuráveis aqui em vez de espalhados em if/elif por linha.
+ANOS_ABERTOS = 5
+
+# Faixas de atraso do exercício corrente: (limite superior em dias, rótulo).
+FAIXAS = [
+    (30, "Até 30 dias"),
+    (60, "entre 31 e 60 dias"),
+]
+FAIXA_ACIMA = "mais de 61 dias"
+
+PRAZO_CORTE = 60
+PRAZO_CURTO = "Curto Prazo"
+PRAZO_LONGO = "Longo Prazo"
+
+
+def rotulos_exercicio(anos, hoje, anos_abertos=ANOS_ABERTOS):
+    # Os exercícios vão do ano mais antigo ao mais recente dos dados (`anos`, NaN
+    # para sem data), limitados à janela de `anos_abertos` anos que termina no
+    # ano de referência: os anos anteriores a ela são somados no primeiro rótulo
+    # "(Acumulado)" e os posteriores ao ano de referência são "Futuro".
+    inicio_janela = hoje.year - anos_abertos + 1
+    validos = anos[~np.isnan(anos)]
+    menor = int(validos.min()) if len(validos) else inicio_janela
+    maior = int(validos.max()) if len(validos) else hoje.year
+    primeiro = min(max(menor, inicio_janela), hoje.year)
+    ultimo = max(min(maior, hoje.year), primeiro)
+    rotulo_primeiro = f"{primeiro}(Acumulado)" if menor <= inicio_janela else str(primeiro)
+    return primeiro, ultimo, [rotulo_primeiro] + [str(ano) for ano in range(primeiro + 1, ultimo + 1)]
+
+
+def classifica_exercicio(datas, hoje, anos_abertos=ANOS_ABERTOS):
+    anos = pd.to_datetime(datas).dt.year.to_numpy(dtype="float64", na_value=np.nan)
+    primeiro, ultimo, rotulos = rotulos_exercicio(anos, hoje, anos_abertos)
+
+    # 0 = "Sem data", 1..n = exercícios, n+1 = "Futuro"
+    codigos = np.clip(anos - primeiro, 0, None) + 1
+    codigos = np.where(anos > ultimo, len(rotulos) + 1, codigos)
+    codigos = np.where(np.isnan(anos), 0, codigos).astype(np.intp)
+
+    categorias = np.array(["Sem data"] + rotulos + ["Futuro"], dtype=object)
+    return pd.Series(categorias[codigos], index=datas.index, name="Exercicio")
+
+
+def classifica_faixa(exercicios, dias, hoje, faixas=FAIXAS, faixa_acima=FAIXA_ACIMA):
+    # Só o exercício corrente é aberto por faixa; os demais ficam com "".
+    cortes = np.array([limite for limite, _ in faixas], dtype="float64")
+    categorias = np.array([rotulo for _, rotulo in faixas] + [faixa_acima, ""], dtype=object)
+    valores = np.asarray(dias, dtype="float64")
+
+    # searchsorted(side="left") põe dias == limite na própria faixa e NaN na última.
+    codigos = np.searchsorted(cortes, valores, side="left")
+    codigos = np.where(np.asarray(exercicios) == str(hoje.year), codigos, len(categorias) - 1)
+    return pd.Series(categorias[codigos], index=exercicios.index, name="Faixa")
+
+
+def classifica_prazo(dias, corte=PRAZO_CORTE):
+    valores = np.asarray(dias, dtype="float64")
+    return pd.Series(np.where(valores <= corte, PRAZO_CURTO, PRAZO_LONGO).astype(object), index=dias.index, name="Prazo")
@@ -0,0 +1,21 @@
+import pandas as pd
+
+# Cubo pré-agregado da base: soma e quantidade de títulos por combinação das
+# dimensões usadas nos filtros, KPIs e gráficos. Filtrar o cubo custa O(células).
+DIMENSOES = [
+    'Região', 'Exercicio', 'Faixa', 'Prazo', 'Tipo de Cobrança', 'Status', 'FrmPgto', 'Vencido', 'Ultimos 10 dias',
+]
+COL_VALOR = "Montante em moeda interna"
+COL_QUANTIDADE = "Quantidade"
+
+
+def monta_cubo(df, col_div):
+    dimensoes = [col_div] + [dim for dim in DIMENSOES if dim in df.columns]
+    cubo = (
+        df.groupby(dimensoes, observed=True, dropna=False, sort=False)[COL_VALOR]
+        .agg(['sum', 'size'])
+        .rename(columns={'sum': COL_VALOR, 'size': COL_QUANTIDADE})
+        .reset_index()
+    )
+    cubo[COL_QUANTIDADE] = pd.to_numeric(cubo[COL_QUANTIDADE], downcast="integer")
+    return cubo
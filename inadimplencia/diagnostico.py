@@ -0,0 +1,106 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+
+# Medição de tempo por estágio (spans). Cada span registra duração, linhas e a
+# variação de memória do processo. Os spans vão para o coletor da execução
+# atual (painel de diagnóstico) e, se INADIMPLENCIA_DIAGNOSTICO=1, para o log
+# em JSON, uma linha por span. Sem coletor e sem log, `span` devolve um objeto
+# vazio e o custo é só o de uma checagem.
+LOG_ATIVO = os.environ.get("INADIMPLENCIA_DIAGNOSTICO", "") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+if LOG_ATIVO and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_coletor = contextvars.ContextVar("inadimplencia_spans", default=None)
+
+try:
+    _TAMANHO_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _TAMANHO_PAGINA = None
+
+
+def memoria_processo():
+    # Memória residente atual (Linux); None onde /proc não existe.
+    if _TAMANHO_PAGINA is None:
+        return None
+    try:
+        with open("/proc/self/statm", "rb") as arquivo:
+            return int(arquivo.read().split()[1]) * _TAMANHO_PAGINA
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _SpanVazio:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def anota(self, **atributos):
+        pass
+
+
+_SPAN_VAZIO = _SpanVazio()
+
+
+class Span:
+    __slots__ = ("nome", "atributos", "coletor", "inicio", "memoria_inicio")
+
+    def __init__(self, nome, coletor, atributos):
+        self.nome = nome
+        self.coletor = coletor
+        self.atributos = atributos
+
+    def anota(self, **atributos):
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        self.memoria_inicio = memoria_processo()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        duracao = time.perf_counter() - self.inicio
+        memoria_fim = memoria_processo()
+        registro = {
+            "span": self.nome,
+            "ms": round(duracao * 1000, 3),
+            "memoria_delta": None if memoria_fim is None or self.memoria_inicio is None else memoria_fim - self.memoria_inicio,
+            **self.atributos,
+        }
+        if tipo_erro is not None:
+            registro["erro"] = tipo_erro.__name__
+        if self.coletor is not None:
+            self.coletor.append(registro)
+        if LOG_ATIVO:
+            logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+        return False
+
+
+def span(nome, **atributos):
+    coletor = _coletor.get()
+    if coletor is None and not LOG_ATIVO:
+        return _SPAN_VAZIO
+    return Span(nome, coletor, atributos)
+
+
+def inicia_coleta(ativo=True):
+    # Liga (ou desliga) o coletor da execução atual e devolve a lista de spans.
+    coletor = [] if ativo else None
+    _coletor.set(coletor)
+    return coletor
+
+
+def contexto():
+    # Para levar o coletor a outras threads: executor.submit(contexto().run, f, ...).
+    return contextvars.copy_context()
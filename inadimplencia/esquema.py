@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Esquema compacto da base: textos repetidos viram categorias (códigos inteiros)
+# e colunas numéricas são reduzidas quando isso não perde informação.
+COLUNAS_CATEGORICAS = [
+    'Divisao', 'Divisão', 'Região', 'Nome', 'Nome 1', 'Banco da empresa', 'FrmPgto', 'Tipo de documento',
+    'Exercicio', 'Faixa', 'Prazo', 'Tipo de Cobrança', 'Tipo de Cobrança Desc', 'Status',
+]
+# Demais colunas de texto viram categoria se tiverem poucos valores distintos.
+LIMITE_CARDINALIDADE = 0.5
+
+# Valores monetários continuam em float64 para não alterar somas.
+COLUNAS_FLOAT64 = ['Montante em moeda interna']
+
+
+def _reduz_float(serie):
+    valores = serie.to_numpy()
+    validos = valores[~np.isnan(valores)]
+    # float32 representa inteiros exatamente até 2**24.
+    if np.array_equal(validos, np.round(validos)) and (np.abs(validos) < 2 ** 24).all():
+        return serie.astype("float32")
+    return serie
+
+
+def aplica_esquema(df):
+    df = df.copy()
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            if col in COLUNAS_CATEGORICAS or serie.nunique(dropna=True) < LIMITE_CARDINALIDADE * max(len(serie), 1):
+                df[col] = serie.astype("category")
+        elif pd.api.types.is_integer_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            df[col] = pd.to_numeric(serie, downcast="integer")
+        elif pd.api.types.is_float_dtype(serie) and col not in COLUNAS_FLOAT64:
+            df[col] = _reduz_float(serie)
+    return df
+
+
+def memoria(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def formata_bytes(n):
+    if n >= 1024 ** 3:
+        return f"{n / 1024 ** 3:.1f} GB"
+    if n >= 1024 ** 2:
+        return f"{n / 1024 ** 2:.1f} MB"
+    return f"{n / 1024:.1f} KB"
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from inadimplencia.cache_local import CACHE_DIR
+from inadimplencia.diagnostico import contexto, span
+
+# Download das planilhas de origem: sessão com pool de conexões, timeout,
+# tentativas limitadas e requisições condicionais (ETag / If-Modified-Since).
+HTTP_CACHE_DIR = CACHE_DIR / "http"
+TIMEOUT = (10, 60)
+TENTATIVAS = 3
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def criar_sessao(tentativas=TENTATIVAS):
+    retry = Retry(
+        total=tentativas,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount("http://", adapter)
+    sessao.mount("https://", adapter)
+    return sessao
+
+
+def sessao_padrao():
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            _sessao = criar_sessao()
+        return _sessao
+
+
+def _caminhos(url, diretorio):
+    nome = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return diretorio / f"{nome}.bin", diretorio / f"{nome}.json"
+
+
+def _gravar_atomico(caminho, dados):
+    temporario = caminho.with_suffix(f"{caminho.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temporario.write_bytes(dados)
+    os.replace(temporario, caminho)
+
+
+def baixar(url, sessao=None, timeout=TIMEOUT, diretorio=HTTP_CACHE_DIR):
+    # Retorna os bytes da URL. Se o servidor responder 304, reaproveita a cópia local.
+    sessao = sessao or sessao_padrao()
+    caminho_bin, caminho_meta = _caminhos(url, diretorio)
+
+    headers = {}
+    validadores = {}
+    if caminho_bin.exists() and caminho_meta.exists():
+        try:
+            validadores = json.loads(caminho_meta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            validadores = {}
+        if validadores.get("etag"):
+            headers["If-None-Match"] = validadores["etag"]
+        if validadores.get("last_modified"):
+            headers["If-Modified-Since"] = validadores["last_modified"]
+
+    response = sessao.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and headers:
+        try:
+            conteudo = caminho_bin.read_bytes()
+            # Atualiza o mtime: a limpeza do cache local descarta primeiro os menos usados.
+            os.utime(caminho_bin)
+            return conteudo
+        except OSError:
+            # Cópia local sumiu entre a checagem e a leitura: baixa sem condicional.
+            response = sessao.get(url, timeout=timeout)
+    response.raise_for_status()
+
+    conteudo = response.content
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        try:
+            diretorio.mkdir(parents=True, exist_ok=True)
+            _gravar_atomico(caminho_bin, conteudo)
+            _gravar_atomico(caminho_meta, json.dumps({"etag": etag, "last_modified": last_modified}).encode("utf-8"))
+        except OSError:
+            pass
+    return conteudo
+
+
+def _baixar_fonte(nome, url, sessao, timeout):
+    with span(f"download:{nome}") as medida:
+        conteudo = baixar(url, sessao, timeout)
+        medida.anota(bytes=len(conteudo))
+    return conteudo
+
+
+def baixar_fontes(urls, sessao=None, timeout=TIMEOUT):
+    # Baixa todas as fontes ao mesmo tempo. Recebe {nome: url} e devolve
+    # {nome: bytes}; em caso de falha o valor é a exceção levantada.
+    sessao = sessao or sessao_padrao()
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as executor:
+        futuros = {
+            nome: executor.submit(contexto().run, _baixar_fonte, nome, url, sessao, timeout)
+            for nome, url in urls.items()
+        }
+        for nome, futuro in futuros.items():
+            try:
+                resultados[nome] = futuro.result()
+            except Exception as erro:
+                resultados[nome] = erro
+    return resultados
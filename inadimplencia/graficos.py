@@ -0,0 +1,109 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Montagem das figuras Plotly a partir das tabelas de DashboardResult.
+
+
+def label_mk(valor):
+    if valor >= 1_000_000:
+        return f"{valor/1_000_000:.1f}M"
+    elif valor >= 1_000:
+        return f"{valor/1_000:.1f}K"
+    else:
+        return f"{valor:,.0f}"
+
+
+def fig_exercicio(df_graf, color_map, ano_atual_str):
+    fig_bar = px.bar(df_graf, x='Categoria', y='Valor',
+                        text=df_graf['Valor'].apply(lambda x: f'{x/1_000_000:,.1f} M' if x >= 1_000_000 else f'{x/1_000:,.1f} K'),
+                        color='Categoria', color_discrete_map=color_map)
+    fig_bar.update_layout(title=f'Detalhe por Exercício e Faixa ({ano_atual_str})', showlegend=False, height=400)
+    fig_bar.update_traces(textposition='outside')
+    return fig_bar
+
+
+def fig_tipo_cobranca(df_tipo_cobranca):
+    df_tipo_cobranca = df_tipo_cobranca.assign(label_mk=df_tipo_cobranca['Valor'].apply(label_mk))
+    fig_cobranca = px.bar(
+        df_tipo_cobranca,
+        x='Valor',
+        y='Tipo de Cobrança',
+        orientation='h',
+        text='label_mk',
+        color_discrete_sequence=['#800020']
+    )
+    fig_cobranca.update_layout(
+        showlegend=False,
+        height=400,
+        title='',
+        xaxis_title="Valor (R$)",
+        yaxis_title="Tipo de Cobrança"
+    )
+    fig_cobranca.update_traces(textposition='outside')
+    return fig_cobranca
+
+
+def fig_regiao(df_pie):
+    fig_pie = px.pie(df_pie, names='Região', values='Montante em moeda interna',
+                    title='Participação por Região', hole=0.2)
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label', pull=[0.05]*len(df_pie))
+    fig_pie.update_layout(title_font_size=16, height=600, width=800)
+    return fig_pie
+
+
+def fig_top_clientes(top_n):
+    top_n = top_n.assign(label_mk=top_n['Valor_Inadimplente'].apply(label_mk))
+    fig_cli = px.bar(
+        top_n,
+        x='Valor_Inadimplente',
+        y='Cliente',
+        orientation='h',
+        text='label_mk',
+        color_discrete_sequence=["#0074D9"]
+    )
+    fig_cli.update_layout(
+        height=500,
+        yaxis_title='',
+        xaxis_title='Valor Inadimplente',
+        showlegend=False,
+        title='Top 10 Clientes Inadimplentes'
+    )
+    fig_cli.update_traces(textposition='outside')
+    return fig_cli
+
+
+def gauge_chart(percent, title):
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = percent,
+        number = {'suffix': "%"},
+        title = {'text': title},
+        gauge = {
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "#24292F"},
+            'steps' : [
+                {'range': [0, 50], 'color': "#B03A2E"},
+                {'range': [50, 80], 'color': "#F7DC6F"},
+                {'range': [80, 100], 'color': "#1ABC9C"},
+            ],
+        }
+    ))
+    fig.update_layout(margin=dict(l=20, r=20, t=60, b=20), height=300)
+    return fig
+
+
+def fig_tendencia(df_tendencia):
+    df_linhas = df_tendencia.rename(columns={
+        'perc_recuperado': 'Recuperação (%)',
+        'perc_novos_inad': 'Novos Inadimplentes (%)',
+    }).melt(id_vars='Momento', value_vars=['Recuperação (%)', 'Novos Inadimplentes (%)'], var_name='Indicador', value_name='Percentual')
+    fig = px.line(
+        df_linhas,
+        x='Momento',
+        y='Percentual',
+        color='Indicador',
+        markers=True,
+        color_discrete_map={'Recuperação (%)': "#1ABC9C", 'Novos Inadimplentes (%)': "#B03A2E"}
+    )
+    fig.update_layout(height=400, xaxis_title='', yaxis_title='% sobre o snapshot anterior', title='Tendência entre snapshots')
+    return fig
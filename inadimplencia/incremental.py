@@ -0,0 +1,259 @@
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime, time
+
+import numpy as np
+import pandas as pd
+
+from inadimplencia.base import classifica_titulos, junta_regiao, mapeia_cobranca, monta_base, status_clientes
+from inadimplencia.chaves import ID_COLS, chave_titulos, hash_linhas
+from inadimplencia.cubo import COL_QUANTIDADE, COL_VALOR, monta_cubo
+from inadimplencia.diagnostico import span
+from inadimplencia.esquema import aplica_esquema, memoria
+
+# Atualização incremental da base enriquecida: compara a nova exportação com a
+# anterior pelo hash de cada linha e processa só as linhas inseridas e removidas
+# (uma linha alterada é uma remoção mais uma inserção). O Status é recalculado
+# apenas para os clientes dessas linhas e o cubo é ajustado somando as células
+# que entram e subtraindo as que saem.
+#
+# Com INADIMPLENCIA_VERIFICA_INCREMENTAL=1, cada atualização incremental é
+# conferida contra uma reconstrução completa.
+VERIFICA_INCREMENTAL = os.environ.get("INADIMPLENCIA_VERIFICA_INCREMENTAL", "") not in ("", "0")
+
+# Acima desta fração de linhas diferentes, reconstruir do zero sai mais barato.
+LIMITE_DELTA = 0.3
+
+
+class DivergenciaIncremental(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Delta:
+    # Posições na versão nova das linhas que já existiam e a posição de cada uma na antiga.
+    posicoes_mantidas: np.ndarray
+    origens_mantidas: np.ndarray
+    inseridas: np.ndarray
+    removidas: np.ndarray
+
+    @property
+    def tamanho(self):
+        return len(self.inseridas) + len(self.removidas)
+
+
+def _com_ocorrencia(codigos):
+    # Código do hash nos bits altos e número da ocorrência nos baixos. Sem linhas
+    # repetidas (o caso comum) a ocorrência é sempre zero e o cumcount é dispensado.
+    chave = codigos.astype(np.int64) << 32
+    if len(codigos) and np.bincount(codigos).max() > 1:
+        chave |= pd.Series(codigos).groupby(codigos).cumcount().to_numpy()
+    return chave
+
+
+def calcula_delta(hashes_antigos, hashes_novos):
+    # Casamento de multiconjuntos: a k-ésima ocorrência de um hash na versão nova
+    # corresponde à k-ésima ocorrência dele na antiga.
+    codigos, _ = pd.factorize(np.concatenate([hashes_antigos, hashes_novos]))
+    codigos_antigos, codigos_novos = codigos[:len(hashes_antigos)], codigos[len(hashes_antigos):]
+    chave_antiga = _com_ocorrencia(codigos_antigos)
+    chave_nova = _com_ocorrencia(codigos_novos)
+
+    origem = pd.Index(chave_antiga).get_indexer(chave_nova)
+    mantidas = origem >= 0
+    removidas = np.ones(len(hashes_antigos), dtype=bool)
+    removidas[origem[mantidas]] = False
+    return Delta(
+        posicoes_mantidas=np.flatnonzero(mantidas),
+        origens_mantidas=origem[mantidas],
+        inseridas=np.flatnonzero(~mantidas),
+        removidas=np.flatnonzero(removidas),
+    )
+
+
+def _conta_alteradas(df_removidas, df_inseridas):
+    # Títulos removidos e inseridos com o mesmo ID são alterações da mesma linha.
+    id_cols = [col for col in ID_COLS if col in df_removidas.columns]
+    if df_removidas.empty or df_inseridas.empty or len(id_cols) < len(ID_COLS):
+        return 0
+    return int(np.isin(chave_titulos(df_inseridas, id_cols)[0], chave_titulos(df_removidas, id_cols)[0]).sum())
+
+
+def _alinha_tipos(antigos, novos):
+    # Deixa as colunas categóricas das duas partes com as mesmas categorias, para
+    # que a concatenação continue categórica (sem passar por texto). As novas
+    # categorias entram na ordem em que uma reconstrução as poria (ordenadas), que
+    # é a ordem das tabelas agrupadas por elas.
+    antigos = antigos.copy()
+    novos = novos.copy()
+    for col in antigos.columns:
+        if not isinstance(antigos[col].dtype, pd.CategoricalDtype):
+            continue
+        categorias = antigos[col].cat.categories
+        valores_novos = novos[col].astype(object)
+        extras = pd.Index(valores_novos.dropna().unique()).difference(categorias)
+        if len(extras):
+            categorias = categorias.union(extras) if categorias.is_monotonic_increasing else categorias.append(extras)
+            antigos[col] = antigos[col].cat.set_categories(categorias)
+        novos[col] = pd.Categorical(valores_novos, categories=categorias)
+    return antigos, novos
+
+
+def ajusta_cubo(cubo, df_sai, df_entra, col_div):
+    dimensoes = [col for col in cubo.columns if col not in (COL_VALOR, COL_QUANTIDADE)]
+    sai = monta_cubo(df_sai, col_div)
+    sai[[COL_VALOR, COL_QUANTIDADE]] = -sai[[COL_VALOR, COL_QUANTIDADE]]
+    partes = pd.concat([cubo, monta_cubo(df_entra, col_div), sai], ignore_index=True)
+    novo = (
+        partes.groupby(dimensoes, observed=True, dropna=False, sort=False)[[COL_VALOR, COL_QUANTIDADE]]
+        .sum()
+        .reset_index()
+    )
+    novo = novo[novo[COL_QUANTIDADE] != 0].reset_index(drop=True)
+    for col in dimensoes:
+        if isinstance(cubo[col].dtype, pd.CategoricalDtype) and not isinstance(novo[col].dtype, pd.CategoricalDtype):
+            novo[col] = novo[col].astype("category")
+    novo[COL_QUANTIDADE] = pd.to_numeric(novo[COL_QUANTIDADE], downcast="integer")
+    return novo
+
+
+def _divisoes_sem_regiao(df, df_regiao, col_div, col_div_regiao):
+    # Mesma regra da junta_regiao: vale a primeira linha de cada divisão no REGIAO.
+    regioes = df_regiao.assign(**{col_div_regiao: df_regiao[col_div_regiao].astype(str)}).drop_duplicates(subset=[col_div_regiao])
+    mapeadas = set(regioes.loc[regioes["Região"].notna(), col_div_regiao]) if "Região" in regioes.columns else set()
+    return df.loc[~df[col_div].astype(object).isin(mapeadas), col_div].unique().tolist()
+
+
+def atualiza_base(base, df_original, df_regiao, col_div_regiao, hoje, verificar=VERIFICA_INCREMENTAL):
+    # Devolve a base da nova versão, ou None quando a atualização incremental não
+    # se aplica (outro dia de referência, colunas diferentes, planilha sem a coluna
+    # de cliente, delta grande demais).
+    if base.hashes is None or base.data_referencia != hoje or len(base.df) != len(base.hashes):
+        return None
+    if 'Nome 1' not in df_original.columns:
+        # O Status é recalculado por cliente; sem a coluna, só a reconstrução completa.
+        return None
+    colunas_origem = list(base.df.columns[:df_original.shape[1]])
+    if colunas_origem != list(df_original.columns):
+        return None
+
+    with span("incremental", linhas=len(df_original)) as medida:
+        hashes = hash_linhas(df_original)
+        delta = calcula_delta(base.hashes, hashes)
+        if delta.tamanho > LIMITE_DELTA * max(len(df_original), 1):
+            return None
+
+        antigos = base.df
+        col_div = base.col_div
+        inseridas = junta_regiao(df_original.iloc[delta.inseridas], df_regiao, col_div, col_div_regiao)
+        inseridas = mapeia_cobranca(classifica_titulos(inseridas, datetime.combine(hoje, time())))
+        antigos, inseridas = _alinha_tipos(antigos, aplica_esquema(inseridas))
+
+        # Monta a nova base na ordem da planilha nova, como uma reconstrução faria.
+        origem = np.empty(len(df_original), dtype=np.int64)
+        origem[delta.posicoes_mantidas] = delta.origens_mantidas
+        origem[delta.inseridas] = len(antigos) + np.arange(len(delta.inseridas))
+        df = pd.concat([antigos, inseridas], ignore_index=True).take(origem).reset_index(drop=True)
+
+        # Status: só os clientes com linhas inseridas ou removidas podem mudar.
+        removidas = antigos.iloc[delta.removidas]
+        afetados = pd.concat([removidas['Nome 1'].astype(object), inseridas['Nome 1'].astype(object)]).dropna().unique()
+        linhas_afetadas = np.flatnonzero(df['Nome 1'].isin(afetados).to_numpy())
+        mudou_status = np.zeros(len(df), dtype=bool)
+        if len(linhas_afetadas):
+            status_antigo = df['Status'].iloc[linhas_afetadas].astype(object).to_numpy()
+            status = status_clientes(
+                df['Nome 1'].iloc[linhas_afetadas],
+                df['Gravidade'].iloc[linhas_afetadas].to_numpy(),
+                (df['Dias de atraso'].iloc[linhas_afetadas] >= 1).to_numpy(),
+            )
+            mudou = ~pd.Series(status_antigo).fillna('').eq(pd.Series(status).fillna('')).to_numpy()
+            mudou_status[linhas_afetadas[mudou]] = True
+            if mudou.any():
+                if isinstance(df['Status'].dtype, pd.CategoricalDtype):
+                    extras = pd.Index(pd.Series(status[mudou]).dropna().unique()).difference(df['Status'].cat.categories)
+                    if len(extras):
+                        df['Status'] = df['Status'].cat.add_categories(extras)
+                df.loc[mudou_status, 'Status'] = status[mudou]
+
+        # Cubo: saem as linhas removidas e a versão antiga das linhas mantidas cujo
+        # Status mudou; entram as inseridas e a versão nova dessas mesmas linhas.
+        inserida = np.zeros(len(df), dtype=bool)
+        inserida[delta.inseridas] = True
+        mantida_mudou = mudou_status & ~inserida
+        saindo = np.zeros(len(antigos), dtype=bool)
+        saindo[delta.removidas] = True
+        saindo[origem[mantida_mudou]] = True
+        cubo = ajusta_cubo(base.cubo, antigos[saindo], df[inserida | mantida_mudou], col_div)
+
+        # Os tipos numéricos são reduzidos sobre a base inteira, como na reconstrução.
+        df = aplica_esquema(df)
+        alteradas = _conta_alteradas(removidas, df_original.iloc[delta.inseridas])
+        medida.anota(inseridas=len(delta.inseridas), removidas=len(delta.removidas), alteradas=alteradas)
+
+    nova = replace(
+        base,
+        df=df,
+        cubo=cubo,
+        soma_bruta=df_original[COL_VALOR].sum(),
+        soma_apos_merge=df[COL_VALOR].sum(),
+        divisoes_sem_regiao=_divisoes_sem_regiao(df, df_regiao, col_div, col_div_regiao),
+        lista_regioes=sorted(df['Região'].unique()),
+        lista_divisoes=sorted(df[col_div].unique()),
+        lista_exercicios=sorted(df['Exercicio'].unique()),
+        # Sem a base intermediária não há como medir; mantém a proporção anterior.
+        memoria_antes=int(base.memoria_antes * len(df) / max(len(antigos), 1)),
+        memoria_depois=memoria(df),
+        hashes=hashes,
+    )
+    if verificar:
+        verifica_bases(nova, monta_base(df_original, df_regiao, col_div, col_div_regiao, hoje))
+    return nova
+
+
+def _como_objeto(df):
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+def _categorias_usadas(serie):
+    return list(serie.cat.remove_unused_categories().cat.categories)
+
+
+def verifica_bases(incremental, completa):
+    # Levanta DivergenciaIncremental se a base incremental difere da reconstrução
+    # completa: valores, tipos e a ordem das categorias em uso (que define a ordem
+    # das tabelas agrupadas por elas).
+    for col in completa.df.columns:
+        if not isinstance(completa.df[col].dtype, pd.CategoricalDtype):
+            continue
+        if col not in incremental.df.columns or not isinstance(incremental.df[col].dtype, pd.CategoricalDtype):
+            raise DivergenciaIncremental(f"coluna {col} não é categórica")
+        if _categorias_usadas(incremental.df[col]) != _categorias_usadas(completa.df[col]):
+            raise DivergenciaIncremental(f"categorias de {col}")
+    try:
+        pd.testing.assert_frame_equal(_como_objeto(incremental.df), _como_objeto(completa.df))
+    except AssertionError as erro:
+        raise DivergenciaIncremental(f"linhas da base: {erro}") from erro
+
+    dimensoes = [col for col in completa.cubo.columns if col not in (COL_VALOR, COL_QUANTIDADE)]
+
+    def ordena(cubo):
+        cubo = _como_objeto(cubo)
+        chave = cubo[dimensoes].astype(str).agg("\x1f".join, axis=1)
+        return cubo.assign(_chave=chave).sort_values("_chave").reset_index(drop=True)
+
+    cubo_inc, cubo_comp = ordena(incremental.cubo), ordena(completa.cubo)
+    if (
+        len(cubo_inc) != len(cubo_comp)
+        or not cubo_inc["_chave"].equals(cubo_comp["_chave"])
+        or not np.array_equal(cubo_inc[COL_QUANTIDADE].to_numpy(), cubo_comp[COL_QUANTIDADE].to_numpy())
+        or not np.allclose(cubo_inc[COL_VALOR].to_numpy(), cubo_comp[COL_VALOR].to_numpy(), rtol=1e-9, atol=1e-6)
+    ):
+        raise DivergenciaIncremental("células do cubo")
+
+    for campo in ("divisoes_sem_regiao", "lista_regioes", "lista_divisoes", "lista_exercicios"):
+        if list(getattr(incremental, campo)) != list(getattr(completa, campo)):
+            raise DivergenciaIncremental(campo)
+    for campo in ("soma_bruta", "soma_apos_merge"):
+        if not np.isclose(getattr(incremental, campo), getattr(completa, campo), rtol=1e-12):
+            raise DivergenciaIncremental(campo)
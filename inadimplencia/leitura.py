@@ -0,0 +1,113 @@
+import logging
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from inadimplencia.diagnostico import span
+
+# Leitura de XLSX em streaming: as linhas da primeira aba são percorridas uma a
+# uma e só as colunas pedidas são guardadas, já com o tipo declarado e as datas
+# convertidas na montagem. As conversões de célula e os valores vazios seguem
+# as do pd.read_excel, para que o resultado seja o mesmo com qualquer motor.
+# O motor padrão é o calamine (python-calamine); sem ele, ou se ele falhar no
+# arquivo, a leitura cai para o openpyxl em modo read-only.
+MOTORES = ("calamine", "openpyxl")
+MOTOR_PADRAO = os.environ.get("INADIMPLENCIA_MOTOR_XLSX", "")
+
+# Valores que o openpyxl devolve para células com erro; o pd.read_excel os lê como vazio.
+ERROS_EXCEL = frozenset({"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"})
+
+logger = logging.getLogger(__name__)
+
+
+def _numero(valor):
+    # Como no pd.read_excel: números inteiros vêm como int, os demais como float.
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _linhas_calamine(conteudo):
+    from python_calamine import CalamineWorkbook
+
+    planilha = CalamineWorkbook.from_filelike(BytesIO(conteudo)).get_sheet_by_index(0)
+    for linha in planilha.iter_rows():
+        yield [_numero(valor) for valor in linha]
+
+
+def _linhas_openpyxl(conteudo):
+    from openpyxl import load_workbook
+
+    livro = load_workbook(BytesIO(conteudo), read_only=True, data_only=True, keep_links=False)
+    try:
+        for linha in livro.worksheets[0].iter_rows(values_only=True):
+            yield [
+                "" if valor is None else np.nan if isinstance(valor, str) and valor in ERROS_EXCEL else _numero(valor)
+                for valor in linha
+            ]
+    finally:
+        livro.close()
+
+
+_LEITORES = {"calamine": _linhas_calamine, "openpyxl": _linhas_openpyxl}
+
+
+def _projeta(linhas, colunas):
+    # Cabeçalho na primeira linha; guarda só as colunas pedidas (todas, se None).
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return [], []
+    nomes = ["" if nome is None else str(nome) for nome in cabecalho]
+    if colunas is None:
+        indices = list(range(len(nomes)))
+    else:
+        indices = [nomes.index(col) for col in colunas if col in nomes]
+    largura = max(indices, default=-1) + 1
+
+    dados = []
+    for linha in linhas:
+        if len(linha) < largura:
+            linha = list(linha) + [""] * (largura - len(linha))
+        dados.append([linha[i] for i in indices])
+    # Linhas vazias no fim da aba são descartadas, como no pd.read_excel.
+    while dados and all(valor == "" for valor in dados[-1]):
+        dados.pop()
+    return [nomes[i] for i in indices], dados
+
+
+def _monta(nomes, dados, tipos, datas):
+    tipos = {col: tipo for col, tipo in (tipos or {}).items() if col in nomes and tipo is not None}
+    datas = [col for col in (datas or ()) if col in nomes]
+    df = TextParser([nomes] + dados, header=0, dtype=tipos or None, parse_dates=datas or False).read()
+    for col in datas:
+        # Só quando a coluna tem textos que não são datas: estes viram NaT.
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def le_xlsx(conteudo, colunas=None, tipos=None, datas=(), motor=None):
+    # Primeira aba do XLSX em `conteudo`. `colunas` limita as colunas lidas (as
+    # ausentes na planilha são ignoradas), `tipos` dá o dtype de cada uma e
+    # `datas` as colunas convertidas para datetime durante a leitura.
+    motor = motor or MOTOR_PADRAO
+    motores = [motor] if motor else list(MOTORES)
+    erro = None
+    for nome in motores:
+        with span("xlsx", motor=nome, colunas=None if colunas is None else len(colunas)) as medida:
+            try:
+                nomes, dados = _projeta(_LEITORES[nome](conteudo), colunas)
+            except ImportError as falha:
+                erro = falha
+                continue
+            except Exception as falha:
+                logger.warning("Leitura do XLSX pelo %s falhou (%s).", nome, falha)
+                erro = falha
+                continue
+            df = _monta(nomes, dados, tipos, datas)
+            medida.anota(linhas=len(df))
+            return df
+    raise erro
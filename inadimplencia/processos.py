@@ -0,0 +1,225 @@
+import logging
+import multiprocessing.spawn
+import os
+import sys
+import threading
+import types
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import SpawnContext, SpawnProcess
+from dataclasses import replace
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from inadimplencia.base import monta_base
+from inadimplencia.chaves import compara_historico
+from inadimplencia.diagnostico import span
+
+# Pool de processos para os estágios pesados (leitura do XLSX, base enriquecida
+# e cubo, comparação entre snapshots guardados), para que o trabalho de uma
+# sessão não dispute o GIL com as outras. A comparação das linhas filtradas com
+# o histórico fica no servidor: mandar as linhas ao processo custa mais que ela.
+# Os DataFrames vão e voltam como Arrow IPC (buffers colunares, categorias como
+# dicionário), não como objetos pickled. Pedidos com a mesma chave enquanto o
+# primeiro ainda roda esperam pelo mesmo job.
+# INADIMPLENCIA_PROCESSOS=0 faz tudo rodar no próprio processo, como antes.
+#
+# Os processos são iniciados com "spawn" (o servidor do Streamlit tem threads),
+# sem reexecutar o __main__ do servidor: no Streamlit ele é a própria página
+# (ver _Processo).
+PROCESSOS = int(os.environ.get("INADIMPLENCIA_PROCESSOS", min(2, os.cpu_count() or 1)))
+# Cada processo é trocado depois de alguns jobs, para devolver a memória ao sistema.
+JOBS_POR_PROCESSO = 20
+CAMPOS_TOTAIS = ("valor_quitado", "valor_novos_inad", "perc_recuperado", "perc_novos_inad")
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_em_andamento = {}
+_em_andamento_lock = threading.Lock()
+
+
+def para_arrow(df):
+    if df is None:
+        return None
+    sink = pa.BufferOutputStream()
+    tabela = pa.Table.from_pandas(df)
+    with pa.ipc.new_stream(sink, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return sink.getvalue()
+
+
+def de_arrow(buffer):
+    if buffer is None:
+        return None
+    return pa.ipc.open_stream(buffer).read_all().to_pandas()
+
+
+def _preparacao_sem_main(nome):
+    # Dados que o filho recebe antes de rodar, sem o __main__ do servidor: o
+    # filho fica com o próprio __main__ e não importa a página.
+    dados = multiprocessing.spawn.get_preparation_data(nome)
+    dados.pop("init_main_from_path", None)
+    dados.pop("init_main_from_name", None)
+    return dados
+
+
+class _SpawnSemMain:
+    # O módulo multiprocessing.spawn, exceto por get_preparation_data.
+    get_preparation_data = staticmethod(_preparacao_sem_main)
+
+    def __getattr__(self, nome):
+        return getattr(multiprocessing.spawn, nome)
+
+
+def _com_preparacao_sem_main(funcao):
+    # A mesma função da biblioteca, vendo _SpawnSemMain no lugar do módulo spawn.
+    # Só o Popen deste pool usa a cópia; o módulo spawn e o __main__ do processo
+    # não mudam, então outras threads e outros pools não são afetados.
+    return types.FunctionType(funcao.__code__, {**funcao.__globals__, "spawn": _SpawnSemMain()}, funcao.__name__, funcao.__defaults__)
+
+
+if sys.platform == "win32":
+    from multiprocessing.popen_spawn_win32 import Popen as _PopenSpawn
+
+    class _Popen(_PopenSpawn):
+        __init__ = _com_preparacao_sem_main(_PopenSpawn.__init__)
+else:
+    from multiprocessing.popen_spawn_posix import Popen as _PopenSpawn
+
+    class _Popen(_PopenSpawn):
+        _launch = _com_preparacao_sem_main(_PopenSpawn._launch)
+
+
+class _Processo(SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        return _Popen(process_obj)
+
+
+class _Contexto(SpawnContext):
+    Process = _Processo
+
+
+def _executor_padrao():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PROCESSOS,
+                mp_context=_Contexto(),
+                max_tasks_per_child=JOBS_POR_PROCESSO,
+            )
+        return _executor
+
+
+def _descarta_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _roda(funcao, argumentos):
+    args = argumentos()
+    executor = _executor_padrao()
+    try:
+        return executor.submit(funcao, *args).result()
+    except BrokenProcessPool:
+        # Um processo morreu (ex.: falta de memória): o job roda aqui e o pool é recriado depois.
+        logger.warning("Pool de processos interrompido; executando %s no processo principal.", funcao.__name__)
+        _descarta_executor(executor)
+        return funcao(*args)
+
+
+def executa(chave, funcao, argumentos):
+    # Executa funcao(*argumentos()) no pool. Com a mesma `chave` (hashable) já
+    # em execução, espera o resultado dela em vez de submeter outro job; os
+    # argumentos (ex.: DataFrames convertidos para Arrow) só são montados por
+    # quem submete.
+    nome = funcao.__name__.removeprefix("_job_")
+    if chave is None:
+        with span(f"processo:{nome}", compartilhado=False):
+            return _roda(funcao, argumentos)
+    with _em_andamento_lock:
+        futuro = _em_andamento.get(chave)
+        dono = futuro is None
+        if dono:
+            futuro = _em_andamento[chave] = Future()
+    if not dono:
+        with span(f"processo:{nome}", compartilhado=True):
+            return futuro.result()
+
+    try:
+        with span(f"processo:{nome}", compartilhado=False):
+            resultado = _roda(funcao, argumentos)
+    except BaseException as erro:
+        futuro.set_exception(erro)
+        raise
+    else:
+        futuro.set_result(resultado)
+        return resultado
+    finally:
+        with _em_andamento_lock:
+            _em_andamento.pop(chave, None)
+
+
+# Jobs executados nos processos: recebem e devolvem Arrow no lugar de DataFrames.
+
+def _job_parse(parse, conteudo):
+    # cache_local usa este módulo; a importação fica aqui para evitar o ciclo.
+    from inadimplencia.cache_local import normalizar_para_arrow
+
+    return para_arrow(normalizar_para_arrow(parse(conteudo)))
+
+
+def _job_base(original, regiao, col_div_princ, col_div_regiao, data_referencia):
+    base = monta_base(de_arrow(original), de_arrow(regiao), col_div_princ, col_div_regiao, data_referencia)
+    return replace(base, df=para_arrow(base.df), cubo=para_arrow(base.cubo))
+
+
+def _compara_arquivos(arquivo_atual, arquivo_hist):
+    atual = feather.read_table(arquivo_atual, memory_map=True).to_pandas()
+    hist = feather.read_table(arquivo_hist, memory_map=True).to_pandas()
+    return compara_historico(atual, hist)
+
+
+def _job_totais_historico(arquivo_atual, arquivo_hist):
+    # Lê os snapshots direto do disco: só os totais voltam para o servidor.
+    diff = _compara_arquivos(arquivo_atual, arquivo_hist)
+    return {campo: float(getattr(diff, campo)) for campo in CAMPOS_TOTAIS}
+
+
+def ativo():
+    return PROCESSOS > 0
+
+
+def parse_em_processo(parse, conteudo, chave=None):
+    # `parse` precisa ser uma função de módulo (é enviada ao processo por nome).
+    if not ativo():
+        from inadimplencia.cache_local import normalizar_para_arrow
+
+        return normalizar_para_arrow(parse(conteudo))
+    return de_arrow(executa(chave, _job_parse, lambda: (parse, conteudo)))
+
+
+def monta_base_em_processo(df_original, df_regiao, col_div_princ, col_div_regiao, data_referencia, chave=None):
+    if not ativo():
+        return monta_base(df_original, df_regiao, col_div_princ, col_div_regiao, data_referencia)
+    base = executa(
+        chave,
+        _job_base,
+        lambda: (para_arrow(df_original), para_arrow(df_regiao), col_div_princ, col_div_regiao, data_referencia),
+    )
+    return replace(base, df=de_arrow(base.df), cubo=de_arrow(base.cubo))
+
+
+def totais_historico_em_processo(arquivo_atual, arquivo_hist):
+    # Só os totais e percentuais da comparação entre dois snapshots (CAMPOS_TOTAIS).
+    arquivo_atual, arquivo_hist = str(arquivo_atual), str(arquivo_hist)
+    if not ativo():
+        return _job_totais_historico(arquivo_atual, arquivo_hist)
+    return executa(("totais", arquivo_atual, arquivo_hist), _job_totais_historico, lambda: (arquivo_atual, arquivo_hist))
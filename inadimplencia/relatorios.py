@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from inadimplencia.base import LISTA_STATUS, get_division_column_name, monta_base
+from inadimplencia.calculo import Filtros, compute_dashboard
+from inadimplencia.carga import load_data, load_region_data
+from inadimplencia.fontes import baixar
+
+# Exportação em lote, sem o servidor: as planilhas são lidas e a base montada uma
+# vez, e o relatório de cada região e/ou divisão (Quadro Detalhado, resumo por
+# cliente e venda antecipada, com o mesmo cálculo da página) é gerado em paralelo
+# num pool de processos, que leem a base de um arquivo Arrow mapeado em memória.
+#
+#   python -m inadimplencia.relatorios --dados INADIMATUAL.XLSX --regiao REGIAO.xlsx \
+#       --por regiao divisao --formatos xlsx csv --saida relatorios
+FORMATOS = ("xlsx", "csv", "parquet")
+GRUPOS = ("regiao", "divisao")
+# Tabela -> nome da aba no Excel.
+TABELAS = {
+    "quadro_detalhado": "Quadro Detalhado",
+    "resumo_cliente": "Resumo por Cliente",
+    "antecipada_filial": "Antecipada por Filial",
+    "antecipada_cliente": "Antecipada por Cliente",
+}
+COLUNAS_CLIENTE = {
+    "Status": "Status",
+    "Cliente": "Cliente",
+    "Valor_Inadimplente": "Valor Inadimplente",
+    "Tipos_de_Cobranca": "Tipos de Cobrança",
+    "% do Total": "% do Total",
+}
+
+
+@dataclass(frozen=True)
+class Relatorio:
+    grupo: str
+    nome: str
+    filtros: Filtros
+
+
+def relatorios_da_base(base, grupos=GRUPOS, status=tuple(LISTA_STATUS)):
+    # Um relatório por região e/ou por divisão presentes na base. O padrão de
+    # `status` é o da página (todos marcados, o que deixa de fora os títulos sem
+    # cliente), para que os totais batam com os dela; None inclui todos os títulos.
+    relatorios = []
+    if "regiao" in grupos:
+        relatorios += [Relatorio("regiao", str(regiao), Filtros(regiao=regiao, status=status)) for regiao in base.lista_regioes]
+    if "divisao" in grupos:
+        relatorios += [Relatorio("divisao", str(div), Filtros(divisoes=(div,), status=status)) for div in base.lista_divisoes]
+    return relatorios
+
+
+def tabelas_relatorio(base, filtros, as_of):
+    # As tabelas do relatório, com valores numéricos (sem a formatação em R$ da página).
+    resultado = compute_dashboard(base, filtros, as_of, secoes=("antecipada", "clientes"))
+    tabelas = {
+        "quadro_detalhado": resultado.pivot,
+        "antecipada_filial": resultado.antecipada_filial,
+        "antecipada_cliente": resultado.antecipada_cliente,
+    }
+    if resultado.resumo_cliente is not None:
+        tabelas["resumo_cliente"] = resultado.resumo_cliente[list(COLUNAS_CLIENTE)].rename(columns=COLUNAS_CLIENTE)
+    return resultado, {nome: tabelas[nome] for nome in TABELAS if tabelas.get(nome) is not None}
+
+
+def nome_arquivo(nome):
+    # Nome seguro para arquivo. Se algum caractere foi trocado, um sufixo com o
+    # hash do nome original separa nomes que ficariam iguais ("A/B" e "A B").
+    seguro = re.sub(r"[^\w\-]+", "_", nome).strip("_") or "sem_nome"
+    if seguro != nome:
+        seguro += "-" + hashlib.sha256(nome.encode("utf-8")).hexdigest()[:6]
+    return seguro
+
+
+def confere_nomes(relatorios):
+    # Dois relatórios do mesmo grupo no mesmo arquivo: o segundo apagaria o primeiro.
+    # Maiúsculas e minúsculas contam como iguais, como no Windows e no macOS.
+    vistos = {}
+    for relatorio in relatorios:
+        chave = (relatorio.grupo, nome_arquivo(relatorio.nome).casefold())
+        if chave in vistos:
+            raise ValueError(
+                f"Os relatórios {vistos[chave]!r} e {relatorio.nome!r} ({relatorio.grupo}) seriam gravados no mesmo arquivo."
+            )
+        vistos[chave] = relatorio.nome
+
+
+def grava_relatorio(tabelas, destino, formatos):
+    # `destino` sem extensão: <destino>.xlsx com uma aba por tabela, e
+    # <destino>/<tabela>.csv|.parquet nos demais formatos. Devolve os arquivos gravados.
+    arquivos = []
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    if "xlsx" in formatos:
+        arquivo = destino.with_suffix(".xlsx")
+        with pd.ExcelWriter(arquivo, engine="openpyxl") as escritor:
+            for nome, df in tabelas.items():
+                df.to_excel(escritor, sheet_name=TABELAS[nome], index=False)
+            if not tabelas:
+                pd.DataFrame({"Aviso": ["Nenhum título inadimplente."]}).to_excel(escritor, sheet_name="Aviso", index=False)
+        arquivos.append(arquivo)
+    for formato in ("csv", "parquet"):
+        if formato not in formatos:
+            continue
+        destino.mkdir(parents=True, exist_ok=True)
+        for nome, df in tabelas.items():
+            arquivo = destino / f"{nome}.{formato}"
+            if formato == "csv":
+                df.to_csv(arquivo, index=False, sep=";", decimal=",", encoding="utf-8-sig")
+            else:
+                # Nomes de coluna do pivot (categorias de Prazo) viram texto no Parquet.
+                df.rename(columns=str).to_parquet(arquivo, index=False)
+            arquivos.append(arquivo)
+    return arquivos
+
+
+def gera_relatorio(base, relatorio, as_of, saida, formatos):
+    # Calcula e grava um relatório; devolve a linha do resumo de tempos.
+    inicio = time.perf_counter()
+    resultado, tabelas = tabelas_relatorio(base, relatorio.filtros, as_of)
+    calculado = time.perf_counter()
+    arquivos = grava_relatorio(tabelas, Path(saida) / relatorio.grupo / nome_arquivo(relatorio.nome), formatos)
+    fim = time.perf_counter()
+    return {
+        "grupo": relatorio.grupo,
+        "nome": relatorio.nome,
+        "titulos_inad": resultado.n_titulos_inad,
+        "valor_inad": float(resultado.tot_inad),
+        "ms_calculo": (calculado - inicio) * 1000,
+        "ms_gravacao": (fim - calculado) * 1000,
+        "arquivos": len(arquivos),
+        "pid": os.getpid(),
+    }
+
+
+# Estado de cada processo do pool: a base é lida uma vez, na inicialização.
+_base_processo = None
+
+
+def _inicia_processo(campos_base, arquivo_df, arquivo_cubo):
+    global _base_processo
+    _base_processo = replace(
+        campos_base,
+        df=feather.read_table(arquivo_df, memory_map=True).to_pandas(),
+        cubo=feather.read_table(arquivo_cubo, memory_map=True).to_pandas(),
+    )
+
+
+def _job_relatorio(relatorio, as_of, saida, formatos):
+    return gera_relatorio(_base_processo, relatorio, as_of, saida, formatos)
+
+
+def exporta_relatorios(base, relatorios, as_of, saida, formatos=("xlsx",), processos=None):
+    # Gera todos os `relatorios` em `saida` e devolve o resumo (um DataFrame com
+    # uma linha por relatório). Com processos <= 1 (ou uma única CPU, no padrão)
+    # tudo é gerado no próprio processo: o pool só compensa com CPUs livres.
+    confere_nomes(relatorios)
+    processos = (os.cpu_count() or 1) if processos is None else processos
+    if processos <= 1 or len(relatorios) <= 1:
+        linhas = [gera_relatorio(base, relatorio, as_of, saida, formatos) for relatorio in relatorios]
+        return pd.DataFrame(linhas)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo_df, arquivo_cubo = Path(diretorio) / "df.arrow", Path(diretorio) / "cubo.arrow"
+        feather.write_feather(pa.Table.from_pandas(base.df), arquivo_df, compression="uncompressed")
+        feather.write_feather(pa.Table.from_pandas(base.cubo), arquivo_cubo, compression="uncompressed")
+        with ProcessPoolExecutor(
+            max_workers=min(processos, len(relatorios)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicia_processo,
+            initargs=(replace(base, df=None, cubo=None, hashes=None), str(arquivo_df), str(arquivo_cubo)),
+        ) as executor:
+            futuros = [executor.submit(_job_relatorio, relatorio, as_of, saida, formatos) for relatorio in relatorios]
+            return pd.DataFrame([futuro.result() for futuro in futuros])
+
+
+def _le_fonte(origem):
+    if re.match(r"https?://", origem):
+        return baixar(origem)
+    return Path(origem).read_bytes()
+
+
+def carrega_base(origem_dados, origem_regiao, data_referencia):
+    df_original = load_data(_le_fonte(origem_dados))
+    if df_original.empty:
+        # load_data devolve um DataFrame vazio quando a leitura falha.
+        raise ValueError(f"Não foi possível ler a planilha de títulos {origem_dados} (vazia, corrompida ou não é XLSX).")
+    conteudo_regiao = _le_fonte(origem_regiao)
+    try:
+        df_regiao = load_region_data(conteudo_regiao)
+    except Exception as erro:
+        raise ValueError(f"Não foi possível ler a planilha de regiões {origem_regiao}: {erro}") from erro
+    col_div_princ = get_division_column_name(df_original)
+    col_div_regiao = get_division_column_name(df_regiao)
+    if not col_div_princ or not col_div_regiao:
+        raise ValueError("Coluna de divisão não encontrada nas planilhas.")
+    return monta_base(df_original, df_regiao, col_div_princ, col_div_regiao, data_referencia)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m inadimplencia.relatorios",
+        description="Gera os relatórios de inadimplência por região e/ou divisão.",
+    )
+    parser.add_argument("--dados", required=True, help="Exportação de títulos (arquivo XLSX ou URL).")
+    parser.add_argument("--regiao", default="REGIAO.xlsx", help="Mapeamento de divisões para regiões (arquivo XLSX ou URL).")
+    parser.add_argument("--por", nargs="+", choices=GRUPOS, default=list(GRUPOS))
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=["xlsx"])
+    parser.add_argument("--saida", default="relatorios")
+    parser.add_argument("--data", type=date.fromisoformat, default=None, help="Data de referência do aging (AAAA-MM-DD); padrão: hoje.")
+    parser.add_argument(
+        "--status", nargs="+", choices=LISTA_STATUS + ["todos"], default=LISTA_STATUS,
+        help="Status dos clientes incluídos (padrão: os quatro, como na página, sem os títulos sem cliente; "
+        "'todos' inclui também esses títulos).",
+    )
+    parser.add_argument("--processos", type=int, default=None, help="Processos em paralelo (padrão: um por CPU; 0 ou 1 = sem pool).")
+    args = parser.parse_args(argv)
+
+    as_of = datetime.combine(args.data, datetime.min.time()) if args.data else datetime.now()
+    inicio = time.perf_counter()
+    try:
+        base = carrega_base(args.dados, args.regiao, as_of.date())
+    except (OSError, ValueError) as erro:
+        parser.error(str(erro))
+    carregado = time.perf_counter()
+
+    status = None if "todos" in args.status else tuple(args.status)
+    relatorios = relatorios_da_base(base, args.por, status)
+    try:
+        resumo = exporta_relatorios(base, relatorios, as_of, args.saida, args.formatos, args.processos)
+    except ValueError as erro:
+        parser.error(str(erro))
+    fim = time.perf_counter()
+
+    if not resumo.empty:
+        resumo["ms_total"] = resumo["ms_calculo"] + resumo["ms_gravacao"]
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(resumo.drop(columns="pid").round(1).to_string(index=False))
+    print(
+        f"\n{len(resumo)} relatório(s) em {args.saida} ({', '.join(args.formatos)}): "
+        f"carga {carregado - inicio:.2f}s, relatórios {fim - carregado:.2f}s, total {fim - inicio:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
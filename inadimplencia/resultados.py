@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass, replace
+
+import pandas as pd
+
+from inadimplencia.diagnostico import span
+from inadimplencia.esquema import memoria
+
+# Cache de resultados compartilhado entre as sessões: tabelas calculadas e specs
+# JSON das figuras Plotly, por (origem dos dados, filtros normalizados, item).
+# A origem identifica a base ("atual", versão, dia) ou ("snapshot", hash, dia);
+# quando a versão atual muda, as entradas da anterior saem do cache. O tamanho
+# é limitado em bytes (estimados) e os itens menos usados saem primeiro.
+CACHE_RESULTADOS_MAX_BYTES = int(os.environ.get("INADIMPLENCIA_CACHE_RESULTADOS_MB", 256)) * 1024 ** 2
+
+
+def normaliza_filtros(filtros, base):
+    # Mesma seleção, mesma chave: tuplas ordenadas e sem repetição, e "todas as
+    # divisões/exercícios" vira None (mesmo resultado, chave menor). O Status
+    # continua explícito: marcar todos exclui os títulos sem Status.
+    def normaliza(valores, todos=None):
+        if valores is None:
+            return None
+        valores = tuple(sorted(set(valores), key=str))
+        if todos is not None and set(todos) <= set(valores):
+            return None
+        return valores
+
+    return replace(
+        filtros,
+        divisoes=normaliza(filtros.divisoes, base.lista_divisoes),
+        exercicios=normaliza(filtros.exercicios, base.lista_exercicios),
+        status=normaliza(filtros.status),
+    )
+
+
+def tamanho(valor):
+    # Estimativa da memória ocupada por um resultado (DataFrames, textos, dataclasses e coleções).
+    if isinstance(valor, pd.DataFrame):
+        return memoria(valor)
+    if isinstance(valor, (str, bytes)):
+        return sys.getsizeof(valor)
+    if is_dataclass(valor):
+        return sys.getsizeof(valor) + sum(tamanho(getattr(valor, campo.name)) for campo in fields(valor))
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho(k) + tamanho(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    def __init__(self, max_bytes=CACHE_RESULTADOS_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._origem_atual = None
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self.invalidacoes = 0
+
+    def define_origem_atual(self, origem):
+        # Chamado a cada execução com a origem ("atual", versão, dia) em uso; ao
+        # mudar, o que foi calculado sobre a versão anterior é descartado.
+        with self._lock:
+            if origem == self._origem_atual:
+                return
+            self._origem_atual = origem
+            for chave in [chave for chave in self._itens if self._obsoleta(chave[0])]:
+                self._remove(chave)
+                self.invalidacoes += 1
+
+    def _obsoleta(self, origem):
+        return origem[0] == "atual" and self._origem_atual is not None and origem != self._origem_atual
+
+    def _remove(self, chave):
+        _, tamanho_item = self._itens.pop(chave)
+        self._bytes -= tamanho_item
+
+    def obtem(self, chave, calcular):
+        # `chave` = (origem, filtros normalizados, item); o item é um nome ou uma
+        # tupla que começa pelo nome. Sem a entrada, calcula e guarda.
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            self.falhas += 1
+
+        item = chave[-1]
+        with span(f"cache:{item if isinstance(item, str) else item[0]}"):
+            valor = calcular()
+        self.guarda(chave, valor)
+        return valor
+
+    def guarda(self, chave, valor):
+        tamanho_item = tamanho(valor)
+        with self._lock:
+            if self._obsoleta(chave[0]) or tamanho_item > self.max_bytes:
+                return
+            if chave in self._itens:
+                self._remove(chave)
+            self._itens[chave] = (valor, tamanho_item)
+            self._bytes += tamanho_item
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._itens)))
+                self.descartes += 1
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "descartes": self.descartes,
+                "invalidacoes": self.invalidacoes,
+            }
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from inadimplencia.processos import totais_historico_em_processo
+
+# Histórico local da planilha principal: cada versão baixada é guardada em Arrow,
+# particionada pela data da coleta (data=AAAA-MM-DD/<hash>.arrow). Versões com o
+# mesmo conteúdo não são gravadas de novo. O manifesto (uma linha JSON por
+# snapshot) diz qual arquivo vale a partir de cada momento, e a tendência guarda
+# a comparação de cada par de snapshots consecutivos, calculada uma única vez.
+SNAPSHOT_DIR = Path(os.environ.get("INADIMPLENCIA_SNAPSHOT_DIR", Path(__file__).resolve().parent.parent / ".snapshots"))
+# Janela guardada: o snapshot vigente no início dela e todos os posteriores.
+# Os mais antigos saem do manifesto, do disco e da tendência ao registrar um novo.
+SNAPSHOT_MAX_DIAS = 400
+COL_VALOR = "Montante em moeda interna"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    momento: datetime
+    hash: str
+    arquivo: str
+    linhas: int
+    total: float
+
+    @property
+    def data(self):
+        return self.momento.date()
+
+
+def hash_tabela(df):
+    # Hash do conteúdo (nomes das colunas + valores), independente do dtype de
+    # armazenamento e dos metadados do XLSX exportado.
+    resumo = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    resumo.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return resumo.hexdigest()
+
+
+class SnapshotStore:
+    def __init__(self, diretorio=SNAPSHOT_DIR, max_dias=SNAPSHOT_MAX_DIAS):
+        self.diretorio = Path(diretorio)
+        self.max_dias = max_dias
+        self._lock = threading.Lock()
+
+    @property
+    def _manifesto(self):
+        return self.diretorio / "manifesto.jsonl"
+
+    @property
+    def _tendencia(self):
+        return self.diretorio / "tendencia.json"
+
+    def lista(self):
+        try:
+            linhas = self._manifesto.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        snapshots = []
+        for linha in linhas:
+            try:
+                registro = json.loads(linha)
+                snapshots.append(Snapshot(
+                    momento=datetime.fromisoformat(registro["momento"]),
+                    hash=registro["hash"],
+                    arquivo=registro["arquivo"],
+                    linhas=registro["linhas"],
+                    total=registro["total"],
+                ))
+            except (ValueError, KeyError):
+                continue
+        return sorted(snapshots, key=lambda s: s.momento)
+
+    def registra(self, df, momento=None):
+        # Guarda a versão se ela difere da última registrada; devolve o snapshot vigente.
+        momento = momento or datetime.now()
+        chave = hash_tabela(df)
+        with self._lock:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            snapshots = self.lista()
+            if snapshots and snapshots[-1].hash == chave:
+                return snapshots[-1]
+
+            anterior = next((s for s in snapshots if s.hash == chave), None)
+            if anterior is not None and (self.diretorio / anterior.arquivo).exists():
+                # O conteúdo voltou a uma versão já guardada: só o manifesto muda.
+                arquivo = anterior.arquivo
+            else:
+                arquivo = f"data={momento.date().isoformat()}/{chave[:16]}.arrow"
+                self._grava(self.diretorio / arquivo, df)
+
+            snapshot = Snapshot(momento=momento, hash=chave, arquivo=arquivo, linhas=len(df), total=float(df[COL_VALOR].sum()))
+            with open(self._manifesto, "a", encoding="utf-8") as manifesto:
+                manifesto.write(_registro(snapshot) + "\n")
+            self._descarta_antigos(snapshots + [snapshot])
+            return snapshot
+
+    def _descarta_antigos(self, snapshots):
+        snapshots = sorted(snapshots, key=lambda s: s.momento)
+        inicio = snapshots[-1].momento - timedelta(days=self.max_dias)
+        antigos = [s for s in snapshots[:-1] if s.momento < inicio]
+        if len(antigos) < 2:
+            return
+        # O último antes da janela fica: é o vigente no início dela.
+        mantidos = snapshots[len(antigos) - 1:]
+        self._grava_texto(self._manifesto, "".join(_registro(s) + "\n" for s in mantidos))
+
+        arquivos = {s.arquivo for s in mantidos}
+        for arquivo in {s.arquivo for s in antigos} - arquivos:
+            caminho = self.diretorio / arquivo
+            caminho.unlink(missing_ok=True)
+            try:
+                caminho.parent.rmdir()
+            except OSError:
+                pass  # a pasta do dia ainda tem outros snapshots
+
+        try:
+            pares = json.loads(self._tendencia.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        hashes = {s.hash for s in mantidos}
+        pares = {chave: par for chave, par in pares.items() if set(chave.split(":")) <= hashes}
+        self._grava_texto(self._tendencia, json.dumps(pares))
+
+    def _grava_texto(self, caminho, texto):
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        temporario.write_text(texto, encoding="utf-8")
+        os.replace(temporario, caminho)
+
+    def _grava(self, caminho, df):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            feather.write_feather(df, temporario, compression="uncompressed")
+            os.replace(temporario, caminho)
+        except (OSError, pa.ArrowException):
+            temporario.unlink(missing_ok=True)
+            raise
+
+    def em(self, data):
+        # Snapshot vigente no fim do dia `data` (o último coletado até essa data).
+        vigente = None
+        for snapshot in self.lista():
+            if snapshot.data > data:
+                break
+            vigente = snapshot
+        return vigente
+
+    def carrega(self, snapshot):
+        return feather.read_table(self.diretorio / snapshot.arquivo, memory_map=True).to_pandas()
+
+    def tendencia(self):
+        # Uma linha por snapshot (a partir do segundo), comparado com o anterior.
+        # Cada par é calculado uma vez e guardado em tendencia.json; um snapshot
+        # novo só acrescenta a comparação com o último.
+        snapshots = self.lista()
+        with self._lock:
+            try:
+                pares = json.loads(self._tendencia.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                pares = {}
+
+            novos = False
+            linhas = []
+            for anterior, atual in zip(snapshots, snapshots[1:]):
+                chave = f"{anterior.hash}:{atual.hash}"
+                if chave not in pares:
+                    # Os dois arquivos são lidos e comparados no pool de processos.
+                    pares[chave] = totais_historico_em_processo(self.diretorio / atual.arquivo, self.diretorio / anterior.arquivo)
+                    novos = True
+                linhas.append({"Momento": atual.momento, "Total": atual.total, **pares[chave]})
+
+            if novos:
+                self.diretorio.mkdir(parents=True, exist_ok=True)
+                self._grava_texto(self._tendencia, json.dumps(pares))
+
+        return pd.DataFrame(linhas, columns=["Momento", "Total", "valor_quitado", "valor_novos_inad", "perc_recuperado", "perc_novos_inad"])
+
+
+def _registro(snapshot):
+    return json.dumps({
+        "momento": snapshot.momento.isoformat(timespec="seconds"),
+        "hash": snapshot.hash,
+        "arquivo": snapshot.arquivo,
+        "linhas": snapshot.linhas,
+        "total": snapshot.total,
+    })
+
+
+_store_padrao = None
+
+
+def store_padrao():
+    global _store_padrao
+    if _store_padrao is None:
+        _store_padrao = SnapshotStore()
+    return _store_padrao
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Caches e snapshots em diretórios temporários e tudo no próprio processo; precisa
+# valer antes de importar o pacote, que lê essas variáveis na importação.
+_TEMP = Path(tempfile.mkdtemp(prefix="inadimplencia-testes-"))
+os.environ.setdefault("INADIMPLENCIA_CACHE_DIR", str(_TEMP / "cache"))
+os.environ.setdefault("INADIMPLENCIA_SNAPSHOT_DIR", str(_TEMP / "snapshots"))
+os.environ.setdefault("INADIMPLENCIA_PROCESSOS", "0")
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / "benchmarks"))
@@ -0,0 +1,126 @@
+import threading
+
+import pandas as pd
+
+from inadimplencia import atualizacao
+from inadimplencia.atualizacao import Atualizador
+from inadimplencia.diagnostico import inicia_coleta, span
+
+
+def _carga(versao):
+    # Só a planilha principal: sem REGIAO não há base para montar.
+    return versao, pd.DataFrame({"Valor": [1.0]}), pd.DataFrame(), b""
+
+
+def test_spans_da_atualizacao_ficam_no_atualizador():
+    def carregar():
+        with span("download:dados"):
+            return _carga("v1")
+
+    spans_pagina = inicia_coleta()
+    atualizador = Atualizador(carregar)
+    assert atualizador.solicita()
+    atualizador._thread.join()
+
+    inicio, spans = atualizador.ultima_medicao
+    assert [registro["span"] for registro in spans] == ["download:dados", "atualizacao"]
+    assert inicio <= atualizador.atual().verificado_em
+    # A coleta da execução da página não recebe os spans da atualização.
+    assert spans_pagina == []
+    inicia_coleta(False)
+
+
+class _Carga:
+    # Devolve as versões pedidas em ordem; uma exceção na lista é levantada, e
+    # `liberar` segura a carga até o teste deixar seguir.
+    def __init__(self, *versoes):
+        self.versoes = list(versoes)
+        self.chamadas = 0
+        self.iniciou = threading.Event()
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def __call__(self):
+        self.chamadas += 1
+        self.iniciou.set()
+        self.liberar.wait(5)
+        versao = self.versoes.pop(0)
+        if isinstance(versao, Exception):
+            raise versao
+        return _carga(versao)
+
+
+def _atualiza(atualizador):
+    assert atualizador.solicita()
+    atualizador._thread.join(5)
+
+
+def test_falha_mantem_a_versao_anterior():
+    atualizador = Atualizador(_Carga("v1", ConnectionError("fora do ar"), "v2"))
+    anterior = atualizador.atual()
+    _atualiza(atualizador)
+    assert atualizador.atual() is anterior
+    assert "fora do ar" in atualizador.ultimo_erro
+
+    _atualiza(atualizador)
+    assert atualizador.atual().versao == "v2"
+    assert atualizador.ultimo_erro is None
+
+
+def test_planilha_principal_vazia_mantem_a_versao_anterior():
+    atualizador = Atualizador(_Carga("v1"))
+    anterior = atualizador.atual()
+    atualizador._carregar = lambda: ("v2", pd.DataFrame(), pd.DataFrame(), b"")
+    _atualiza(atualizador)
+    assert atualizador.atual() is anterior
+    assert "planilha principal" in atualizador.ultimo_erro
+
+
+def test_leitores_so_veem_a_versao_pronta(monkeypatch):
+    # Enquanto a base nova é montada, quem lê continua com a versão anterior inteira.
+    montando, liberar = threading.Event(), threading.Event()
+    base_nova = object()
+
+    def prepara_base(*args, **kwargs):
+        montando.set()
+        liberar.wait(5)
+        return base_nova
+
+    atualizador = Atualizador(_Carga("v1", "v2"))
+    anterior = atualizador.atual()
+    monkeypatch.setattr(atualizacao, "prepara_base", prepara_base)
+    assert atualizador.solicita()
+    assert montando.wait(5)
+    assert atualizador.atual() is anterior
+    liberar.set()
+    atualizador._thread.join(5)
+    atual = atualizador.atual()
+    assert (atual.versao, atual.base) == ("v2", base_nova)
+
+
+def test_pedidos_simultaneos_disparam_uma_atualizacao():
+    carga = _Carga("v1", "v2")
+    atualizador = Atualizador(carga)
+    atualizador.atual()
+    carga.iniciou.clear()
+    carga.liberar.clear()
+
+    inicio = threading.Barrier(8)
+    disparos = []
+
+    def pede():
+        inicio.wait()
+        disparos.append(atualizador.solicita())
+
+    threads = [threading.Thread(target=pede) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert carga.iniciou.wait(5)
+    assert atualizador.atualizando
+    carga.liberar.set()
+    atualizador._thread.join(5)
+    assert disparos.count(True) == 1
+    assert carga.chamadas == 2
+    assert atualizador.atual().versao == "v2"
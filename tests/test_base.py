@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inadimplencia.base import mascara_filtros, pertence
+
+VALORES = ["A001", "A002", None, "A003", "A002", np.nan]
+
+
+@pytest.mark.parametrize("categorica", [True, False], ids=["categoria", "texto"])
+@pytest.mark.parametrize(
+    "selecao",
+    [
+        pytest.param(["A002"], id="uma"),
+        pytest.param(["A002", "A001", "A002"], id="repetida"),
+        pytest.param(["ZZZ", "A003"], id="codigo-desconhecido"),
+        pytest.param(["ZZZ"], id="so-desconhecido"),
+        pytest.param([], id="vazia"),
+        pytest.param(["A001", np.nan], id="com-vazio"),
+    ],
+)
+def test_pertence_igual_a_isin(categorica, selecao):
+    serie = pd.Series(VALORES)
+    if categorica:
+        # Categorias a mais (sem uso) não podem mudar o resultado.
+        serie = serie.astype(pd.CategoricalDtype(["A003", "A002", "A001", "B999"]))
+    esperado = serie.isin(selecao).to_numpy()
+    assert np.array_equal(pertence(serie, selecao), esperado)
+
+
+def test_pertence_aceita_iteradores():
+    serie = pd.Series(["A001", "A002"], dtype="category")
+    assert pertence(serie, (div for div in ["A002"])).tolist() == [False, True]
+
+
+def test_mascara_filtros_com_regiao_vazia():
+    df = pd.DataFrame({
+        "Região": pd.Categorical(["SC", np.nan, "PR", "SC"]),
+        "Divisão": pd.Categorical(["A001", "A002", "A003", "A004"]),
+        "Exercicio": pd.Categorical(["2025", "2025", "2024", "2024"]),
+        "Ultimos 10 dias": [True, True, False, False],
+    })
+    # Títulos sem região só entram quando nenhuma região é escolhida.
+    assert mascara_filtros(df, "Divisão").tolist() == [True] * 4
+    assert mascara_filtros(df, "Divisão", regiao="SC").tolist() == [True, False, False, True]
+    assert mascara_filtros(df, "Divisão", regiao="SC", divisoes=["A004", "ZZZ"]).tolist() == [False, False, False, True]
+    assert mascara_filtros(df, "Divisão", divisoes=[]).tolist() == [False] * 4
+    assert mascara_filtros(df, "Divisão", exercicios=["2025"], ultimos_10_dias=True).tolist() == [True, True, False, False]
@@ -0,0 +1,39 @@
+import os
+import time
+
+from inadimplencia.cache_local import CacheLocal
+
+
+def _arquivo(caminho, tamanho, idade):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(b"x" * tamanho)
+    mtime = time.time() - idade
+    os.utime(caminho, (mtime, mtime))
+    return caminho
+
+
+def test_limpar_descarta_copias_http_antigas(tmp_path):
+    cache = CacheLocal(tmp_path, max_bytes=10_000, max_idade=100)
+    antiga = [_arquivo(tmp_path / "http" / "antiga.bin", 10, 200), _arquivo(tmp_path / "http" / "antiga.json", 10, 200)]
+    recente = [_arquivo(tmp_path / "http" / "recente.bin", 10, 10), _arquivo(tmp_path / "http" / "recente.json", 10, 10)]
+    cache.limpar()
+    assert not any(caminho.exists() for caminho in antiga)
+    assert all(caminho.exists() for caminho in recente)
+
+
+def test_limpar_conta_copias_http_no_tamanho(tmp_path):
+    # 300 bytes no total para 200 permitidos: sai primeiro o menos usado, e o corpo
+    # sai junto com os validadores, mesmo que o .json tenha sido gravado depois.
+    cache = CacheLocal(tmp_path, max_bytes=200, max_idade=1000)
+    http_bin = _arquivo(tmp_path / "http" / "url.bin", 90, 30)
+    http_meta = _arquivo(tmp_path / "http" / "url.json", 10, 5)
+    velho = _arquivo(tmp_path / "dados-3-a.arrow", 100, 20)
+    novo = _arquivo(tmp_path / "dados-3-b.arrow", 100, 1)
+    cache.limpar()
+    assert not velho.exists()
+    assert http_bin.exists() and http_meta.exists() and novo.exists()
+
+    cache.max_bytes = 150
+    cache.limpar()
+    assert not http_bin.exists() and not http_meta.exists()
+    assert novo.exists()
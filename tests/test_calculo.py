@@ -0,0 +1,113 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados_sinteticos import carrega_regiao, gera_titulos
+from inadimplencia.base import LISTA_STATUS, MAPA_GRAVIDADE_SIMBOLO, ORDEM_GRAVIDADE, monta_base
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.calculo import Filtros, calcula_clientes, compute_dashboard, pagina_tabela
+from inadimplencia.esquema import aplica_esquema
+from inadimplencia.resultados import normaliza_filtros
+
+HOJE = date(2025, 7, 15)
+
+
+@pytest.fixture(scope="module")
+def base():
+    df_regiao = carrega_regiao()
+    df = aplica_esquema(normalizar_para_arrow(gera_titulos(5000, seed=7, df_regiao=df_regiao, hoje=HOJE)))
+    return monta_base(df, df_regiao, "Divisão", "Divisão", HOJE)
+
+
+def status_esperado(tipos):
+    # Regra da página original: o tipo mais grave entre os tipos de cobrança listados.
+    for tipo in ORDEM_GRAVIDADE:
+        if tipo in tipos:
+            return MAPA_GRAVIDADE_SIMBOLO[tipo]
+    return '⚪'
+
+
+def filtros_de_linha(base):
+    todos = tuple(LISTA_STATUS)
+    maiores = base.df['Divisão'].value_counts().index[:3]
+    return [
+        Filtros(regiao=base.df['Região'].value_counts().index[0], status=todos),
+        Filtros(exercicios=tuple(base.lista_exercicios[-2:]), status=todos),
+        Filtros(divisoes=tuple(str(div) for div in maiores), status=todos),
+        Filtros(ultimos_10_dias=True, status=todos),
+    ]
+
+
+def test_status_e_tipos_dos_mesmos_titulos(base):
+    for filtros in filtros_de_linha(base):
+        resumo, _ = calcula_clientes(base, filtros)
+        assert resumo is not None
+        esperado = resumo['Tipos_de_Cobranca'].map(status_esperado)
+        assert (resumo['Status'].astype(object) == esperado).all(), filtros
+
+
+@pytest.mark.parametrize("status", [('🔴',), ('🟡', '🔵'), ('⚪',)])
+def test_status_parcial_com_filtro_de_linha(base, status):
+    hoje = datetime.combine(HOJE, datetime.min.time())
+    for filtros in filtros_de_linha(base):
+        todos, _ = calcula_clientes(base, filtros)
+        filtros = Filtros(**{**filtros.__dict__, "status": status})
+        esperado = todos[todos['Status'].isin(status)]
+
+        resumo, _ = calcula_clientes(base, filtros)
+        if esperado.empty:
+            assert resumo is None
+        else:
+            assert set(resumo['Cliente'].astype(str)) == set(esperado['Cliente'].astype(str))
+            assert (resumo['Status'].astype(object).isin(status)).all()
+
+        # Só pelo cubo (secoes=()) ou com as linhas, os totais são os mesmos.
+        nucleo = compute_dashboard(base, filtros, hoje, secoes=())
+        completo = compute_dashboard(base, filtros, hoje)
+        assert nucleo.tot_inad == pytest.approx(esperado['Valor_Inadimplente'].sum())
+        assert completo.tot_inad == pytest.approx(nucleo.tot_inad)
+        assert nucleo.n_titulos_inad == completo.n_titulos_inad
+
+
+def test_sem_filtro_de_linha_usa_status_da_base(base):
+    filtros = Filtros(status=('🔴',))
+    resumo, _ = calcula_clientes(base, filtros)
+    inad = base.df[base.df['Vencido'] & (base.df['Status'] == '🔴')]
+    assert resumo['Valor_Inadimplente'].sum() == pytest.approx(inad['Montante em moeda interna'].sum())
+    assert np.array_equal(np.sort(resumo['Cliente'].astype(str).unique()), np.sort(inad['Nome 1'].astype(str).unique()))
+
+
+def test_filtros_normalizados_dao_o_mesmo_resultado(base):
+    # A página calcula com os filtros normalizados (a chave do cache): "todas as
+    # divisões/exercícios" vira None, sem filtro de linha, e o resultado não muda.
+    hoje = datetime.combine(HOJE, datetime.min.time())
+    for status in [tuple(LISTA_STATUS), ('🔴', '🟡')]:
+        pagina = Filtros(divisoes=tuple(base.lista_divisoes), exercicios=tuple(base.lista_exercicios), status=status)
+        normalizados = normaliza_filtros(pagina, base)
+        assert normalizados.divisoes is None and normalizados.exercicios is None
+        esperado, obtido = compute_dashboard(base, pagina, hoje), compute_dashboard(base, normalizados, hoje)
+        assert obtido.tot_inad == pytest.approx(esperado.tot_inad)
+        assert obtido.n_titulos_inad == esperado.n_titulos_inad
+        for campo in ("exercicio", "tipo_cobranca", "regiao", "resumo_divisao"):
+            assert getattr(obtido, campo).equals(getattr(esperado, campo)), campo
+
+
+@pytest.mark.parametrize("crescente", [True, False])
+@pytest.mark.parametrize("coluna", ["inteiro", "valor", "com_vazio"])
+def test_pagina_tabela_igual_a_ordenacao_estavel(coluna, crescente):
+    # Muitos empates e índice fora de ordem: cada página tem que ser a mesma fatia
+    # da ordenação estável completa, inclusive entre valores iguais.
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "inteiro": rng.integers(0, 5, 500),
+        "valor": rng.choice([10.0, 10.5, 99.9, -1.0], 500),
+        "com_vazio": rng.choice([1.0, 2.0, np.nan], 500),
+        "Cliente": pd.Categorical(rng.choice(list("ABCDEFGH"), 500)),
+    }, index=rng.permutation(500))
+    ordenado = df.sort_values(coluna, ascending=crescente, kind="stable")
+    for inicio, tamanho in [(0, 50), (50, 50), (37, 13), (450, 100), (0, 500)]:
+        pagina = pagina_tabela(df, coluna, crescente, inicio, tamanho)
+        esperado = ordenado.iloc[inicio:inicio + tamanho]
+        pd.testing.assert_frame_equal(pagina, esperado.assign(Cliente=esperado["Cliente"].cat.remove_unused_categories()))
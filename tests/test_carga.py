@@ -0,0 +1,28 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from dados_sinteticos import gera_titulos, para_xlsx
+from inadimplencia.carga import load_data, load_hist_data
+from inadimplencia.chaves import compara_historico, id_texto
+
+HOJE = date(2025, 7, 15)
+
+
+def test_historico_so_com_id():
+    # Histórico no formato antigo: só a chave pronta ("ID") e o valor.
+    df_atual = load_data(para_xlsx(gera_titulos(300, seed=3, hoje=HOJE)))
+    ids = id_texto(df_atual).astype(str)
+    mantidos = df_atual.iloc[:200]
+    df_hist = pd.DataFrame({
+        "ID": list(ids.iloc[:200]) + ["RV_1_2_A000_237_2020-01-01"],
+        "Montante em moeda interna": list(mantidos["Montante em moeda interna"]) + [1234.5],
+    })
+
+    hist = load_hist_data(para_xlsx(df_hist))
+    assert set(hist.columns) == {"ID", "Montante em moeda interna"}
+
+    diff = compara_historico(df_atual, hist)
+    assert diff.valor_quitado == pytest.approx(1234.5)
+    assert diff.valor_novos_inad == pytest.approx(df_atual["Montante em moeda interna"].iloc[200:].sum())
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inadimplencia.classificacao import classifica_exercicio, classifica_faixa, classifica_prazo, rotulos_exercicio
+
+# Datas de referência: meio do ano, as duas pontas de uma virada de ano e um 29 de fevereiro.
+REFERENCIAS = [datetime(2025, 7, 15), datetime(2025, 12, 31), datetime(2026, 1, 1), datetime(2024, 2, 29)]
+
+
+def legado_exercicio(data, hoje):
+    # Versão por linha da página original, que fixava 2021–2025 para o ano de
+    # 2025; aqui a mesma janela é deslocada para o ano de referência.
+    if pd.isnull(data):
+        return "Sem data"
+    ano = data.year - (hoje.year - 2025)
+    if ano <= 2021: return f"{hoje.year - 4}(Acumulado)"
+    elif ano <= 2025: return str(data.year)
+    else: return "Futuro"
+
+
+def legado_faixa(exercicio, dias, hoje):
+    if exercicio == str(hoje.year):
+        if dias <= 30: return "Até 30 dias"
+        elif dias <= 60: return "entre 31 e 60 dias"
+        else: return "mais de 61 dias"
+    return ""
+
+
+def legado_prazo(dias):
+    if dias <= 60: return "Curto Prazo"
+    else: return "Longo Prazo"
+
+
+def gerar(n, hoje, seed=0):
+    rng = np.random.default_rng(seed)
+    documento = pd.Timestamp(hoje) - pd.to_timedelta(rng.integers(-400, 365 * 9, n), unit="D")
+    vencimento = documento + pd.to_timedelta(rng.integers(-10, 180, n), unit="D")
+    df = pd.DataFrame({"Data do documento": documento, "Vencimento líquido": vencimento})
+    df.loc[rng.random(n) < 0.01, "Data do documento"] = pd.NaT
+    df.loc[rng.random(n) < 0.01, "Vencimento líquido"] = pd.NaT
+    df["Dias de atraso"] = (hoje - df["Vencimento líquido"]).dt.days
+    return df
+
+
+@pytest.mark.parametrize("hoje", REFERENCIAS, ids=lambda hoje: hoje.date().isoformat())
+def test_igual_a_versao_por_linha(hoje):
+    df = gerar(20_000, hoje)
+    exercicio = classifica_exercicio(df["Data do documento"], hoje)
+    faixa = classifica_faixa(exercicio, df["Dias de atraso"], hoje)
+    prazo = classifica_prazo(df["Dias de atraso"])
+
+    esperado_exercicio = df["Data do documento"].apply(legado_exercicio, hoje=hoje)
+    esperado_faixa = pd.Series([legado_faixa(e, d, hoje) for e, d in zip(esperado_exercicio, df["Dias de atraso"])])
+    assert exercicio.tolist() == esperado_exercicio.tolist()
+    assert faixa.tolist() == esperado_faixa.tolist()
+    assert prazo.tolist() == df["Dias de atraso"].apply(legado_prazo).tolist()
+
+
+def test_virada_de_ano():
+    datas = pd.Series(pd.to_datetime(["2025-12-31", "2026-01-01", "2021-06-30", "2022-01-01"]))
+    assert classifica_exercicio(datas, datetime(2025, 12, 31)).tolist() == ["2025", "Futuro", "2021(Acumulado)", "2022"]
+    assert classifica_exercicio(datas, datetime(2026, 1, 1)).tolist() == ["2025", "2026", "2022(Acumulado)", "2022(Acumulado)"]
+
+
+def test_rotulos_vem_dos_dados():
+    hoje = datetime(2025, 7, 15)
+    # Dados só de 2023 em diante: nada a acumular.
+    assert rotulos_exercicio(np.array([2023.0, 2024.0, np.nan]), hoje)[2] == ["2023", "2024"]
+    # Dados mais antigos que a janela: o primeiro ano dela acumula os anteriores.
+    assert rotulos_exercicio(np.array([2012.0, 2025.0, 2027.0]), hoje)[2] == [
+        "2021(Acumulado)", "2022", "2023", "2024", "2025",
+    ]
+    # Sem datas: a janela inteira.
+    assert rotulos_exercicio(np.array([np.nan]), hoje)[2][0] == "2021(Acumulado)"
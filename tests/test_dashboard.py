@@ -0,0 +1,61 @@
+import functools
+import threading
+from datetime import date
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from conftest import RAIZ
+from dados_sinteticos import ARQUIVO_REGIAO, carrega_regiao, gera_historico, gera_titulos, para_xlsx
+
+HOJE = date(2025, 7, 15)
+
+
+class _Arquivos(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pagina(tmp_path, monkeypatch):
+    # As três planilhas servidas localmente, pelas variáveis de URL da página.
+    df = gera_titulos(2000, seed=5, df_regiao=carrega_regiao(), hoje=HOJE)
+    (tmp_path / "dados.xlsx").write_bytes(para_xlsx(df))
+    (tmp_path / "hist.xlsx").write_bytes(para_xlsx(gera_historico(df)))
+    (tmp_path / "REGIAO.xlsx").write_bytes(ARQUIVO_REGIAO.read_bytes())
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Arquivos, directory=str(tmp_path)))
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_port}"
+    monkeypatch.setenv("INADIMPLENCIA_URL_DADOS", f"{url}/dados.xlsx")
+    monkeypatch.setenv("INADIMPLENCIA_URL_REGIAO", f"{url}/REGIAO.xlsx")
+    monkeypatch.setenv("INADIMPLENCIA_URL_HIST", f"{url}/hist.xlsx")
+    # O atualizador e as bases ficam em st.cache_resource, que vale para o processo.
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    yield df, AppTest.from_file(str(RAIZ / "dashboard_inadimplencia.py"), default_timeout=120)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_filtros_vindos_do_link(pagina):
+    df, at = pagina
+    divisoes = df["Divisão"].astype(str).value_counts().index[:2].tolist()
+    regiao = carrega_regiao().set_index("Divisão").loc[divisoes[0], "Região"]
+    at.query_params["regiao"] = regiao
+    at.query_params["div"] = ",".join([divisoes[1], "ZZZ", divisoes[0]])
+    at.run()
+
+    assert not at.exception
+    assert at.sidebar.selectbox(key="regiao_sel").value == regiao
+    # Códigos que não existem nos dados saem da seleção; os outros já vêm marcados.
+    assert at.sidebar.multiselect(key="divisoes").value == [divisoes[1], divisoes[0]]
+    assert at.query_params["div"] == ",".join([divisoes[1], divisoes[0]])
+
+    # Depois da primeira execução o link só acompanha a seleção.
+    at.sidebar.multiselect(key="divisoes").set_value([divisoes[0]]).run()
+    assert at.query_params["div"] == divisoes[0]
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from inadimplencia.fontes import baixar, baixar_fontes, criar_sessao
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class _Fontes(BaseHTTPRequestHandler):
+    # /planilha: responde 304 aos validadores certos; /instavel: falha com 503 nas
+    # primeiras `falhas` requisições; /lento/<nome>: demora `atraso` segundos.
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.pedidos.append((self.path, dict(self.headers)))
+            contagem = sum(1 for caminho, _ in servidor.pedidos if caminho == self.path)
+        if self.path == "/planilha":
+            if self.headers.get("If-None-Match") == ETAG:
+                self._responde(304)
+            else:
+                self._responde(200, b"conteudo v1", {"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+        elif self.path == "/instavel":
+            self._responde(503 if contagem <= servidor.falhas else 200, b"ok")
+        elif self.path.startswith("/lento/"):
+            time.sleep(servidor.atraso)
+            self._responde(200, self.path.encode())
+        else:
+            self._responde(404)
+
+    def _responde(self, status, corpo=b"", headers=None):
+        self.send_response(status)
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Fontes)
+    servidor.daemon_threads = True
+    servidor.lock = threading.Lock()
+    servidor.pedidos = []
+    servidor.falhas = 0
+    servidor.atraso = 0.0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    servidor.url = f"http://127.0.0.1:{servidor.server_port}"
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_304_reaproveita_copia_local(servidor, tmp_path):
+    url = f"{servidor.url}/planilha"
+    sessao = criar_sessao()
+    assert baixar(url, sessao, diretorio=tmp_path) == b"conteudo v1"
+    assert servidor.pedidos[0][1].get("If-None-Match") is None
+    (copia,) = tmp_path.glob("*.bin")
+    os.utime(copia, (0, 0))
+
+    # Os validadores ficam guardados e voltam na próxima requisição; o 304 não tem corpo.
+    assert baixar(url, sessao, diretorio=tmp_path) == b"conteudo v1"
+    headers = servidor.pedidos[1][1]
+    assert headers["If-None-Match"] == ETAG
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+    # A cópia reaproveitada conta como usada para a limpeza do cache local.
+    assert copia.stat().st_mtime > 0
+
+
+def test_sem_copia_local_nao_manda_validadores(servidor, tmp_path):
+    url = f"{servidor.url}/planilha"
+    baixar(url, criar_sessao(), diretorio=tmp_path)
+    for arquivo in tmp_path.glob("*.bin"):
+        arquivo.unlink()
+    assert baixar(url, criar_sessao(), diretorio=tmp_path) == b"conteudo v1"
+    assert "If-None-Match" not in servidor.pedidos[1][1]
+
+
+def test_tenta_de_novo_apos_5xx(servidor, tmp_path):
+    servidor.falhas = 2
+    assert baixar(f"{servidor.url}/instavel", criar_sessao(tentativas=3), diretorio=tmp_path) == b"ok"
+    assert len(servidor.pedidos) == 3
+
+
+def test_desiste_apos_as_tentativas(servidor, tmp_path):
+    servidor.falhas = 10
+    with pytest.raises(requests.HTTPError):
+        baixar(f"{servidor.url}/instavel", criar_sessao(tentativas=1), diretorio=tmp_path)
+    assert len(servidor.pedidos) == 2
+
+
+def test_timeout(servidor, tmp_path):
+    servidor.atraso = 2.0
+    inicio = time.perf_counter()
+    with pytest.raises(requests.RequestException):
+        baixar(f"{servidor.url}/lento/a", criar_sessao(tentativas=0), timeout=(1, 0.2), diretorio=tmp_path)
+    assert time.perf_counter() - inicio < 1.5
+
+
+def test_fontes_em_paralelo(servidor):
+    servidor.atraso = 0.5
+    urls = {nome: f"{servidor.url}/lento/{nome}" for nome in ("dados", "regiao", "hist")}
+    urls["quebrada"] = f"{servidor.url}/inexistente"
+    inicio = time.perf_counter()
+    resultados = baixar_fontes(urls, criar_sessao(tentativas=0))
+    # Em série seriam 1,5 s; em paralelo, o tempo da mais lenta.
+    assert time.perf_counter() - inicio < 1.2
+    assert {nome: resultados[nome] for nome in ("dados", "regiao", "hist")} == {
+        nome: f"/lento/{nome}".encode() for nome in ("dados", "regiao", "hist")
+    }
+    assert isinstance(resultados["quebrada"], requests.HTTPError)
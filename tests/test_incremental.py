@@ -0,0 +1,35 @@
+from datetime import date
+
+import pytest
+
+from bench_incremental import nova_versao, prepara
+from dados_sinteticos import carrega_regiao, gera_titulos
+from inadimplencia.base import monta_base
+from inadimplencia.incremental import atualiza_base, verifica_bases
+
+HOJE = date(2025, 7, 15)
+COL_DIV = "Divisão"
+
+
+@pytest.fixture(scope="module")
+def versoes():
+    df_regiao = carrega_regiao()
+    bruto = gera_titulos(20_000, seed=11, df_regiao=df_regiao, hoje=HOJE)
+    return df_regiao, prepara(bruto), prepara(nova_versao(bruto, seed=11))
+
+
+def test_igual_a_reconstrucao(versoes):
+    df_regiao, df_antigo, df_novo = versoes
+    base = monta_base(df_antigo, df_regiao, COL_DIV, COL_DIV, HOJE)
+    incremental = atualiza_base(base, df_novo, df_regiao, COL_DIV, HOJE, verificar=False)
+    assert incremental is not None
+    completa = monta_base(df_novo, df_regiao, COL_DIV, COL_DIV, HOJE)
+    verifica_bases(incremental, completa)
+    assert incremental.df.dtypes.to_dict() == completa.df.dtypes.to_dict()
+
+
+def test_planilha_sem_cliente_reconstroi(versoes):
+    df_regiao, df_antigo, df_novo = versoes
+    df_antigo, df_novo = df_antigo.drop(columns="Nome 1"), df_novo.drop(columns="Nome 1")
+    base = monta_base(df_antigo, df_regiao, COL_DIV, COL_DIV, HOJE)
+    assert atualiza_base(base, df_novo, df_regiao, COL_DIV, HOJE, verificar=False) is None
@@ -0,0 +1,63 @@
+import multiprocessing.spawn
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from inadimplencia import processos
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(processos, "PROCESSOS", 1)
+    yield
+    executor, processos._executor = processos._executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def test_processo_nao_executa_o_main(pool, monkeypatch, tmp_path):
+    # No Streamlit o __main__ é a página; o processo do pool não pode executá-la.
+    marca = tmp_path / "executou"
+    script = tmp_path / "pagina.py"
+    script.write_text(f"open({str(marca)!r}, 'w').close()\n")
+    pagina = types.ModuleType("__main__")
+    pagina.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", pagina)
+
+    # No meio da criação do processo, quem olhar o __main__ continua vendo a página.
+    vistos = []
+    executavel = multiprocessing.spawn.get_executable
+
+    def anota_main():
+        vistos.append(sys.modules["__main__"])
+        return executavel()
+
+    monkeypatch.setattr(multiprocessing.spawn, "get_executable", anota_main)
+    pid = processos.executa(None, os.getpid, lambda: ())
+    assert pid != os.getpid()
+    assert not marca.exists()
+    assert vistos and all(principal is pagina for principal in vistos)
+    # Os demais pools do processo continuam com o comportamento padrão.
+    assert multiprocessing.spawn.get_preparation_data("x")["init_main_from_path"] == str(script)
+
+
+def test_so_quem_submete_monta_os_argumentos(pool):
+    montagens = []
+
+    def argumentos():
+        montagens.append(threading.get_ident())
+        return (1.0,)
+
+    processos.executa(None, time.sleep, lambda: (0,))  # sobe o processo antes de medir
+    threads = [threading.Thread(target=processos.executa, args=("mesmo job", time.sleep, argumentos)) for _ in range(4)]
+    threads[0].start()
+    time.sleep(0.3)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(montagens) == 1
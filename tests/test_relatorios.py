@@ -0,0 +1,59 @@
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from dados_sinteticos import ARQUIVO_REGIAO, carrega_regiao, gera_titulos
+from inadimplencia.base import LISTA_STATUS, monta_base
+from inadimplencia.cache_local import normalizar_para_arrow
+from inadimplencia.calculo import Filtros, compute_dashboard
+from inadimplencia.esquema import aplica_esquema
+from inadimplencia.relatorios import Relatorio, exporta_relatorios, main, nome_arquivo, relatorios_da_base, tabelas_relatorio
+
+HOJE = date(2025, 7, 15)
+
+
+def test_planilha_ilegivel(tmp_path, capsys):
+    arquivo = tmp_path / "dados.xlsx"
+    arquivo.write_bytes(b"isto nao e um xlsx")
+    with pytest.raises(SystemExit):
+        main(["--dados", str(arquivo), "--regiao", str(ARQUIVO_REGIAO), "--saida", str(tmp_path / "saida")])
+    erro = capsys.readouterr().err
+    assert "Não foi possível ler a planilha de títulos" in erro
+    assert "Coluna de divisão" not in erro
+
+
+def test_totais_iguais_aos_da_pagina():
+    df_regiao = carrega_regiao()
+    df = gera_titulos(3000, seed=5, df_regiao=df_regiao, hoje=HOJE)
+    df.loc[np.random.default_rng(5).random(len(df)) < 0.05, "Nome 1"] = None
+    base = monta_base(aplica_esquema(normalizar_para_arrow(df)), df_regiao, "Divisão", "Divisão", HOJE)
+    hoje = datetime.combine(HOJE, datetime.min.time())
+
+    for relatorio in relatorios_da_base(base, ("regiao",)):
+        pagina = compute_dashboard(base, Filtros(regiao=relatorio.filtros.regiao, status=tuple(LISTA_STATUS)), hoje, secoes=())
+        resultado, _ = tabelas_relatorio(base, relatorio.filtros, hoje)
+        assert resultado.tot_inad == pytest.approx(pagina.tot_inad)
+
+    # Sem filtro de Status entram também os títulos sem cliente.
+    todos = relatorios_da_base(base, ("regiao",), status=None)
+    sem_cliente = base.df[base.df["Vencido"] & base.df["Nome 1"].isna()]
+    total_todos = sum(tabelas_relatorio(base, r.filtros, hoje)[0].tot_inad for r in todos)
+    total_padrao = sum(tabelas_relatorio(base, r.filtros, hoje)[0].tot_inad for r in relatorios_da_base(base, ("regiao",)))
+    assert total_todos - total_padrao == pytest.approx(sem_cliente["Montante em moeda interna"].sum())
+
+
+def test_nomes_de_arquivo_nao_colidem():
+    nomes = ["A/B", "A B", "A_B", "A:B", "", "sem_nome", "Região Sul"]
+    arquivos = [nome_arquivo(nome) for nome in nomes]
+    assert len(set(arquivos)) == len(nomes)
+    assert nome_arquivo("A_B") == "A_B" and nome_arquivo("A001") == "A001"
+    assert all(re.fullmatch(r"[\w\-]+", arquivo) for arquivo in arquivos)
+
+
+def test_relatorios_no_mesmo_arquivo(tmp_path):
+    relatorios = [Relatorio("divisao", nome, Filtros(divisoes=(nome,))) for nome in ("a001", "A001")]
+    with pytest.raises(ValueError, match="mesmo arquivo"):
+        exporta_relatorios(None, relatorios, datetime(2025, 7, 15), tmp_path)
+    assert not any(tmp_path.iterdir())
@@ -0,0 +1,75 @@
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+from inadimplencia.calculo import Filtros
+from inadimplencia.resultados import CacheResultados, normaliza_filtros
+
+HOJE = date(2025, 7, 15)
+V1 = ("atual", "v1", HOJE)
+V2 = ("atual", "v2", HOJE)
+SNAPSHOT = ("snapshot", "abc", HOJE)
+VALOR = b"x" * 1000
+TAMANHO = sys.getsizeof(VALOR)
+
+
+def _chave(origem, item):
+    return (origem, Filtros(), item)
+
+
+def _calculados(cache, chaves):
+    # Quais chaves precisaram ser calculadas (não estavam no cache).
+    calculadas = []
+    for chave in chaves:
+        cache.obtem(chave, lambda chave=chave: calculadas.append(chave) or VALOR)
+    return calculadas
+
+
+def test_descarta_os_menos_usados_pelo_tamanho():
+    cache = CacheResultados(max_bytes=3 * TAMANHO)
+    cache.define_origem_atual(V1)
+    a, b, c, d = (_chave(V1, item) for item in "abcd")
+    assert _calculados(cache, [a, b, c, a]) == [a, b, c]
+    # `a` acabou de ser usado: quem sai para `d` entrar é `b`.
+    assert _calculados(cache, [d]) == [d]
+    metricas = cache.metricas()
+    assert metricas["itens"] == 3 and metricas["bytes"] == 3 * TAMANHO and metricas["descartes"] == 1
+    assert _calculados(cache, [a, c, d, b]) == [b]
+
+
+def test_item_maior_que_o_limite_nao_entra():
+    cache = CacheResultados(max_bytes=TAMANHO // 2)
+    assert _calculados(cache, [_chave(V1, "a"), _chave(V1, "a")]) == [_chave(V1, "a")] * 2
+    assert cache.metricas()["itens"] == 0
+
+
+def test_nova_versao_descarta_so_a_anterior():
+    cache = CacheResultados()
+    cache.define_origem_atual(V1)
+    _calculados(cache, [_chave(V1, "a"), _chave(V1, "b"), _chave(SNAPSHOT, "a")])
+
+    cache.define_origem_atual(V1)
+    assert cache.metricas()["invalidacoes"] == 0
+    cache.define_origem_atual(V2)
+    assert cache.metricas()["invalidacoes"] == 2
+    assert _calculados(cache, [_chave(SNAPSHOT, "a"), _chave(V1, "a")]) == [_chave(V1, "a")]
+    # Um cálculo da versão anterior que termina depois da troca não volta ao cache.
+    assert cache.metricas()["itens"] == 1
+
+
+def test_metricas():
+    cache = CacheResultados()
+    assert cache.metricas()["taxa_acerto"] == 0.0
+    _calculados(cache, [_chave(V1, "a"), _chave(V1, "a"), _chave(V1, "a"), _chave(V1, "b")])
+    metricas = cache.metricas()
+    assert (metricas["acertos"], metricas["falhas"], metricas["taxa_acerto"]) == (2, 2, 0.5)
+    assert metricas["bytes"] == 2 * TAMANHO
+
+
+def test_normaliza_filtros():
+    base = SimpleNamespace(lista_divisoes=["A001", "A002", "A003"], lista_exercicios=["2024", "2025"])
+    a = normaliza_filtros(Filtros(divisoes=("A002", "A001", "A002"), exercicios=("2025", "2024"), status=("🟡", "🔴")), base)
+    b = normaliza_filtros(Filtros(divisoes=("A001", "A002"), exercicios=("2024", "2025"), status=("🔴", "🟡")), base)
+    assert a == b
+    assert a.divisoes == ("A001", "A002") and a.exercicios is None and a.status is not None
+    assert normaliza_filtros(Filtros(divisoes=("A003", "A001", "A002")), base).divisoes is None
@@ -0,0 +1,98 @@
+import json
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from inadimplencia import snapshots as modulo
+from inadimplencia.chaves import compara_historico
+from inadimplencia.snapshots import SnapshotStore
+
+
+def _versao(n):
+    # Títulos 0..n-1: cada versão quita os primeiros e abre um novo no fim.
+    referencias = list(range(n // 2, n))
+    return pd.DataFrame({
+        "Tipo de documento": "RV",
+        "Referência": referencias,
+        "Conta": 10,
+        "Divisão": "A001",
+        "Banco da empresa": "237",
+        "Vencimento líquido": pd.Timestamp("2025-01-10"),
+        "Montante em moeda interna": [float(r) for r in referencias],
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(tmp_path)
+
+
+def _arquivos(store):
+    return sorted(p.relative_to(store.diretorio).as_posix() for p in store.diretorio.rglob("*.arrow"))
+
+
+def test_registra_nao_duplica_conteudo(store):
+    primeiro = store.registra(_versao(4), datetime(2025, 7, 1, 8))
+    assert store.registra(_versao(4), datetime(2025, 7, 1, 9)) == primeiro
+    store.registra(_versao(6), datetime(2025, 7, 2, 8))
+    # Voltar a um conteúdo já guardado acrescenta ao manifesto sem gravar outro arquivo.
+    terceiro = store.registra(_versao(4), datetime(2025, 7, 3, 8))
+    assert terceiro.arquivo == primeiro.arquivo
+    assert [s.momento.day for s in store.lista()] == [1, 2, 3]
+    assert len(_arquivos(store)) == 2
+    pd.testing.assert_frame_equal(store.carrega(terceiro), _versao(4))
+
+
+def test_em_devolve_o_ultimo_ate_a_data(store):
+    manha = store.registra(_versao(4), datetime(2025, 7, 1, 8))
+    tarde = store.registra(_versao(6), datetime(2025, 7, 1, 17))
+    seguinte = store.registra(_versao(8), datetime(2025, 7, 3, 8))
+    assert store.em(date(2025, 6, 30)) is None
+    assert store.em(date(2025, 7, 1)) == tarde != manha
+    assert store.em(date(2025, 7, 2)) == tarde
+    assert store.em(date(2025, 7, 3)) == seguinte
+    assert store.em(date(2026, 1, 1)) == seguinte
+
+
+def test_tendencia_calcula_so_os_pares_novos(store, monkeypatch):
+    calculados = []
+    totais = modulo.totais_historico_em_processo
+
+    def conta(atual, hist):
+        calculados.append((atual, hist))
+        return totais(atual, hist)
+
+    monkeypatch.setattr(modulo, "totais_historico_em_processo", conta)
+    for dia, n in enumerate([4, 6, 8], start=1):
+        store.registra(_versao(n), datetime(2025, 7, dia))
+    tendencia = store.tendencia()
+    assert len(calculados) == 2 and len(tendencia) == 2
+
+    diff = compara_historico(_versao(8), _versao(6))
+    ultima = tendencia.iloc[-1]
+    assert ultima["valor_quitado"] == diff.valor_quitado
+    assert ultima["valor_novos_inad"] == diff.valor_novos_inad
+
+    store.registra(_versao(10), datetime(2025, 7, 4))
+    assert len(SnapshotStore(store.diretorio).tendencia()) == 3
+    assert len(calculados) == 3
+    store.tendencia()
+    assert len(calculados) == 3
+
+
+def test_descarta_fora_da_janela(tmp_path):
+    store = SnapshotStore(tmp_path, max_dias=30)
+    for dia, n in [(1, 4), (10, 6), (20, 8)]:
+        store.registra(_versao(n), datetime(2025, 1, dia))
+    store.tendencia()
+    store.registra(_versao(10), datetime(2025, 2, 15))
+
+    # Janela a partir de 16/01: fica o vigente nesse dia (10/01) e os posteriores.
+    assert [s.momento.day for s in store.lista()] == [10, 20, 15]
+    assert _arquivos(store) == sorted(s.arquivo for s in store.lista())
+    assert not (tmp_path / "data=2025-01-01").exists()
+    assert store.em(date(2025, 1, 16)).momento == datetime(2025, 1, 10)
+    # O par 01/01-10/01 sai da tendência; 10/01-20/01 continua guardado.
+    assert len(json.loads((tmp_path / "tendencia.json").read_text())) == 1
+    assert len(store.tendencia()) == 2